@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class AiServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_services'
+
+    def ready(self):
+        # Register analysis_jobs indexes with the MongoDB index manager
+        from . import indexes  # noqa: F401
@@ -0,0 +1,138 @@
+"""
+Micro-batching of Gemini emergency analyses
+Analyses submitted within a short window are coalesced into one multi-report
+prompt; the JSON answer is demultiplexed back to each caller, and any report
+the batch answer does not cover is retried as a single call.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisBatcher:
+    """Coalesces concurrent analyze_emergency_situation calls into batched model requests"""
+
+    def __init__(self, gemini_service=None, window_ms: Optional[float] = None, max_size: Optional[int] = None,
+                 concurrency: Optional[int] = None):
+        # None -> the process-wide Gemini service from the registry
+        self._gemini_service = gemini_service
+        self.window = (window_ms if window_ms is not None else getattr(settings, 'AI_BATCH_WINDOW_MS', 50)) / 1000
+        self.max_size = max_size or getattr(settings, 'AI_BATCH_MAX_SIZE', 8)
+        self.concurrency = concurrency or getattr(settings, 'AI_BATCH_CONCURRENCY', 4)
+        self.timeout = getattr(settings, 'AI_BATCH_TIMEOUT_SECONDS', 120)
+
+        self._pending: List[Tuple[Dict, Future]] = []
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._counts = {'submitted': 0, 'batches': 0, 'batched_items': 0, 'single_calls': 0, 'fallbacks': 0}
+
+    def _gemini(self):
+        if self._gemini_service is not None:
+            return self._gemini_service
+        from .registry import ai_registry
+        return ai_registry.get('gemini')
+
+    def _start(self):
+        """Start the collector thread and the pool that runs model calls (idempotent)"""
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ai-batch')
+        self._thread = threading.Thread(target=self._collect_loop, name='ai-batch-collector', daemon=True)
+        self._thread.start()
+
+    def submit(self, description, image_paths=None, disaster_type=None, location=None, use_cache=True,
+               image_data=None) -> Future:
+        """Queue one analysis; the returned future resolves to the same dict analyze_emergency_situation returns"""
+        future = Future()
+        item = {'description': description, 'image_paths': image_paths, 'disaster_type': disaster_type,
+                'location': location, 'use_cache': use_cache, 'image_data': image_data}
+        with self._condition:
+            self._start()
+            self._pending.append((item, future))
+            self._counts['submitted'] += 1
+            self._condition.notify()
+        return future
+
+    def analyze(self, description, image_paths=None, disaster_type=None, location=None, use_cache=True,
+                image_data=None) -> Dict:
+        """Blocking submit(): wait for the batch containing this analysis"""
+        return self.submit(description, image_paths, disaster_type, location, use_cache, image_data).result(self.timeout)
+
+    def _collect_loop(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                # The window starts with the first waiting item and closes early once the batch is full
+                deadline = time.monotonic() + self.window
+                while len(self._pending) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._pending[:self.max_size]
+                del self._pending[:self.max_size]
+            self._executor.submit(self._process, batch)
+
+    def _process(self, batch: List[Tuple[Dict, Future]]):
+        try:
+            gemini = self._gemini()
+            if gemini is None:
+                raise RuntimeError('Gemini service is not available')
+
+            items = [item for item, _ in batch]
+            # Callers that asked to bypass the cache get it bypassed for the whole batch they land in
+            use_cache = all(item['use_cache'] for item in items)
+            if len(batch) == 1:
+                results = [None]
+                self._count('single_calls')
+            else:
+                results = gemini.analyze_emergency_batch(items, use_cache=use_cache)
+                self._count('batches')
+                self._count('batched_items', len(batch))
+
+            for (item, future), result in zip(batch, results):
+                if result is None:
+                    if len(batch) > 1:
+                        self._count('fallbacks')
+                    result = gemini.analyze_emergency_situation(
+                        description=item['description'],
+                        image_paths=item['image_paths'],
+                        disaster_type=item['disaster_type'],
+                        location=item['location'],
+                        use_cache=item['use_cache'],
+                        image_data=item['image_data']
+                    )
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"AI analysis batch failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._condition:
+            self._counts[name] += amount
+
+    def stats(self) -> Dict:
+        """Submission, batch and fallback counters plus the current backlog"""
+        with self._condition:
+            counts = dict(self._counts)
+            waiting = len(self._pending)
+        return {
+            'window_ms': round(self.window * 1000, 1),
+            'max_size': self.max_size,
+            'waiting': waiting,
+            **counts,
+            'avg_batch_size': round(counts['batched_items'] / counts['batches'], 2) if counts['batches'] else None,
+        }
+
+
+# Global instance
+analysis_batcher = AnalysisBatcher()
@@ -0,0 +1,164 @@
+"""
+Content-addressed cache for Gemini results
+Keys are a sha256 over the request kind, prompt, image bytes, disaster type and
+location, so resubmitting the same media and text reuses the earlier answer.
+Lookups go to an in-process LRU first, then to the ai_analysis_cache MongoDB
+collection whose documents expire through a TTL index.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from django.conf import settings
+from mongodb_integration.connection import mongo_connection
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLLECTION = 'ai_analysis_cache'
+
+
+def cache_key(kind: str, parts: Iterable, disaster_type=None, location=None) -> str:
+    """sha256 over the request kind, prompt/content parts (str or bytes) and context"""
+    digest = hashlib.sha256()
+    for part in [kind, disaster_type or '', location or '', *parts]:
+        data = part if isinstance(part, bytes) else str(part).encode('utf-8')
+        # Length prefix keeps ('ab', 'c') and ('a', 'bc') apart
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier (memory LRU + MongoDB TTL) cache of model results"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'AI_ANALYSIS_CACHE_ENABLED', True)
+        self.max_entries = getattr(settings, 'AI_ANALYSIS_CACHE_MAX_ENTRIES', 1000)
+        self.ttl_seconds = getattr(settings, 'AI_ANALYSIS_CACHE_TTL_SECONDS', 7 * 24 * 3600)
+
+        self.client = None
+        self.collection = None
+        self._connected = False
+        self._lock = threading.Lock()
+
+        # key -> (expires_at monotonic, result)
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._counts = {'memory_hits': 0, 'mongodb_hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0}
+
+    def _connect(self):
+        """Connect to MongoDB on first use; the memory tier keeps working without it"""
+        if self._connected:
+            return
+        with self._lock:
+            if self._connected:
+                return
+            try:
+                if not mongo_connection.ping(timeout=5):
+                    raise ConnectionError('MongoDB is not reachable')
+                self.client = mongo_connection.client
+                self.collection = mongo_connection.get_database()[CACHE_COLLECTION]
+            except Exception as e:
+                logger.warning(f"AI analysis cache running memory-only: {e}")
+                self.client = None
+                self.collection = None
+            self._connected = True
+
+    def _after_fork(self):
+        """Re-connect lazily in a forked child instead of using the parent's client"""
+        self.client = None
+        self.collection = None
+        self._connected = False
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _remember(self, key: str, result: Dict, ttl_seconds: float):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + ttl_seconds, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str, use_cache: bool = True) -> Optional[Dict]:
+        """Cached result for a key, or None on a miss (or when bypassed)"""
+        if not (self.enabled and use_cache):
+            self._count('bypassed')
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._memory.move_to_end(key)
+                    self._counts['memory_hits'] += 1
+                    return copy.deepcopy(entry[1])
+                del self._memory[key]
+
+        self._connect()
+        if self.collection is not None:
+            try:
+                document = self.collection.find_one({'_id': key, 'expires_at': {'$gt': datetime.utcnow()}})
+            except Exception as e:
+                logger.error(f"Error reading AI analysis cache: {e}")
+                document = None
+            if document:
+                remaining = (document['expires_at'] - datetime.utcnow()).total_seconds()
+                self._remember(key, document['result'], remaining)
+                self._count('mongodb_hits')
+                return copy.deepcopy(document['result'])
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, result: Dict, kind: str = '', use_cache: bool = True):
+        """Store a result in both tiers"""
+        if not (self.enabled and use_cache):
+            return
+        result = copy.deepcopy(result)
+        self._remember(key, result, self.ttl_seconds)
+        self._count('stores')
+
+        self._connect()
+        if self.collection is not None:
+            now = datetime.utcnow()
+            try:
+                self.collection.replace_one(
+                    {'_id': key},
+                    {'_id': key, 'kind': kind, 'result': result, 'created_at': now,
+                     'expires_at': now + timedelta(seconds=self.ttl_seconds)},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error writing AI analysis cache: {e}")
+
+    def clear(self):
+        """Empty the memory tier (the MongoDB tier expires on its own)"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and the memory tier size"""
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._memory)
+        lookups = counts['memory_hits'] + counts['mongodb_hits'] + counts['misses']
+        hits = counts['memory_hits'] + counts['mongodb_hits']
+        return {
+            'enabled': self.enabled,
+            'backend': 'mongodb' if self.collection is not None else 'memory',
+            'memory_entries': size,
+            'max_entries': self.max_entries,
+            **counts,
+            'hit_rate': round(hits / lookups, 3) if lookups else None,
+        }
+
+
+# Global instance
+ai_analysis_cache = AnalysisCache()
+mongo_connection.after_fork(ai_analysis_cache._after_fork)
@@ -1,12 +1,94 @@
+import asyncio
+import functools
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from django.conf import settings
 import base64
 from PIL import Image
 import io
+import json
+from .cache import ai_analysis_cache, cache_key
+from .image_metadata import read_image_metadata
+from .keywords import KEYWORD_GROUPS, scan_text
+
+ANALYSIS_PROMPT = """
+            You are an emergency response AI analyst. Analyze the following emergency situation and provide:
+            
+            1. Emergency Level Assessment (LOW/MEDIUM/HIGH/CRITICAL)
+            2. Suggested Priority Level (LOW/MEDIUM/HIGH/CRITICAL)
+            3. Confidence Score (0.0-1.0)
+            4. Fraud Risk Assessment (0.0-1.0, where 1.0 is high fraud risk)
+            5. Key Observations
+            6. Recommended Actions
+            
+            Respond in JSON format:
+            {
+                "emergency_level": "HIGH",
+                "priority": "HIGH", 
+                "confidence": 0.85,
+                "fraud_score": 0.15,
+                "observations": ["Key observation 1", "Key observation 2"],
+                "recommendations": ["Action 1", "Action 2"],
+                "is_emergency": true
+            }
+            """
+
+BATCH_ANALYSIS_PROMPT = """
+            You are an emergency response AI analyst. Analyze each of the {count} emergency reports below independently.
+            For every report assess the emergency level and priority (LOW/MEDIUM/HIGH/CRITICAL), a confidence score (0.0-1.0),
+            a fraud risk score (0.0-1.0, where 1.0 is high fraud risk), key observations and recommended actions.
+            
+            Respond with only a JSON array holding exactly one object per report, in any order, each with the report "id":
+            [{{"id": 0, "emergency_level": "HIGH", "priority": "HIGH", "confidence": 0.85, "fraud_score": 0.15,
+              "observations": ["Key observation 1"], "recommendations": ["Action 1"], "is_emergency": true}}]
+            """
+
+
+_call_executor = None
+_call_executor_lock = threading.Lock()
+
+
+def run_model_call(func, *args, **kwargs):
+    """Awaitable running a blocking model call on the shared AI call pool
+    Unlike asyncio.to_thread, an event loop that gave up on the call (timeout) is not kept
+    open until it finishes, because asyncio.run only waits for its own default executor.
+    """
+    global _call_executor
+    if _call_executor is None:
+        with _call_executor_lock:
+            if _call_executor is None:
+                _call_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'AI_CALL_THREADS', 16),
+                                                    thread_name_prefix='ai-call')
+    return asyncio.get_running_loop().run_in_executor(_call_executor, functools.partial(func, *args, **kwargs))
+
+
+def read_image_bytes(image_path):
+    """Raw bytes of an image file"""
+    with open(image_path, 'rb') as image_file:
+        return image_file.read()
+
+
+async def load_images_async(image_paths):
+    """Read image files concurrently in worker threads; unreadable files come back as None"""
+    async def load(image_path):
+        try:
+            return await asyncio.to_thread(read_image_bytes, image_path)
+        except Exception as e:
+            print(f"Error loading image {image_path}: {e}")
+            return None
+    
+    return list(await asyncio.gather(*(load(image_path) for image_path in image_paths or [])))
+
 
 class GeminiDescriptionService:
-    def __init__(self):
+    def __init__(self, model=None):
+        # A model can be injected (e.g. a local stub for benchmarks); otherwise use the Gemini API
+        if model is not None:
+            self.api_key = None
+            self.model = model
+            return
         # Initialize Gemini API with the provided API key from settings
         self.api_key = getattr(settings, 'GEMINI_API_KEY', None)
         if not self.api_key:
@@ -14,39 +96,52 @@ class GeminiDescriptionService:
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-1.5-flash')
         
-    def generate_description_from_image(self, image_path, disaster_type=None, location=None):
+    def generate_description_from_image(self, image_path, disaster_type=None, location=None, use_cache=True, image_data=None):
         """
         Generate emergency description from image using Gemini AI with enhanced confidence calculation
+        Results are cached by image content + prompt; use_cache=False forces a fresh model call.
+        image_data: the file's bytes when the caller already loaded them
         """
         try:
             # Load and process image
-            with open(image_path, 'rb') as image_file:
-                image_data = image_file.read()
+            if image_data is None:
+                image_data = read_image_bytes(image_path)
             
             # Create prompt for emergency description generation
             prompt = self._create_emergency_prompt(disaster_type, location)
             
+            key = cache_key('image_description', [prompt, image_data], disaster_type, location)
+            cached = ai_analysis_cache.get(key, use_cache)
+            if cached is not None:
+                return cached
+            
             # Generate description using Gemini
             response = self.model.generate_content([prompt, image_data])
             
             if response.text:
+                # Header metadata is read once and shared by every image scoring function
+                metadata = read_image_metadata(image_path, image_data)
+                
                 # Calculate dynamic confidence based on multiple factors
                 confidence = self._calculate_image_confidence(
                     response.text, 
                     image_path, 
                     disaster_type, 
-                    location
+                    location,
+                    metadata
                 )
                 
-                return {
+                result = {
                     'success': True,
                     'description': response.text.strip(),
                     'confidence': confidence,
                     'source': 'gemini_ai',
                     'disaster_type_suggested': self._extract_disaster_type(response.text),
                     'priority_suggested': self._extract_priority(response.text),
-                    'confidence_factors': self._get_confidence_factors(response.text, image_path, disaster_type, location)
+                    'confidence_factors': self._get_confidence_factors(response.text, image_path, disaster_type, location, metadata)
                 }
+                ai_analysis_cache.set(key, result, 'image_description', use_cache)
+                return result
             else:
                 return self._fallback_response()
                 
@@ -54,9 +149,10 @@ class GeminiDescriptionService:
             print(f"Error in Gemini description generation: {e}")
             return self._fallback_response()
     
-    def generate_description_from_text(self, user_description, disaster_type=None, location=None):
+    def generate_description_from_text(self, user_description, disaster_type=None, location=None, use_cache=True):
         """
         Enhance user description using Gemini AI with enhanced confidence calculation
+        Results are cached by prompt; use_cache=False forces a fresh model call.
         """
         try:
             prompt = f"""
@@ -78,6 +174,11 @@ class GeminiDescriptionService:
             Keep the enhanced description concise but informative (2-3 sentences max).
             """
             
+            key = cache_key('text_description', [prompt], disaster_type, location)
+            cached = ai_analysis_cache.get(key, use_cache)
+            if cached is not None:
+                return cached
+            
             response = self.model.generate_content(prompt)
             
             if response.text:
@@ -89,7 +190,7 @@ class GeminiDescriptionService:
                     location
                 )
                 
-                return {
+                result = {
                     'success': True,
                     'description': response.text.strip(),
                     'confidence': confidence,
@@ -99,6 +200,8 @@ class GeminiDescriptionService:
                     'priority_suggested': self._extract_priority(response.text),
                     'confidence_factors': self._get_text_confidence_factors(user_description, response.text, disaster_type, location)
                 }
+                ai_analysis_cache.set(key, result, 'text_description', use_cache)
+                return result
             else:
                 return self._fallback_response()
                 
@@ -106,79 +209,34 @@ class GeminiDescriptionService:
             print(f"Error in Gemini text enhancement: {e}")
             return self._fallback_response()
     
-    def analyze_emergency_situation(self, description, image_paths=None, disaster_type=None, location=None):
+    def analyze_emergency_situation(self, description, image_paths=None, disaster_type=None, location=None, use_cache=True,
+                                    image_data=None):
         """
         Comprehensive emergency analysis using Gemini AI
+        Results are cached by description + image content; use_cache=False forces a fresh model call.
+        image_data: bytes of the images when the caller already loaded them (image_paths is then not read)
         """
         try:
-            # Prepare content for analysis
-            content_parts = []
-            
-            # Add text description
-            if description:
-                content_parts.append(f"Emergency Description: {description}")
+            prompt = ANALYSIS_PROMPT
+            content_parts = self._analysis_content(description, image_paths, disaster_type, location, image_data)
             
-            # Add disaster type and location context
-            if disaster_type:
-                content_parts.append(f"Reported Disaster Type: {disaster_type}")
-            if location:
-                content_parts.append(f"Location: {location}")
-            
-            # Add images if available
-            if image_paths:
-                for image_path in image_paths:
-                    try:
-                        with open(image_path, 'rb') as image_file:
-                            image_data = image_file.read()
-                        content_parts.append(image_data)
-                    except Exception as e:
-                        print(f"Error loading image {image_path}: {e}")
-            
-            # Create comprehensive analysis prompt
-            prompt = """
-            You are an emergency response AI analyst. Analyze the following emergency situation and provide:
-            
-            1. Emergency Level Assessment (LOW/MEDIUM/HIGH/CRITICAL)
-            2. Suggested Priority Level (LOW/MEDIUM/HIGH/CRITICAL)
-            3. Confidence Score (0.0-1.0)
-            4. Fraud Risk Assessment (0.0-1.0, where 1.0 is high fraud risk)
-            5. Key Observations
-            6. Recommended Actions
-            
-            Respond in JSON format:
-            {
-                "emergency_level": "HIGH",
-                "priority": "HIGH", 
-                "confidence": 0.85,
-                "fraud_score": 0.15,
-                "observations": ["Key observation 1", "Key observation 2"],
-                "recommendations": ["Action 1", "Action 2"],
-                "is_emergency": true
-            }
-            """
+            key = cache_key('emergency_analysis', [prompt] + content_parts, disaster_type, location)
+            cached = ai_analysis_cache.get(key, use_cache)
+            if cached is not None:
+                return cached
             
             # Generate analysis
             response = self.model.generate_content([prompt] + content_parts)
             
             if response.text:
                 # Try to parse JSON response
-                import json
                 try:
-                    analysis_data = json.loads(response.text.strip())
-                    return {
-                        'success': True,
-                        'is_emergency': analysis_data.get('is_emergency', True),
-                        'confidence': analysis_data.get('confidence', 0.8),
-                        'fraud_score': analysis_data.get('fraud_score', 0.1),
-                        'emergency_level': analysis_data.get('emergency_level', 'MEDIUM'),
-                        'priority': analysis_data.get('priority', 'MEDIUM'),
-                        'observations': analysis_data.get('observations', []),
-                        'recommendations': analysis_data.get('recommendations', []),
-                        'source': 'gemini_ai_analysis'
-                    }
+                    result = self._analysis_from_json(json.loads(response.text.strip()))
                 except json.JSONDecodeError:
                     # Fallback if JSON parsing fails
-                    return self._parse_text_response(response.text)
+                    result = self._parse_text_response(response.text)
+                ai_analysis_cache.set(key, result, 'emergency_analysis', use_cache)
+                return result
             else:
                 return self._fallback_analysis()
                 
@@ -186,6 +244,121 @@ class GeminiDescriptionService:
             print(f"Error in Gemini emergency analysis: {e}")
             return self._fallback_analysis()
     
+    async def analyze_emergency_situation_async(self, description, image_paths=None, disaster_type=None, location=None,
+                                                use_cache=True, image_data=None, timeout=None):
+        """
+        analyze_emergency_situation without blocking the event loop
+        Images are loaded concurrently (unless image_data is given) and the model call is bounded by
+        `timeout` seconds (AI_CALL_TIMEOUT_SECONDS by default); a timeout returns the fallback analysis.
+        """
+        if image_data is None and image_paths:
+            image_data = await load_images_async(image_paths)
+        timeout = timeout or getattr(settings, 'AI_CALL_TIMEOUT_SECONDS', 30)
+        try:
+            return await asyncio.wait_for(
+                run_model_call(self.analyze_emergency_situation, description, image_paths, disaster_type, location,
+                               use_cache, image_data),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            print(f"Gemini emergency analysis timed out after {timeout}s")
+            return self._fallback_analysis()
+    
+    def analyze_emergency_batch(self, items, use_cache=True):
+        """
+        Analyze several emergency situations with one model call
+        items: [{'description', 'image_paths', 'disaster_type', 'location', 'image_data'}, ...]
+        Returns one result per item, or None where the answer could not be matched back to the item.
+        """
+        results = [None] * len(items)
+        keys = []
+        content_parts = []
+        pending = []
+        for index, item in enumerate(items):
+            parts = self._analysis_content(item.get('description'), item.get('image_paths'),
+                                           item.get('disaster_type'), item.get('location'), item.get('image_data'))
+            # Same key as a single analysis so both paths share cached answers
+            key = cache_key('emergency_analysis', [ANALYSIS_PROMPT] + parts, item.get('disaster_type'), item.get('location'))
+            keys.append(key)
+            cached = ai_analysis_cache.get(key, use_cache)
+            if cached is not None:
+                results[index] = cached
+                continue
+            pending.append(index)
+            content_parts.append(f"Report {index}:")
+            content_parts.extend(parts)
+        
+        if not pending:
+            return results
+        
+        try:
+            response = self.model.generate_content([BATCH_ANALYSIS_PROMPT.format(count=len(pending))] + content_parts)
+            answers = json.loads(self._strip_code_fence(response.text))
+        except Exception as e:
+            print(f"Error in Gemini batch analysis: {e}")
+            return results
+        
+        if not isinstance(answers, list):
+            return results
+        for analysis_data in answers:
+            try:
+                index = int(analysis_data.get('id'))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if index in pending and results[index] is None:
+                results[index] = self._analysis_from_json(analysis_data)
+                ai_analysis_cache.set(keys[index], results[index], 'emergency_analysis', use_cache)
+        return results
+    
+    def _analysis_content(self, description, image_paths, disaster_type, location, image_data=None):
+        """Content parts (text and image bytes) describing one emergency situation"""
+        content_parts = []
+        
+        # Add text description
+        if description:
+            content_parts.append(f"Emergency Description: {description}")
+        
+        # Add disaster type and location context
+        if disaster_type:
+            content_parts.append(f"Reported Disaster Type: {disaster_type}")
+        if location:
+            content_parts.append(f"Location: {location}")
+        
+        # Add images if available (already-loaded bytes take precedence over re-reading the files)
+        if image_data is not None:
+            content_parts.extend(data for data in image_data if data)
+        elif image_paths:
+            for image_path in image_paths:
+                try:
+                    content_parts.append(read_image_bytes(image_path))
+                except Exception as e:
+                    print(f"Error loading image {image_path}: {e}")
+        
+        return content_parts
+    
+    def _analysis_from_json(self, analysis_data):
+        """Analysis result from the model's JSON answer for one situation"""
+        return {
+            'success': True,
+            'is_emergency': analysis_data.get('is_emergency', True),
+            'confidence': analysis_data.get('confidence', 0.8),
+            'fraud_score': analysis_data.get('fraud_score', 0.1),
+            'emergency_level': analysis_data.get('emergency_level', 'MEDIUM'),
+            'priority': analysis_data.get('priority', 'MEDIUM'),
+            'observations': analysis_data.get('observations', []),
+            'recommendations': analysis_data.get('recommendations', []),
+            'source': 'gemini_ai_analysis'
+        }
+    
+    def _strip_code_fence(self, text):
+        """Model JSON answers are sometimes wrapped in a ```json fence"""
+        text = (text or '').strip()
+        if text.startswith('```'):
+            text = text.split('\n', 1)[1] if '\n' in text else ''
+            if text.rstrip().endswith('```'):
+                text = text.rstrip()[:-3]
+        return text.strip()
+    
     def _create_emergency_prompt(self, disaster_type, location):
         """Create a prompt for emergency description generation with disaster-specific guidance"""
         base_prompt = """
@@ -316,7 +489,7 @@ class GeminiDescriptionService:
             'error': 'Gemini API unavailable'
         }
     
-    def _calculate_image_confidence(self, description, image_path, disaster_type=None, location=None):
+    def _calculate_image_confidence(self, description, image_path, disaster_type=None, location=None, metadata=None):
         """
         Calculate dynamic confidence based on multiple factors
         """
@@ -328,7 +501,7 @@ class GeminiDescriptionService:
             quality_boost = description_quality * 0.15  # Up to 15% boost
             
             # Factor 2: Image quality assessment
-            image_quality = self._assess_image_quality(image_path)
+            image_quality = self._assess_image_quality(image_path, metadata)
             image_boost = image_quality * 0.10  # Up to 10% boost
             
             # Factor 3: Context alignment (disaster type + location)
@@ -354,9 +527,10 @@ class GeminiDescriptionService:
         """
         try:
             score = 0.0
+            scan = scan_text(description)
             
             # Length factor (detailed descriptions are better)
-            word_count = len(description.split())
+            word_count = scan.word_count
             if word_count >= 20:
                 score += 0.3
             elif word_count >= 10:
@@ -365,23 +539,10 @@ class GeminiDescriptionService:
                 score += 0.1
             
             # Specificity indicators
-            specific_indicators = [
-                'severity', 'urgent', 'critical', 'immediate', 'dangerous',
-                'injured', 'trapped', 'damage', 'destruction', 'evacuation',
-                'emergency services', 'rescue', 'medical', 'fire', 'flood'
-            ]
-            
-            found_indicators = sum(1 for indicator in specific_indicators if indicator.lower() in description.lower())
-            score += min(0.4, found_indicators * 0.05)
+            score += min(0.4, scan.count('description_specific') * 0.05)
             
             # Professional language indicators
-            professional_indicators = [
-                'situation', 'incident', 'emergency', 'response', 'assistance',
-                'authorities', 'services', 'personnel', 'equipment'
-            ]
-            
-            found_professional = sum(1 for indicator in professional_indicators if indicator.lower() in description.lower())
-            score += min(0.3, found_professional * 0.03)
+            score += min(0.3, scan.count('professional') * 0.03)
             
             return min(1.0, score)
             
@@ -389,55 +550,55 @@ class GeminiDescriptionService:
             print(f"Error assessing description quality: {e}")
             return 0.5
     
-    def _assess_image_quality(self, image_path):
+    def _assess_image_quality(self, image_path, metadata=None):
         """
-        Assess the quality of the uploaded image
+        Assess the quality of the uploaded image from its header metadata
         """
         try:
-            from PIL import Image
-            import os
-            
             score = 0.0
             
             # Check if image exists and is readable
-            if not os.path.exists(image_path):
-                return 0.0
+            if metadata is None:
+                if not os.path.exists(image_path):
+                    return 0.0
+                metadata = read_image_metadata(image_path)
+                if metadata is None:
+                    return 0.3
+            
+            width, height = metadata['width'], metadata['height']
+            
+            # Resolution factor
+            total_pixels = width * height
+            if total_pixels >= 2000000:  # 2MP+
+                score += 0.4
+            elif total_pixels >= 1000000:  # 1MP+
+                score += 0.3
+            elif total_pixels >= 500000:  # 0.5MP+
+                score += 0.2
+            else:
+                score += 0.1
             
-            with Image.open(image_path) as img:
-                width, height = img.size
-                
-                # Resolution factor
-                total_pixels = width * height
-                if total_pixels >= 2000000:  # 2MP+
-                    score += 0.4
-                elif total_pixels >= 1000000:  # 1MP+
-                    score += 0.3
-                elif total_pixels >= 500000:  # 0.5MP+
-                    score += 0.2
-                else:
-                    score += 0.1
-                
-                # Aspect ratio factor (closer to standard ratios is better)
-                aspect_ratio = width / height
-                if 0.7 <= aspect_ratio <= 1.4:  # Square-ish or standard ratios
-                    score += 0.2
-                elif 0.5 <= aspect_ratio <= 2.0:  # Acceptable ratios
-                    score += 0.1
-                
-                # File size factor (larger files often have more detail)
-                file_size = os.path.getsize(image_path)
-                if file_size >= 1000000:  # 1MB+
-                    score += 0.2
-                elif file_size >= 500000:  # 500KB+
-                    score += 0.1
-                elif file_size >= 100000:  # 100KB+
-                    score += 0.05
-                
-                # Color mode factor
-                if img.mode in ['RGB', 'RGBA']:
-                    score += 0.2
-                elif img.mode == 'L':  # Grayscale
-                    score += 0.1
+            # Aspect ratio factor (closer to standard ratios is better)
+            aspect_ratio = width / height
+            if 0.7 <= aspect_ratio <= 1.4:  # Square-ish or standard ratios
+                score += 0.2
+            elif 0.5 <= aspect_ratio <= 2.0:  # Acceptable ratios
+                score += 0.1
+            
+            # File size factor (larger files often have more detail)
+            file_size = metadata['file_size']
+            if file_size >= 1000000:  # 1MB+
+                score += 0.2
+            elif file_size >= 500000:  # 500KB+
+                score += 0.1
+            elif file_size >= 100000:  # 100KB+
+                score += 0.05
+            
+            # Color mode factor
+            if metadata['mode'] in ['RGB', 'RGBA']:
+                score += 0.2
+            elif metadata['mode'] == 'L':  # Grayscale
+                score += 0.1
             
             return min(1.0, score)
             
@@ -451,35 +612,18 @@ class GeminiDescriptionService:
         """
         try:
             score = 0.0
-            description_lower = description.lower()
+            scan = scan_text(description)
             
             # Disaster type alignment
-            if disaster_type:
-                disaster_keywords = {
-                    'FLOOD': ['water', 'flood', 'flooding', 'rain', 'overflow', 'drowning'],
-                    'FIRE': ['fire', 'smoke', 'burning', 'flames', 'heat', 'smoke'],
-                    'EARTHQUAKE': ['earthquake', 'shaking', 'tremor', 'ground', 'building', 'collapse'],
-                    'MEDICAL': ['medical', 'injured', 'hurt', 'pain', 'hospital', 'ambulance'],
-                    'ACCIDENT': ['accident', 'crash', 'collision', 'vehicle', 'car', 'road'],
-                    'CYCLONE': ['wind', 'storm', 'cyclone', 'hurricane', 'tornado', 'damage'],
-                    'LANDSLIDE': ['landslide', 'mud', 'rock', 'slope', 'mountain', 'debris']
-                }
-                
-                if disaster_type in disaster_keywords:
-                    keywords = disaster_keywords[disaster_type]
-                    found_keywords = sum(1 for keyword in keywords if keyword in description_lower)
-                    score += min(0.5, found_keywords * 0.1)
+            if disaster_type and f'disaster:{disaster_type}' in KEYWORD_GROUPS:
+                score += min(0.5, scan.count(f'disaster:{disaster_type}') * 0.1)
             
             # Location context alignment
             if location:
-                location_indicators = ['location', 'area', 'street', 'building', 'near', 'at', 'in']
-                found_location = sum(1 for indicator in location_indicators if indicator in description_lower)
-                score += min(0.3, found_location * 0.05)
+                score += min(0.3, scan.count('location_context') * 0.05)
             
             # General emergency context
-            emergency_context = ['emergency', 'urgent', 'help', 'assistance', 'rescue', 'danger']
-            found_emergency = sum(1 for context in emergency_context if context in description_lower)
-            score += min(0.2, found_emergency * 0.03)
+            score += min(0.2, scan.count('emergency_context') * 0.03)
             
             return min(1.0, score)
             
@@ -493,22 +637,16 @@ class GeminiDescriptionService:
         """
         try:
             score = 0.0
-            description_lower = description.lower()
+            scan = scan_text(description)
             
             # High-priority emergency indicators
-            high_priority = ['critical', 'urgent', 'immediate', 'life-threatening', 'severe', 'dangerous']
-            high_count = sum(1 for indicator in high_priority if indicator in description_lower)
-            score += min(0.4, high_count * 0.1)
+            score += min(0.4, scan.count('high_priority') * 0.1)
             
             # Medium-priority emergency indicators
-            medium_priority = ['emergency', 'help', 'assistance', 'rescue', 'injured', 'damage']
-            medium_count = sum(1 for indicator in medium_priority if indicator in description_lower)
-            score += min(0.3, medium_count * 0.05)
+            score += min(0.3, scan.count('medium_priority') * 0.05)
             
             # Action indicators
-            action_indicators = ['need', 'require', 'must', 'should', 'evacuate', 'respond']
-            action_count = sum(1 for indicator in action_indicators if indicator in description_lower)
-            score += min(0.3, action_count * 0.05)
+            score += min(0.3, scan.count('action') * 0.05)
             
             return min(1.0, score)
             
@@ -516,22 +654,26 @@ class GeminiDescriptionService:
             print(f"Error assessing emergency indicators: {e}")
             return 0.3
     
-    def _get_confidence_factors(self, description, image_path, disaster_type=None, location=None):
+    def _get_confidence_factors(self, description, image_path, disaster_type=None, location=None, metadata=None):
         """
         Get detailed confidence factors for transparency
         """
         try:
+            description_quality = self._assess_description_quality(description)
+            image_quality = self._assess_image_quality(image_path, metadata)
+            context_alignment = self._assess_context_alignment(description, disaster_type, location)
+            emergency_indicators = self._assess_emergency_indicators(description)
             return {
-                'description_quality': self._assess_description_quality(description),
-                'image_quality': self._assess_image_quality(image_path),
-                'context_alignment': self._assess_context_alignment(description, disaster_type, location),
-                'emergency_indicators': self._assess_emergency_indicators(description),
+                'description_quality': description_quality,
+                'image_quality': image_quality,
+                'context_alignment': context_alignment,
+                'emergency_indicators': emergency_indicators,
                 'base_confidence': 0.75,
                 'total_boost': (
-                    self._assess_description_quality(description) * 0.15 +
-                    self._assess_image_quality(image_path) * 0.10 +
-                    self._assess_context_alignment(description, disaster_type, location) * 0.10 +
-                    self._assess_emergency_indicators(description) * 0.05
+                    description_quality * 0.15 +
+                    image_quality * 0.10 +
+                    context_alignment * 0.10 +
+                    emergency_indicators * 0.05
                 )
             }
         except Exception as e:
@@ -576,10 +718,12 @@ class GeminiDescriptionService:
         """
         try:
             score = 0.0
+            original_scan = scan_text(original)
+            enhanced_scan = scan_text(enhanced)
             
             # Length improvement
-            original_words = len(original.split())
-            enhanced_words = len(enhanced.split())
+            original_words = original_scan.word_count
+            enhanced_words = enhanced_scan.word_count
             
             if enhanced_words > original_words * 1.5:  # 50% more words
                 score += 0.3
@@ -589,26 +733,15 @@ class GeminiDescriptionService:
                 score += 0.1
             
             # Professional language improvement
-            professional_terms = [
-                'emergency', 'situation', 'incident', 'response', 'assistance',
-                'authorities', 'services', 'personnel', 'equipment', 'immediate',
-                'critical', 'urgent', 'severe', 'dangerous'
-            ]
-            
-            original_professional = sum(1 for term in professional_terms if term.lower() in original.lower())
-            enhanced_professional = sum(1 for term in professional_terms if term.lower() in enhanced.lower())
+            original_professional = original_scan.count('enhancement_professional')
+            enhanced_professional = enhanced_scan.count('enhancement_professional')
             
             if enhanced_professional > original_professional:
                 score += min(0.4, (enhanced_professional - original_professional) * 0.1)
             
             # Specificity improvement
-            specific_terms = [
-                'severity', 'injured', 'trapped', 'damage', 'destruction',
-                'evacuation', 'rescue', 'medical', 'fire', 'flood', 'earthquake'
-            ]
-            
-            original_specific = sum(1 for term in specific_terms if term.lower() in original.lower())
-            enhanced_specific = sum(1 for term in specific_terms if term.lower() in enhanced.lower())
+            original_specific = original_scan.count('enhancement_specific')
+            enhanced_specific = enhanced_scan.count('enhancement_specific')
             
             if enhanced_specific > original_specific:
                 score += min(0.3, (enhanced_specific - original_specific) * 0.1)
@@ -625,21 +758,19 @@ class GeminiDescriptionService:
         """
         try:
             score = 0.0
+            original_scan = scan_text(original)
+            enhanced_scan = scan_text(enhanced)
             
             # Emergency urgency indicators
-            urgency_indicators = ['urgent', 'critical', 'immediate', 'emergency', 'help', 'assistance']
-            
-            original_urgency = sum(1 for indicator in urgency_indicators if indicator.lower() in original.lower())
-            enhanced_urgency = sum(1 for indicator in urgency_indicators if indicator.lower() in enhanced.lower())
+            original_urgency = original_scan.count('urgency')
+            enhanced_urgency = enhanced_scan.count('urgency')
             
             if enhanced_urgency > original_urgency:
                 score += min(0.5, (enhanced_urgency - original_urgency) * 0.15)
             
             # Action indicators
-            action_indicators = ['need', 'require', 'must', 'should', 'evacuate', 'respond', 'call']
-            
-            original_actions = sum(1 for indicator in action_indicators if indicator.lower() in original.lower())
-            enhanced_actions = sum(1 for indicator in action_indicators if indicator.lower() in enhanced.lower())
+            original_actions = original_scan.count('action_or_call')
+            enhanced_actions = enhanced_scan.count('action_or_call')
             
             if enhanced_actions > original_actions:
                 score += min(0.5, (enhanced_actions - original_actions) * 0.1)
@@ -655,17 +786,21 @@ class GeminiDescriptionService:
         Get detailed confidence factors for text enhancement
         """
         try:
+            enhancement_quality = self._assess_enhancement_quality(original_description, enhanced_description)
+            original_quality = self._assess_description_quality(original_description)
+            context_alignment = self._assess_context_alignment(enhanced_description, disaster_type, location)
+            emergency_improvement = self._assess_emergency_improvement(original_description, enhanced_description)
             return {
-                'enhancement_quality': self._assess_enhancement_quality(original_description, enhanced_description),
-                'original_quality': self._assess_description_quality(original_description),
-                'context_alignment': self._assess_context_alignment(enhanced_description, disaster_type, location),
-                'emergency_improvement': self._assess_emergency_improvement(original_description, enhanced_description),
+                'enhancement_quality': enhancement_quality,
+                'original_quality': original_quality,
+                'context_alignment': context_alignment,
+                'emergency_improvement': emergency_improvement,
                 'base_confidence': 0.70,
                 'total_boost': (
-                    self._assess_enhancement_quality(original_description, enhanced_description) * 0.20 +
-                    self._assess_description_quality(original_description) * 0.10 +
-                    self._assess_context_alignment(enhanced_description, disaster_type, location) * 0.10 +
-                    self._assess_emergency_improvement(original_description, enhanced_description) * 0.10
+                    enhancement_quality * 0.20 +
+                    original_quality * 0.10 +
+                    context_alignment * 0.10 +
+                    emergency_improvement * 0.10
                 )
             }
         except Exception as e:
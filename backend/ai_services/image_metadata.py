@@ -0,0 +1,114 @@
+"""
+Image metadata for the AI heuristics
+Width, height, mode, format and byte size come from the image header only:
+PIL's Image.open is lazy and the pixels are never decoded. Results are cached
+by content hash (and by path/mtime/size so repeat lookups skip reading the file),
+so verify_image and the Gemini confidence scoring share one header parse.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from django.conf import settings
+from PIL import Image
+
+
+class ImageMetadataCache:
+    """Bounded LRU of image metadata keyed by sha256 of the file content"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or getattr(settings, 'AI_IMAGE_METADATA_CACHE_SIZE', 4096)
+        self._by_hash: 'OrderedDict[str, Dict]' = OrderedDict()
+        # (path, mtime_ns, size) -> content hash, so an unchanged file is not read again
+        self._by_file: 'OrderedDict[tuple, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'errors': 0}
+
+    def _lookup(self, content_hash: str) -> Optional[Dict]:
+        with self._lock:
+            metadata = self._by_hash.get(content_hash)
+            if metadata is not None:
+                self._by_hash.move_to_end(content_hash)
+                self._counts['hits'] += 1
+            return metadata
+
+    def _store(self, content_hash: str, metadata: Dict, file_key: Optional[tuple] = None):
+        with self._lock:
+            self._by_hash[content_hash] = metadata
+            self._by_hash.move_to_end(content_hash)
+            if file_key:
+                self._by_file[file_key] = content_hash
+                self._by_file.move_to_end(file_key)
+            for index in (self._by_hash, self._by_file):
+                while len(index) > self.max_entries:
+                    index.popitem(last=False)
+
+    def get(self, image_path: Optional[str] = None, image_data: Optional[bytes] = None) -> Optional[Dict]:
+        """Metadata for an image given as bytes and/or a path; None if it is missing or not an image"""
+        file_key = None
+        if image_data is None:
+            try:
+                stat = os.stat(image_path)
+            except (OSError, TypeError):
+                return None
+            file_key = (image_path, stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                content_hash = self._by_file.get(file_key)
+            if content_hash:
+                metadata = self._lookup(content_hash)
+                if metadata is not None:
+                    return metadata
+            try:
+                with open(image_path, 'rb') as image_file:
+                    image_data = image_file.read()
+            except OSError:
+                return None
+
+        content_hash = hashlib.sha256(image_data).hexdigest()
+        metadata = self._lookup(content_hash)
+        if metadata is not None:
+            if file_key:
+                self._store(content_hash, metadata, file_key)
+            return metadata
+
+        try:
+            # Header parse only: size/mode/format are known without loading the pixels
+            with Image.open(io.BytesIO(image_data)) as img:
+                width, height = img.size
+                metadata = {
+                    'width': width,
+                    'height': height,
+                    'mode': img.mode,
+                    'format': img.format,
+                    'file_size': len(image_data),
+                    'content_hash': content_hash,
+                }
+        except Exception:
+            with self._lock:
+                self._counts['errors'] += 1
+            return None
+
+        with self._lock:
+            self._counts['misses'] += 1
+        self._store(content_hash, metadata, file_key)
+        return metadata
+
+    def clear(self):
+        with self._lock:
+            self._by_hash.clear()
+            self._by_file.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._by_hash), 'max_entries': self.max_entries, **self._counts}
+
+
+# Global instance
+image_metadata_cache = ImageMetadataCache()
+
+
+def read_image_metadata(image_path: Optional[str] = None, image_data: Optional[bytes] = None) -> Optional[Dict]:
+    """{'width', 'height', 'mode', 'format', 'file_size', 'content_hash'} or None if unreadable"""
+    return image_metadata_cache.get(image_path, image_data)
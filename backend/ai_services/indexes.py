@@ -0,0 +1,50 @@
+"""
+Index declarations for the analysis_jobs and ai_analysis_cache collections
+"""
+from django.conf import settings
+from mongodb_integration.indexes import register_indexes
+from .cache import CACHE_COLLECTION
+from .job_queue import JOBS_COLLECTION
+
+JOB_INDEXES = [
+    {
+        'name': 'status_1_run_at_1',
+        'keys': [('status', 1), ('run_at', 1)],
+        'used_by': ['_claim', 'metrics'],
+    },
+    {
+        'name': 'status_1_lease_expires_at_1',
+        'keys': [('status', 1), ('lease_expires_at', 1)],
+        'options': {'sparse': True},
+        'used_by': ['_claim', '_reap_abandoned'],
+    },
+    {
+        'name': 'finished_at_ttl',
+        'keys': [('finished_at', 1)],
+        'options': {'expireAfterSeconds': getattr(settings, 'AI_JOB_RETENTION_SECONDS', 7 * 24 * 3600)},
+        'used_by': ['retention'],
+    },
+]
+
+JOB_QUERY_SHAPES = [
+    {'name': '_claim:queued', 'filter': {'status': 'queued', 'run_at': {'$lte': 0}}, 'sort': [('run_at', 1)], 'used_by': '_claim'},
+    {'name': '_claim:expired_lease', 'filter': {'status': 'running', 'lease_expires_at': {'$lt': 0}}, 'used_by': '_claim'},
+    {
+        'name': '_reap_abandoned',
+        'filter': {'status': 'running', 'lease_expires_at': {'$lt': 0}, '$expr': {'$gte': ['$attempts', '$max_attempts']}},
+        'used_by': '_reap_abandoned'
+    },
+]
+
+register_indexes(JOBS_COLLECTION, JOB_INDEXES, JOB_QUERY_SHAPES)
+
+CACHE_INDEXES = [
+    {
+        'name': 'expires_at_ttl',
+        'keys': [('expires_at', 1)],
+        'options': {'expireAfterSeconds': 0},
+        'used_by': ['retention'],
+    },
+]
+
+register_indexes(CACHE_COLLECTION, CACHE_INDEXES)
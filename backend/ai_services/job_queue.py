@@ -0,0 +1,396 @@
+"""
+Background job queue for AI analysis
+Jobs are stored in the MongoDB analysis_jobs collection so they survive restarts
+and can be claimed by any process; when MongoDB is unavailable, or a job is
+queued as local because it refers to this host's files, an in-process queue is
+used instead. A fixed pool of worker threads runs the registered
+handlers with retries and exponential backoff. A claimed MongoDB job holds a
+lease of AI_JOB_LEASE_SECONDS that a heartbeat extends while it runs; a job
+whose lease runs out (its worker died) is claimed again, or failed once its
+attempts are used up, and the old worker's late writes are discarded.
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from pymongo import ReturnDocument
+from mongodb_integration.connection import mongo_connection
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = 'analysis_jobs'
+
+# job type -> callable(payload) returning a JSON-serialisable result
+_HANDLERS: Dict[str, Callable[[Dict], Optional[Dict]]] = {}
+# job type -> callable(payload, error) run once a job has used up its attempts
+_FAILURE_HANDLERS: Dict[str, Callable[[Dict, str], None]] = {}
+
+
+def register_handler(job_type: str, handler: Callable[[Dict], Optional[Dict]],
+                     on_failure: Optional[Callable[[Dict, str], None]] = None):
+    """Register the function that processes jobs of a given type, and optionally a cleanup for failed ones"""
+    _HANDLERS[job_type] = handler
+    if on_failure is not None:
+        _FAILURE_HANDLERS[job_type] = on_failure
+
+
+class AnalysisJobQueue:
+    """MongoDB-backed job queue with an in-process fallback and a fixed worker pool"""
+
+    def __init__(self):
+        self.workers = getattr(settings, 'AI_JOB_WORKERS', 4)
+        self.max_attempts = getattr(settings, 'AI_JOB_MAX_ATTEMPTS', 3)
+        self.retry_backoff = getattr(settings, 'AI_JOB_RETRY_BACKOFF_SECONDS', 5)
+        self.lease_seconds = getattr(settings, 'AI_JOB_LEASE_SECONDS', 300)
+        self.poll_seconds = getattr(settings, 'AI_JOB_POLL_SECONDS', 2)
+
+        self.client = None
+        self.collection = None
+        self._connected = False
+        self._lock = threading.Lock()
+        self._threads = []
+        # MongoDB job id -> attempt number, for the jobs this process is running
+        self._active: Dict[str, int] = {}
+        self._next_reap = 0.0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+
+        # In-process fallback: (run_at, sequence, job_id) ordered by due time
+        self._local_queue = queue.PriorityQueue()
+        self._local_jobs: Dict[str, Dict] = {}
+        self._sequence = itertools.count()
+
+        # Metrics for this process
+        self._latencies_ms = deque(maxlen=1000)
+        self._counts = {'enqueued': 0, 'completed': 0, 'failed': 0, 'retried': 0}
+        self._running = 0
+        self._metrics_lock = threading.Lock()
+
+    def _connect(self):
+        """Connect to MongoDB on first use; fall back to the local queue if that fails"""
+        if self._connected:
+            return
+        with self._lock:
+            if self._connected:
+                return
+            try:
+                if not mongo_connection.ping(timeout=5):
+                    raise ConnectionError('MongoDB is not reachable')
+                self.client = mongo_connection.client
+                self.collection = mongo_connection.get_database()[JOBS_COLLECTION]
+                logger.info("AI job queue using MongoDB")
+            except Exception as e:
+                logger.warning(f"AI job queue falling back to in-process queue: {e}")
+                self.client = None
+                self.collection = None
+            self._connected = True
+
+    @property
+    def backend(self) -> str:
+        return 'mongodb' if self.collection is not None else 'local'
+
+    def _after_fork(self):
+        """Worker threads and the parent's connection do not survive a fork; start clean in the child
+
+        If the parent had started its workers (gunicorn --preload loads the WSGI app, and so
+        AI_JOB_WORKERS_AUTOSTART, in the master), the child starts its own.
+        """
+        was_running = bool(self._threads) and not self._stopping.is_set()
+        self.client = None
+        self.collection = None
+        self._connected = False
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._threads = []
+        self._active = {}
+        self._next_reap = 0.0
+        # The parent's in-process jobs stay with the parent; running them here too would duplicate them
+        self._local_queue = queue.PriorityQueue()
+        self._local_jobs = {}
+        self._running = 0
+        if was_running:
+            self.start()
+
+    def start(self):
+        """Start the worker pool (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'ai-job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat_loop, name='ai-job-heartbeat', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} AI job worker(s)")
+
+    def stop(self, timeout: float = 5):
+        """Ask the workers to exit after their current job"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, job_type: str, payload: Dict, local: bool = False) -> str:
+        """Queue a job and return its id; starts this process's workers if they should run it
+
+        local: keep the job in this process's queue even when MongoDB is available, for
+        payloads only this host can act on (e.g. paths of files on its disk).
+        """
+        self._connect()
+        now = datetime.utcnow()
+        job = {
+            '_id': uuid.uuid4().hex,
+            'type': job_type,
+            'payload': payload,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'run_at': now,
+            'created_at': now,
+            'updated_at': now,
+        }
+
+        stored = False
+        if self.collection is not None and not local:
+            try:
+                self.collection.insert_one(job)
+                stored = True
+            except Exception as e:
+                logger.error(f"Could not persist AI job, running it in-process: {e}")
+        if not stored:
+            self._local_jobs[job['_id']] = job
+            self._local_queue.put((now, next(self._sequence), job['_id']))
+
+        self._count('enqueued')
+        # In-process jobs can only run here; persisted ones are claimed by whichever processes run workers
+        if not stored or getattr(settings, 'AI_JOB_WORKERS_AUTOSTART', True):
+            self.start()
+        self._wakeup.set()
+        return job['_id']
+
+    def local_payloads(self, job_type: str) -> List[Dict]:
+        """Payloads of this process's in-process jobs of a type that are still queued or running"""
+        return [job['payload'] for job in list(self._local_jobs.values())
+                if job['type'] == job_type and job['status'] in ('queued', 'running')]
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Current state of a job, or None if unknown"""
+        self._connect()
+        job = self._local_jobs.get(job_id)
+        if job is None and self.collection is not None:
+            try:
+                job = self.collection.find_one({'_id': job_id})
+            except Exception as e:
+                logger.error(f"Error reading AI job {job_id}: {e}")
+        if job is None:
+            return None
+
+        formatted = {key: value for key, value in dict(job).items() if key != '_id'}
+        formatted['id'] = job['_id']
+        for key, value in formatted.items():
+            if isinstance(value, datetime):
+                formatted[key] = value.isoformat()
+        return formatted
+
+    def metrics(self) -> Dict:
+        """Queue depth, worker utilisation and processing latency"""
+        self._connect()
+        depth = self._local_queue.qsize()
+        if self.collection is not None:
+            try:
+                depth += self.collection.count_documents({'status': 'queued'})
+            except Exception as e:
+                logger.error(f"Error counting queued AI jobs: {e}")
+
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(fraction):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1) if latencies else None
+
+        return {
+            'backend': self.backend,
+            'workers': len(self._threads),
+            'running': self._running,
+            'queue_depth': depth,
+            **self._counts,
+            'latency_ms': {
+                'samples': len(latencies),
+                'avg': round(sum(latencies) / len(latencies), 1) if latencies else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+            },
+        }
+
+    def _count(self, name: str):
+        with self._metrics_lock:
+            self._counts[name] += 1
+
+    def _forget_finished_local_jobs(self, keep: int = 1000):
+        """Bound the memory used by finished in-process jobs"""
+        if len(self._local_jobs) <= keep:
+            return
+        with self._lock:
+            finished = [job_id for job_id, job in self._local_jobs.items() if job['status'] in ('completed', 'failed')]
+            for job_id in finished[:len(self._local_jobs) - keep]:
+                del self._local_jobs[job_id]
+
+    def _claim(self) -> Optional[Dict]:
+        """Take the next due job; MongoDB jobs whose lease expired (crashed worker) are claimed again"""
+        now = datetime.utcnow()
+        if self.collection is not None:
+            try:
+                self._reap_abandoned(now)
+                job = self.collection.find_one_and_update(
+                    {'$or': [
+                        {'status': 'queued', 'run_at': {'$lte': now}},
+                        {'status': 'running', 'lease_expires_at': {'$lt': now},
+                         '$expr': {'$lt': ['$attempts', '$max_attempts']}},
+                    ]},
+                    {
+                        '$set': {'status': 'running', 'started_at': now, 'updated_at': now,
+                                 'lease_expires_at': now + timedelta(seconds=self.lease_seconds)},
+                        '$inc': {'attempts': 1}
+                    },
+                    sort=[('run_at', 1)],
+                    return_document=ReturnDocument.AFTER
+                )
+                if job:
+                    return job
+            except Exception as e:
+                logger.error(f"Error claiming AI job: {e}")
+
+        try:
+            run_at, sequence, job_id = self._local_queue.get_nowait()
+        except queue.Empty:
+            return None
+        if run_at > now:
+            # Not due yet (retry backoff); put it back
+            self._local_queue.put((run_at, sequence, job_id))
+            return None
+        job = self._local_jobs[job_id]
+        job.update({'status': 'running', 'started_at': now, 'updated_at': now, 'attempts': job['attempts'] + 1})
+        return job
+
+    def _reap_abandoned(self, now: datetime):
+        """Fail jobs whose worker died during their last attempt (at most once per poll interval)"""
+        if time.monotonic() < self._next_reap:
+            return
+        self._next_reap = time.monotonic() + self.poll_seconds
+        error = 'Lease expired on the last attempt (worker died or hung)'
+        while True:
+            job = self.collection.find_one_and_update(
+                {'status': 'running', 'lease_expires_at': {'$lt': now},
+                 '$expr': {'$gte': ['$attempts', '$max_attempts']}},
+                {'$set': {'status': 'failed', 'last_error': error, 'finished_at': now, 'updated_at': now},
+                 '$unset': {'lease_expires_at': ''}},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                return
+            logger.warning(f"AI job {job['_id']} failed: {error}")
+            self._count('failed')
+            self._on_failure(job, error)
+
+    def _save(self, job: Dict, fields: Dict) -> bool:
+        """Record a job's outcome; False if this attempt lost its lease to a newer one (outcome discarded)"""
+        job.update(fields)
+        if job['_id'] in self._local_jobs:
+            return True
+        try:
+            result = self.collection.update_one(
+                {'_id': job['_id'], 'status': 'running', 'attempts': job['attempts']},
+                {'$set': fields, '$unset': {'lease_expires_at': ''}}
+            )
+        except Exception as e:
+            logger.error(f"Error saving AI job {job['_id']}: {e}")
+            return False
+        if result.matched_count == 0:
+            logger.warning(f"AI job {job['_id']} attempt {job['attempts']} lost its lease; its outcome was discarded")
+            return False
+        return True
+
+    def _run(self, job: Dict):
+        handler = _HANDLERS.get(job['type'])
+        started = time.perf_counter()
+        with self._metrics_lock:
+            self._running += 1
+        if job['_id'] not in self._local_jobs:
+            self._active[job['_id']] = job['attempts']
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job type {job['type']}")
+            result = handler(job['payload'])
+        except Exception as e:
+            now = datetime.utcnow()
+            error = f"{type(e).__name__}: {e}"
+            logger.warning(f"AI job {job['_id']} attempt {job['attempts']} failed: {error}")
+            if job['attempts'] < job.get('max_attempts', self.max_attempts):
+                run_at = now + timedelta(seconds=self.retry_backoff * 2 ** (job['attempts'] - 1))
+                if self._save(job, {'status': 'queued', 'run_at': run_at, 'last_error': error, 'updated_at': now}):
+                    if job['_id'] in self._local_jobs:
+                        self._local_queue.put((run_at, next(self._sequence), job['_id']))
+                    self._count('retried')
+            elif self._save(job, {'status': 'failed', 'last_error': error, 'traceback': traceback.format_exc(),
+                                  'finished_at': now, 'updated_at': now}):
+                self._count('failed')
+                self._on_failure(job, error)
+        else:
+            now = datetime.utcnow()
+            if self._save(job, {'status': 'completed', 'result': result, 'finished_at': now, 'updated_at': now}):
+                self._count('completed')
+                self._latencies_ms.append((now - job['created_at']).total_seconds() * 1000)
+        finally:
+            self._active.pop(job['_id'], None)
+            with self._metrics_lock:
+                self._running -= 1
+            self._forget_finished_local_jobs()
+            logger.debug(f"AI job {job['_id']} ran for {time.perf_counter() - started:.2f}s")
+
+    def _on_failure(self, job: Dict, error: str):
+        on_failure = _FAILURE_HANDLERS.get(job['type'])
+        if on_failure is None:
+            return
+        try:
+            on_failure(job['payload'], error)
+        except Exception as e:
+            logger.error(f"Cleanup for failed AI job {job['_id']} failed: {e}")
+
+    def _heartbeat_loop(self):
+        """Extend the leases of running MongoDB jobs so long jobs are not claimed a second time"""
+        interval = max(self.lease_seconds / 3, 1)
+        while not self._stopping.wait(interval):
+            now = datetime.utcnow()
+            for job_id, attempts in list(self._active.items()):
+                try:
+                    self.collection.update_one(
+                        {'_id': job_id, 'status': 'running', 'attempts': attempts},
+                        {'$set': {'lease_expires_at': now + timedelta(seconds=self.lease_seconds), 'updated_at': now}}
+                    )
+                except Exception as e:
+                    logger.error(f"Error extending the lease of AI job {job_id}: {e}")
+
+    def _worker_loop(self):
+        self._connect()
+        while not self._stopping.is_set():
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+
+# Global instance
+analysis_job_queue = AnalysisJobQueue()
+mongo_connection.after_fork(analysis_job_queue._after_fork)
@@ -0,0 +1,127 @@
+"""
+Shared keyword matcher for the text heuristics
+Every keyword list used by classify_text and the Gemini confidence scoring is
+compiled into one phrase index. A text is lower-cased and tokenised once, each
+token position is checked against the phrases starting with that token, and
+the resulting scan (hits with character positions, per-group counts) is reused
+by every scorer. Keywords match whole words, so 'at' no longer matches 'water'.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+KEYWORD_GROUPS: Dict[str, List[str]] = {
+    # AIVerificationService.classify_text
+    'emergency': [
+        'help', 'emergency', 'urgent', 'fire', 'flood', 'earthquake',
+        'accident', 'injured', 'trapped', 'rescue', 'danger', 'critical',
+        'sos', 'disaster', 'help needed', 'urgent assistance'
+    ],
+    'specificity': [
+        'injured', 'trapped', 'damage', 'destruction', 'evacuation',
+        'rescue', 'medical', 'fire', 'flood', 'earthquake', 'accident'
+    ],
+    'urgency': ['urgent', 'critical', 'immediate', 'emergency', 'help', 'assistance'],
+    'location_context': ['location', 'area', 'street', 'building', 'near', 'at', 'in'],
+
+    # GeminiDescriptionService confidence scoring
+    'description_specific': [
+        'severity', 'urgent', 'critical', 'immediate', 'dangerous',
+        'injured', 'trapped', 'damage', 'destruction', 'evacuation',
+        'emergency services', 'rescue', 'medical', 'fire', 'flood'
+    ],
+    'professional': [
+        'situation', 'incident', 'emergency', 'response', 'assistance',
+        'authorities', 'services', 'personnel', 'equipment'
+    ],
+    'enhancement_professional': [
+        'emergency', 'situation', 'incident', 'response', 'assistance',
+        'authorities', 'services', 'personnel', 'equipment', 'immediate',
+        'critical', 'urgent', 'severe', 'dangerous'
+    ],
+    'enhancement_specific': [
+        'severity', 'injured', 'trapped', 'damage', 'destruction',
+        'evacuation', 'rescue', 'medical', 'fire', 'flood', 'earthquake'
+    ],
+    'emergency_context': ['emergency', 'urgent', 'help', 'assistance', 'rescue', 'danger'],
+    'high_priority': ['critical', 'urgent', 'immediate', 'life-threatening', 'severe', 'dangerous'],
+    'medium_priority': ['emergency', 'help', 'assistance', 'rescue', 'injured', 'damage'],
+    'action': ['need', 'require', 'must', 'should', 'evacuate', 'respond'],
+    'action_or_call': ['need', 'require', 'must', 'should', 'evacuate', 'respond', 'call'],
+
+    # Context alignment per reported disaster type
+    'disaster:FLOOD': ['water', 'flood', 'flooding', 'rain', 'overflow', 'drowning'],
+    'disaster:FIRE': ['fire', 'smoke', 'burning', 'flames', 'heat'],
+    'disaster:EARTHQUAKE': ['earthquake', 'shaking', 'tremor', 'ground', 'building', 'collapse'],
+    'disaster:MEDICAL': ['medical', 'injured', 'hurt', 'pain', 'hospital', 'ambulance'],
+    'disaster:ACCIDENT': ['accident', 'crash', 'collision', 'vehicle', 'car', 'road'],
+    'disaster:CYCLONE': ['wind', 'storm', 'cyclone', 'hurricane', 'tornado', 'damage'],
+    'disaster:LANDSLIDE': ['landslide', 'mud', 'rock', 'slope', 'mountain', 'debris'],
+}
+
+
+class TextScan:
+    """Keyword hits for one text: phrase -> [(start, end), ...] plus the word count"""
+
+    __slots__ = ('hits', 'word_count', '_groups')
+
+    def __init__(self, hits: Dict[str, List[Tuple[int, int]]], word_count: int, groups: Dict[str, List[str]]):
+        self.hits = hits
+        self.word_count = word_count
+        self._groups = groups
+
+    def found(self, group: str) -> List[str]:
+        """Distinct keywords of a group present in the text, in the group's order"""
+        return [phrase for phrase in self._groups[group] if phrase in self.hits]
+
+    def count(self, group: str) -> int:
+        """Number of distinct keywords of a group present in the text"""
+        hits = self.hits
+        return sum(1 for phrase in self._groups[group] if phrase in hits)
+
+    def positions(self, group: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Character spans of every occurrence of the group's keywords"""
+        return {phrase: self.hits[phrase] for phrase in self._groups[group] if phrase in self.hits}
+
+
+class KeywordMatcher:
+    """Single-pass multi-phrase matcher over a tokenised, lower-cased text"""
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        # Keep each group's order but drop duplicate phrases
+        self.groups = {name: list(dict.fromkeys(phrase.lower() for phrase in phrases)) for name, phrases in groups.items()}
+        # first token -> [(phrase, phrase tokens), ...]
+        self._index: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {}
+        for phrase in dict.fromkeys(phrase for phrases in self.groups.values() for phrase in phrases):
+            tokens = tuple(TOKEN_PATTERN.findall(phrase))
+            if tokens:
+                self._index.setdefault(tokens[0], []).append((phrase, tokens))
+
+    def scan(self, text: str) -> TextScan:
+        """All keyword occurrences in the text (overlapping phrases such as 'help' / 'help needed' both count)"""
+        text = text or ''
+        matches = list(TOKEN_PATTERN.finditer(text.lower()))
+        tokens = [match.group() for match in matches]
+        hits: Dict[str, List[Tuple[int, int]]] = {}
+        index = self._index
+        for position, token in enumerate(tokens):
+            candidates = index.get(token)
+            if not candidates:
+                continue
+            for phrase, phrase_tokens in candidates:
+                end = position + len(phrase_tokens)
+                if len(phrase_tokens) == 1 or tuple(tokens[position:end]) == phrase_tokens:
+                    hits.setdefault(phrase, []).append((matches[position].start(), matches[end - 1].end()))
+        return TextScan(hits, len(text.split()), self.groups)
+
+
+# Global instance
+keyword_matcher = KeywordMatcher(KEYWORD_GROUPS)
+
+
+@lru_cache(maxsize=2048)
+def scan_text(text: str) -> TextScan:
+    """Scan a text once; the scorers that look at the same text share the result"""
+    return keyword_matcher.scan(text)
@@ -0,0 +1,99 @@
+"""
+Throughput of single vs micro-batched emergency analysis against a local stub model
+
+    python manage.py benchmark_ai_batching
+    python manage.py benchmark_ai_batching --reports 500 --callers 64 --batch-size 16 --window-ms 25
+
+The stub answers after a fixed per-request latency plus a small per-report cost and
+admits a limited number of concurrent requests, like a rate-limited remote model.
+"""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ai_services.batching import AnalysisBatcher
+from ai_services.gemini_service import GeminiDescriptionService
+
+REPORT_LABEL = re.compile(r'^Report (\d+):$')
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stand-in for GenerativeModel.generate_content with Gemini-like latency"""
+
+    def __init__(self, latency_ms: float, per_item_ms: float, concurrency: int):
+        self.latency = latency_ms / 1000
+        self.per_item = per_item_ms / 1000
+        self.slots = threading.Semaphore(concurrency)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, parts):
+        ids = [int(match.group(1)) for part in parts if isinstance(part, str) for match in [REPORT_LABEL.match(part)] if match]
+        with self._lock:
+            self.requests += 1
+        with self.slots:
+            time.sleep(self.latency + self.per_item * max(1, len(ids)))
+
+        answer = {'emergency_level': 'HIGH', 'priority': 'HIGH', 'confidence': 0.85, 'fraud_score': 0.1,
+                  'observations': ['Stub observation'], 'recommendations': ['Stub action'], 'is_emergency': True}
+        if ids:
+            return StubResponse(json.dumps([{'id': report_id, **answer} for report_id in ids]))
+        return StubResponse(json.dumps(answer))
+
+
+class Command(BaseCommand):
+    help = 'Compare one-model-call-per-report analysis with micro-batched analysis on a stub model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=200, help='Analyses to run per mode')
+        parser.add_argument('--callers', type=int, default=32, help='Concurrent callers (e.g. job workers)')
+        parser.add_argument('--latency-ms', type=float, default=300, help='Stub latency per model request')
+        parser.add_argument('--per-item-ms', type=float, default=10, help='Stub extra latency per report in a request')
+        parser.add_argument('--model-concurrency', type=int, default=4, help='Concurrent requests the stub admits')
+        parser.add_argument('--batch-size', type=int, default=8)
+        parser.add_argument('--window-ms', type=float, default=50)
+
+    def _run(self, analyze, reports: int, callers: int):
+        def one(index):
+            started = time.perf_counter()
+            result = analyze(description=f'Flood water rising near block {index}', disaster_type='FLOOD',
+                             location=f'Sector {index}', use_cache=False)
+            assert result.get('success'), result
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            latencies = sorted(pool.map(one, range(reports)))
+        elapsed = time.perf_counter() - started
+        return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+    def handle(self, *args, **options):
+        stub_args = (options['latency_ms'], options['per_item_ms'], options['model_concurrency'])
+
+        single_model = StubModel(*stub_args)
+        single = GeminiDescriptionService(model=single_model)
+        single_result = self._run(single.analyze_emergency_situation, options['reports'], options['callers'])
+
+        batched_model = StubModel(*stub_args)
+        batcher = AnalysisBatcher(GeminiDescriptionService(model=batched_model), window_ms=options['window_ms'],
+                                  max_size=options['batch_size'], concurrency=options['model_concurrency'])
+        batched_result = self._run(batcher.analyze, options['reports'], options['callers'])
+
+        self.stdout.write(f"{'mode':>8} {'requests':>9} {'seconds':>8} {'reports/s':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode, model, (elapsed, p50, p95) in (('single', single_model, single_result),
+                                                  ('batched', batched_model, batched_result)):
+            self.stdout.write(
+                f"{mode:>8} {model.requests:>9} {elapsed:>8.2f} {options['reports'] / elapsed:>10.1f} "
+                f"{p50 * 1000:>8.0f} {p95 * 1000:>8.0f}"
+            )
+        self.stdout.write(f"Batching: {batcher.stats()}")
+        self.stdout.write(self.style.SUCCESS(f"Speed-up: {single_result[0] / batched_result[0]:.1f}x"))
@@ -0,0 +1,100 @@
+"""
+Per-image cost of the AI image heuristics: the old open-per-scorer path vs the shared metadata stage
+
+    python manage.py benchmark_image_metadata --folder media/reports
+    python manage.py benchmark_image_metadata --repeat 5
+
+Without --folder a handful of synthetic JPEG/PNG images is generated in a temp directory.
+The legacy path is what verify_image + the Gemini confidence scoring did per image:
+a 10 ms sleep plus three Image.open/os.path.getsize calls.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from ai_services.gemini_service import GeminiDescriptionService
+from ai_services.image_metadata import ImageMetadataCache
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def legacy_heuristics(image_path):
+    """The pre-metadata-stage work for one image"""
+    time.sleep(0.01)
+    with Image.open(image_path) as img:
+        img.size
+    for _ in range(3):
+        with Image.open(image_path) as img:
+            img.size, img.mode
+        os.path.getsize(image_path)
+
+
+def sample_images(folder):
+    for size, extension in (((4000, 3000), '.jpg'), ((1920, 1080), '.jpg'), ((1280, 720), '.png'), ((640, 480), '.jpg')):
+        path = os.path.join(folder, f'sample_{size[0]}x{size[1]}{extension}')
+        Image.new('RGB', size, (120, 80, 40)).save(path)
+        yield path
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the header-only image metadata stage against the legacy per-scorer decoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--folder', help='Folder of sample images (searched recursively)')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed passes over the images')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if options['folder']:
+                paths = [
+                    os.path.join(root, name)
+                    for root, _, names in os.walk(options['folder'])
+                    for name in names if name.lower().endswith(IMAGE_EXTENSIONS)
+                ]
+            else:
+                paths = list(sample_images(temp_dir))
+            if not paths:
+                self.stderr.write('No images found')
+                return
+
+            scorer = GeminiDescriptionService(model=object())
+
+            def pipeline(cache):
+                def run(image_path):
+                    metadata = cache.get(image_path)
+                    scorer._assess_image_quality(image_path, metadata)
+                    scorer._assess_image_quality(image_path, metadata)
+                return run
+
+            cold_cache = ImageMetadataCache()
+            warm_cache = ImageMetadataCache()
+            for image_path in paths:
+                warm_cache.get(image_path)
+
+            def cold(image_path):
+                cold_cache.clear()
+                pipeline(cold_cache)(image_path)
+
+            modes = (('legacy', legacy_heuristics), ('metadata cold', cold), ('metadata warm', pipeline(warm_cache)))
+
+            self.stdout.write(f"{len(paths)} image(s), {options['repeat']} pass(es)")
+            self.stdout.write(f"{'mode':>14} {'median ms/image':>16}")
+            medians = {}
+            for mode, run in modes:
+                timings = []
+                for _ in range(options['repeat']):
+                    for image_path in paths:
+                        started = time.perf_counter()
+                        run(image_path)
+                        timings.append(time.perf_counter() - started)
+                medians[mode] = statistics.median(timings)
+                self.stdout.write(f"{mode:>14} {medians[mode] * 1000:>16.3f}")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Cold speed-up {medians['legacy'] / medians['metadata cold']:.1f}x, "
+                f"warm speed-up {medians['legacy'] / medians['metadata warm']:.1f}x"
+            ))
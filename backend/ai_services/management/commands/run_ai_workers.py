@@ -0,0 +1,42 @@
+"""
+Run the AI analysis job workers in a dedicated process
+
+    python manage.py run_ai_workers
+    python manage.py run_ai_workers --workers 8 --metrics-interval 30
+
+Useful when web processes run with AI_JOB_WORKERS_AUTOSTART=False.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ai_services.job_queue import analysis_job_queue
+
+
+class Command(BaseCommand):
+    help = 'Process queued AI analysis jobs until interrupted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Worker threads (defaults to AI_JOB_WORKERS)')
+        parser.add_argument('--metrics-interval', type=int, default=60, help='Seconds between metrics lines (0 disables)')
+
+    def handle(self, *args, **options):
+        if options['workers']:
+            analysis_job_queue.workers = options['workers']
+        analysis_job_queue.start()
+        self.stdout.write(self.style.SUCCESS(f'✅ Started {analysis_job_queue.workers} AI job worker(s), Ctrl+C to stop'))
+
+        try:
+            while True:
+                interval = options['metrics_interval']
+                time.sleep(interval or 60)
+                if interval:
+                    metrics = analysis_job_queue.metrics()
+                    self.stdout.write(
+                        f"queue_depth={metrics['queue_depth']} running={metrics['running']} "
+                        f"completed={metrics['completed']} failed={metrics['failed']} "
+                        f"p95_ms={metrics['latency_ms']['p95']}"
+                    )
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers...')
+            analysis_job_queue.stop()
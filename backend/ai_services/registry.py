@@ -0,0 +1,110 @@
+"""
+Process-wide registry of AI service instances
+Services are built lazily on first use (or by warm-up in nudrrs.wsgi), shared by all
+threads, and expose their initialisation state for the health endpoint.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AIServiceUnavailable(RuntimeError):
+    """A shared AI service could not be constructed (retried after AI_SERVICE_RETRY_SECONDS)"""
+
+
+def _build_gemini():
+    from .gemini_service import GeminiDescriptionService
+    return GeminiDescriptionService()
+
+
+def _build_verification():
+    from .services import AIVerificationService
+    return AIVerificationService()
+
+
+class AIServiceRegistry:
+    """Lazily constructed, thread-safe singletons for the AI layer"""
+
+    def __init__(self, factories: Dict[str, Callable]):
+        self._factories = factories
+        self._instances: Dict[str, object] = {}
+        self._locks = {name: threading.Lock() for name in factories}
+        self._stats = {name: {'lookups': 0, 'init_ms': None, 'initialized_at': None, 'error': None, 'failed_at': None}
+                       for name in factories}
+
+    def get(self, name: str) -> Optional[object]:
+        """Shared instance of a service, or None if it cannot be constructed (retried after a cooldown)"""
+        stats = self._stats[name]
+        stats['lookups'] += 1
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            retry_after = getattr(settings, 'AI_SERVICE_RETRY_SECONDS', 60)
+            if stats['failed_at'] and time.monotonic() - stats['failed_at'] < retry_after:
+                return None
+
+            started = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                logger.warning(f"Could not initialise AI service '{name}': {e}")
+                stats.update({'error': str(e), 'failed_at': time.monotonic()})
+                return None
+
+            stats.update({
+                'init_ms': round((time.perf_counter() - started) * 1000, 1),
+                'initialized_at': datetime.utcnow().isoformat(),
+                'error': None,
+                'failed_at': None,
+            })
+            self._instances[name] = instance
+            return instance
+
+    def warm_up(self):
+        """Construct every registered service now instead of on the first request"""
+        for name in self._factories:
+            self.get(name)
+        logger.info(f"AI services warmed up: {', '.join(name for name in self._factories if name in self._instances)}")
+
+    def health(self) -> Dict:
+        """Initialisation state and lookup counts per service"""
+        services = {
+            name: {'initialized': name in self._instances, **stats}
+            for name, stats in self._stats.items()
+        }
+        for service in services.values():
+            service.pop('failed_at')
+        return {
+            'healthy': all(service['initialized'] for service in services.values()),
+            'services': services,
+        }
+
+    def reset(self):
+        """Drop all instances (e.g. after changing API keys); they are rebuilt on next use"""
+        for name in self._factories:
+            with self._locks[name]:
+                self._instances.pop(name, None)
+                self._stats[name].update({'init_ms': None, 'initialized_at': None, 'error': None, 'failed_at': None})
+
+
+# Global instance
+ai_registry = AIServiceRegistry({
+    'gemini': _build_gemini,
+    'verification': _build_verification,
+})
+
+
+def get_verification_service():
+    """Shared AIVerificationService for this process, or None while it cannot be constructed"""
+    return ai_registry.get('verification')
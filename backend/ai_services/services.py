@@ -1,40 +1,39 @@
+import asyncio
 import os
 from django.conf import settings
-from PIL import Image
 import random
-from .gemini_service import GeminiDescriptionService
+from .batching import analysis_batcher
+from .gemini_service import load_images_async, run_model_call
+from .image_metadata import read_image_metadata
+from .keywords import KEYWORD_GROUPS, scan_text
+from .registry import ai_registry
 
 class AIVerificationService:
-    def __init__(self):
-        self.emergency_keywords = [
-            'help', 'emergency', 'urgent', 'fire', 'flood', 'earthquake',
-            'accident', 'injured', 'trapped', 'rescue', 'danger', 'critical',
-            'sos', 'disaster', 'emergency', 'help needed', 'urgent assistance'
-        ]
-        # Initialize Gemini service for AI description generation
-        try:
-            self.gemini_service = GeminiDescriptionService()
-        except Exception as e:
-            print(f"Warning: Could not initialize Gemini service: {e}")
-            self.gemini_service = None
+    def __init__(self, gemini_service=None):
+        self.emergency_keywords = KEYWORD_GROUPS['emergency']
+        # An injected Gemini client, or False for none; None uses the shared one from the registry
+        self._gemini_override = gemini_service
+    
+    @property
+    def gemini_service(self):
+        """Gemini client for this call; looked up each time so a failed init is retried by the registry"""
+        if self._gemini_override is not None:
+            return self._gemini_override or None
+        return ai_registry.get('gemini')
     
-    def verify_image(self, image_path):
-        """Mock image verification service (will be replaced with real AI later)"""
+    def verify_image(self, image_path, image_data=None):
+        """Mock image verification service (will be replaced with real AI later)
+        image_data: the file's bytes when the caller already loaded them"""
         try:
             # For now, return a mock verification result
             # In production, this will use YOLO or other AI models
             
-            # Simulate AI processing delay (reduced for better performance)
-            import time
-            time.sleep(0.01)  # Reduced from 0.1 to 0.01 seconds
-            
-            # Mock emergency detection based on image size/format
-            try:
-                with Image.open(image_path) as img:
-                    width, height = img.size
-                    # Simple heuristic: larger images might be more serious
-                    is_emergency = width > 800 or height > 600
-            except:
+            # Mock emergency detection based on image size (header only, shared with the Gemini scoring)
+            metadata = read_image_metadata(image_path, image_data)
+            if metadata:
+                # Simple heuristic: larger images might be more serious
+                is_emergency = metadata['width'] > 800 or metadata['height'] > 600
+            else:
                 is_emergency = random.choice([True, False])
             
             # Mock confidence and priority
@@ -57,11 +56,12 @@ class AIVerificationService:
     def classify_text(self, text):
         """Classify emergency text description using enhanced keyword matching with improved confidence"""
         try:
-            text_lower = text.lower()
-            emergency_score = sum(1 for keyword in self.emergency_keywords if keyword in text_lower)
+            # One tokenised pass over the text feeds every keyword heuristic below
+            scan = scan_text(text)
+            emergency_score = scan.count('emergency')
             
             # Enhanced confidence calculation
-            confidence = self._calculate_enhanced_text_confidence(text, emergency_score)
+            confidence = self._calculate_enhanced_text_confidence(text, emergency_score, scan)
             
             # Determine emergency level based on keyword count
             if emergency_score >= 3:
@@ -81,15 +81,20 @@ class AIVerificationService:
                 'emergency_level': emergency_level,
                 'priority': priority,
                 'confidence': confidence,
-                'keywords_found': [kw for kw in self.emergency_keywords if kw in text_lower],
+                'keywords_found': scan.found('emergency'),
+                'keyword_positions': scan.positions('emergency'),
                 'analysis_complete': True,
-                'confidence_factors': self._get_text_confidence_factors(text, emergency_score)
+                'confidence_factors': self._get_text_confidence_factors(text, emergency_score, scan)
             }
             
         except Exception as e:
             print(f"Error in text classification: {e}")
             return self.mock_text_classification()
     
+    def classify_texts(self, texts):
+        """Classify many texts (bulk re-scoring); results are in input order"""
+        return [self.classify_text(text) for text in texts]
+    
     def mock_verification_result(self):
         """Fallback mock result"""
         return {
@@ -176,7 +181,9 @@ class AIVerificationService:
             # Use Gemini AI for comprehensive analysis if available
             if self.gemini_service:
                 try:
-                    gemini_analysis = self.gemini_service.analyze_emergency_situation(
+                    # Under load, coalesce concurrent analyses into multi-report model calls
+                    analyze = analysis_batcher.analyze if getattr(settings, 'AI_BATCH_ENABLED', False) else self.gemini_service.analyze_emergency_situation
+                    gemini_analysis = analyze(
                         description=text_description,
                         image_paths=image_paths,
                         disaster_type=disaster_type,
@@ -223,6 +230,76 @@ class AIVerificationService:
             print(f"Error in comprehensive report analysis: {e}")
             return self._fallback_analysis()
     
+    async def analyze_report_async(self, text_description=None, image_paths=None, disaster_type=None, location=None,
+                                   timeout=None):
+        """
+        analyze_report with every step running concurrently
+        Images are read once, concurrently, and the bytes are shared by the Gemini analysis, the image
+        description and the local heuristics. Each model call is bounded by `timeout` seconds
+        (AI_CALL_TIMEOUT_SECONDS by default); a step that times out counts as failed.
+        """
+        timeout = timeout or getattr(settings, 'AI_CALL_TIMEOUT_SECONDS', 30)
+        
+        async def bounded(func, *args, **kwargs):
+            try:
+                return await asyncio.wait_for(run_model_call(func, *args, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                print(f"{func.__name__} timed out after {timeout}s")
+            except Exception as e:
+                print(f"{func.__name__} failed: {e}")
+            return {}
+        
+        try:
+            image_data = await load_images_async(image_paths) if image_paths else None
+            first_image = next(((path, data) for path, data in zip(image_paths or [], image_data or []) if data), None)
+            
+            steps = [bounded(self._traditional_analysis, text_description, image_paths, disaster_type, location, image_data)]
+            if self.gemini_service:
+                analyze = analysis_batcher.analyze if getattr(settings, 'AI_BATCH_ENABLED', False) else self.gemini_service.analyze_emergency_situation
+                steps.append(bounded(analyze, description=text_description, image_paths=image_paths,
+                                     disaster_type=disaster_type, location=location, image_data=image_data))
+                # Descriptions are only used when the analysis succeeds, but running them alongside it
+                # keeps the total at the slowest call instead of the sum
+                if first_image:
+                    steps.append(bounded(self.gemini_service.generate_description_from_image, first_image[0],
+                                         disaster_type, location, image_data=first_image[1]))
+                if text_description:
+                    steps.append(bounded(self.gemini_service.generate_description_from_text,
+                                         text_description, disaster_type, location))
+            
+            traditional, *gemini_results = await asyncio.gather(*steps)
+            gemini_analysis = gemini_results.pop(0) if gemini_results else {}
+            ai_desc_result = gemini_results.pop(0) if first_image and gemini_results else {}
+            enhanced_desc_result = gemini_results.pop(0) if gemini_results else {}
+            
+            return self.merge_analysis(gemini_analysis, traditional, ai_desc_result, enhanced_desc_result)
+            
+        except Exception as e:
+            print(f"Error in comprehensive report analysis: {e}")
+            return self._fallback_analysis()
+    
+    def merge_analysis(self, gemini_analysis, traditional_analysis, ai_desc_result=None, enhanced_desc_result=None):
+        """
+        Final report analysis: the Gemini analysis when it succeeded, otherwise the heuristic one
+        """
+        if not (gemini_analysis or {}).get('success', False):
+            return traditional_analysis or self._fallback_analysis()
+        
+        ai_desc_result = ai_desc_result or {}
+        enhanced_desc_result = enhanced_desc_result or {}
+        return {
+            'is_emergency': gemini_analysis.get('is_emergency', False),
+            'confidence': gemini_analysis.get('confidence', 0.0),
+            'fraud_score': gemini_analysis.get('fraud_score', 0.0),
+            'emergency_level': gemini_analysis.get('emergency_level', 'LOW'),
+            'priority': gemini_analysis.get('priority', 'LOW'),
+            'ai_description': ai_desc_result.get('description') if ai_desc_result.get('success', False) else None,
+            'enhanced_description': enhanced_desc_result.get('description') if enhanced_desc_result.get('success', False) else None,
+            'observations': gemini_analysis.get('observations', []),
+            'recommendations': gemini_analysis.get('recommendations', []),
+            'source': 'gemini_ai'
+        }
+    
     def generate_ai_description(self, image_path, disaster_type=None, location=None):
         """
         Generate AI description from image using Gemini
@@ -361,7 +438,7 @@ class AIVerificationService:
             'source': 'fallback'
         }
     
-    def _traditional_analysis(self, text_description=None, image_paths=None, disaster_type=None, location=None):
+    def _traditional_analysis(self, text_description=None, image_paths=None, disaster_type=None, location=None, image_data=None):
         """
         Traditional analysis using keyword matching and heuristics
         """
@@ -389,7 +466,7 @@ class AIVerificationService:
         
         # Analyze images if available
         if image_paths:
-            image_analysis = self.verify_image(image_paths[0])
+            image_analysis = self.verify_image(image_paths[0], image_data[0] if image_data else None)
             if image_analysis.get('is_emergency', False):
                 analysis_result.update({
                     'is_emergency': True,
@@ -431,46 +508,54 @@ class AIVerificationService:
             'original_description': original_description
         }
     
-    def _calculate_enhanced_text_confidence(self, text, emergency_score):
+    def _text_confidence_boosts(self, text, emergency_score, scan=None):
+        """
+        Individual confidence boosts for text classification, from one keyword scan of the text
+        """
+        scan = scan or scan_text(text)
+        
+        # Factor 1: Emergency keyword score
+        keyword_boost = min(0.3, emergency_score * 0.1)  # Up to 30% boost
+        
+        # Factor 2: Text length and detail
+        word_count = scan.word_count
+        length_boost = 0.0
+        if word_count >= 20:
+            length_boost = 0.15
+        elif word_count >= 10:
+            length_boost = 0.10
+        elif word_count >= 5:
+            length_boost = 0.05
+        
+        # Factor 3: Specificity indicators
+        specificity_boost = min(0.15, scan.count('specificity') * 0.03)
+        
+        # Factor 4: Urgency indicators
+        urgency_boost = min(0.10, scan.count('urgency') * 0.02)
+        
+        # Factor 5: Location and context indicators
+        context_boost = min(0.10, scan.count('location_context') * 0.02)
+        
+        return {
+            'keyword_boost': keyword_boost,
+            'length_boost': length_boost,
+            'specificity_boost': specificity_boost,
+            'urgency_boost': urgency_boost,
+            'context_boost': context_boost,
+            'word_count': word_count,
+        }
+    
+    def _calculate_enhanced_text_confidence(self, text, emergency_score, scan=None):
         """
         Calculate enhanced confidence for text classification
         """
         try:
             base_confidence = 0.4  # Base confidence for keyword matching
-            
-            # Factor 1: Emergency keyword score
-            keyword_boost = min(0.3, emergency_score * 0.1)  # Up to 30% boost
-            
-            # Factor 2: Text length and detail
-            word_count = len(text.split())
-            length_boost = 0.0
-            if word_count >= 20:
-                length_boost = 0.15
-            elif word_count >= 10:
-                length_boost = 0.10
-            elif word_count >= 5:
-                length_boost = 0.05
-            
-            # Factor 3: Specificity indicators
-            specificity_indicators = [
-                'injured', 'trapped', 'damage', 'destruction', 'evacuation',
-                'rescue', 'medical', 'fire', 'flood', 'earthquake', 'accident'
-            ]
-            specificity_count = sum(1 for indicator in specificity_indicators if indicator.lower() in text.lower())
-            specificity_boost = min(0.15, specificity_count * 0.03)
-            
-            # Factor 4: Urgency indicators
-            urgency_indicators = ['urgent', 'critical', 'immediate', 'emergency', 'help', 'assistance']
-            urgency_count = sum(1 for indicator in urgency_indicators if indicator.lower() in text.lower())
-            urgency_boost = min(0.10, urgency_count * 0.02)
-            
-            # Factor 5: Location and context indicators
-            context_indicators = ['location', 'area', 'street', 'building', 'near', 'at', 'in']
-            context_count = sum(1 for indicator in context_indicators if indicator.lower() in text.lower())
-            context_boost = min(0.10, context_count * 0.02)
+            boosts = self._text_confidence_boosts(text, emergency_score, scan)
             
             # Calculate final confidence
-            final_confidence = min(0.95, base_confidence + keyword_boost + length_boost + specificity_boost + urgency_boost + context_boost)
+            final_confidence = min(0.95, base_confidence + boosts['keyword_boost'] + boosts['length_boost'] +
+                                   boosts['specificity_boost'] + boosts['urgency_boost'] + boosts['context_boost'])
             
             return round(final_confidence, 3)
             
@@ -478,47 +563,18 @@ class AIVerificationService:
             print(f"Error calculating enhanced text confidence: {e}")
             return 0.5  # Fallback confidence
     
-    def _get_text_confidence_factors(self, text, emergency_score):
+    def _get_text_confidence_factors(self, text, emergency_score, scan=None):
         """
         Get detailed confidence factors for text classification
         """
         try:
-            word_count = len(text.split())
-            
-            # Calculate individual factors
-            keyword_boost = min(0.3, emergency_score * 0.1)
-            
-            length_boost = 0.0
-            if word_count >= 20:
-                length_boost = 0.15
-            elif word_count >= 10:
-                length_boost = 0.10
-            elif word_count >= 5:
-                length_boost = 0.05
-            
-            specificity_indicators = [
-                'injured', 'trapped', 'damage', 'destruction', 'evacuation',
-                'rescue', 'medical', 'fire', 'flood', 'earthquake', 'accident'
-            ]
-            specificity_count = sum(1 for indicator in specificity_indicators if indicator.lower() in text.lower())
-            specificity_boost = min(0.15, specificity_count * 0.03)
-            
-            urgency_indicators = ['urgent', 'critical', 'immediate', 'emergency', 'help', 'assistance']
-            urgency_count = sum(1 for indicator in urgency_indicators if indicator.lower() in text.lower())
-            urgency_boost = min(0.10, urgency_count * 0.02)
-            
-            context_indicators = ['location', 'area', 'street', 'building', 'near', 'at', 'in']
-            context_count = sum(1 for indicator in context_indicators if indicator.lower() in text.lower())
-            context_boost = min(0.10, context_count * 0.02)
+            boosts = self._text_confidence_boosts(text, emergency_score, scan)
+            word_count = boosts.pop('word_count')
             
             return {
                 'base_confidence': 0.4,
-                'keyword_boost': keyword_boost,
-                'length_boost': length_boost,
-                'specificity_boost': specificity_boost,
-                'urgency_boost': urgency_boost,
-                'context_boost': context_boost,
-                'total_boost': keyword_boost + length_boost + specificity_boost + urgency_boost + context_boost,
+                **boosts,
+                'total_boost': sum(boosts.values()),
                 'word_count': word_count,
                 'emergency_score': emergency_score
             }
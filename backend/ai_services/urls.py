@@ -1,12 +1,16 @@
 from django.urls import path
-from .views import verify_image, classify_text, generate_ai_description, generate_description_from_context, enhance_description, analyze_emergency, get_description_suggestions
+from .views import verify_image, classify_text, classify_texts, generate_ai_description, generate_description_from_context, enhance_description, analyze_emergency, get_description_suggestions, job_status, job_metrics, service_health
 
 urlpatterns = [
     path('verify-image/', verify_image, name='verify_image'),
     path('classify-text/', classify_text, name='classify_text'),
+    path('classify-texts/', classify_texts, name='classify_texts'),
     path('generate-ai-description/', generate_ai_description, name='generate_ai_description'),
     path('generate-description/', generate_description_from_context, name='generate_description_from_context'),
     path('enhance-description/', enhance_description, name='enhance_description'),
     path('analyze-emergency/', analyze_emergency, name='analyze_emergency'),
     path('description-suggestions/', get_description_suggestions, name='get_description_suggestions'),
+    path('health/', service_health, name='ai_service_health'),
+    path('jobs/metrics/', job_metrics, name='ai_job_metrics'),
+    path('jobs/<str:job_id>/', job_status, name='ai_job_status'),
 ]
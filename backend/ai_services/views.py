@@ -1,11 +1,24 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .services import AIVerificationService
+from django.conf import settings
+from .registry import ai_registry, get_verification_service
+from .job_queue import analysis_job_queue
+from .cache import ai_analysis_cache
+from .batching import analysis_batcher
+from .image_metadata import image_metadata_cache
+import asyncio
 import os
 import tempfile
 
+def verification_unavailable():
+    """503 while the AI verification service cannot be constructed"""
+    return Response(
+        {'error': 'AI service is temporarily unavailable, please retry later'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def verify_image(request):
@@ -22,7 +35,9 @@ def verify_image(request):
             destination.write(chunk)
     
     # Verify image
-    ai_service = AIVerificationService()
+    ai_service = get_verification_service()
+    if ai_service is None:
+        return verification_unavailable()
     result = ai_service.verify_image(temp_path)
     
     return Response(result)
@@ -36,11 +51,31 @@ def classify_text(request):
     if not text:
         return Response({'error': 'No text provided'}, status=status.HTTP_400_BAD_REQUEST)
     
-    ai_service = AIVerificationService()
+    ai_service = get_verification_service()
+    if ai_service is None:
+        return verification_unavailable()
     result = ai_service.classify_text(text)
     
     return Response(result)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def classify_texts(request):
+    """API endpoint to classify many emergency texts in one request (bulk re-scoring)"""
+    texts = request.data.get('texts')
+    
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return Response({'error': 'texts must be a list of strings'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    max_texts = getattr(settings, 'AI_CLASSIFY_TEXTS_MAX', 1000)
+    if len(texts) > max_texts:
+        return Response({'error': f'At most {max_texts} texts per request'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ai_service = get_verification_service()
+    if ai_service is None:
+        return verification_unavailable()
+    return Response({'results': ai_service.classify_texts(texts), 'count': len(texts)})
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def generate_ai_description(request):
@@ -60,7 +95,9 @@ def generate_ai_description(request):
     
     try:
         # Generate AI description
-        ai_service = AIVerificationService()
+        ai_service = get_verification_service()
+        if ai_service is None:
+            return verification_unavailable()
         result = ai_service.generate_ai_description(temp_path, disaster_type, location)
         
         return Response(result)
@@ -82,7 +119,9 @@ def generate_description_from_context(request):
     
     try:
         # Generate AI description from context
-        ai_service = AIVerificationService()
+        ai_service = get_verification_service()
+        if ai_service is None:
+            return verification_unavailable()
         result = ai_service.generate_description_from_context(disaster_type, location, priority)
         
         return Response(result)
@@ -101,7 +140,9 @@ def enhance_description(request):
         return Response({'error': 'No description provided'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Enhance description using AI
-    ai_service = AIVerificationService()
+    ai_service = get_verification_service()
+    if ai_service is None:
+        return verification_unavailable()
     result = ai_service.enhance_description(user_description, disaster_type, location)
     
     return Response(result)
@@ -126,14 +167,16 @@ def analyze_emergency(request):
         image_paths = temp_paths
     
     try:
-        # Perform comprehensive analysis
-        ai_service = AIVerificationService()
-        result = ai_service.analyze_report(
+        # Perform comprehensive analysis; images are read once and the model calls run concurrently
+        ai_service = get_verification_service()
+        if ai_service is None:
+            return verification_unavailable()
+        result = asyncio.run(ai_service.analyze_report_async(
             text_description=text_description,
             image_paths=image_paths,
             disaster_type=disaster_type,
             location=location
-        )
+        ))
         
         return Response(result)
     finally:
@@ -153,9 +196,41 @@ def get_description_suggestions(request):
         return Response({'error': 'Disaster type is required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        ai_service = AIVerificationService()
+        ai_service = get_verification_service()
+        if ai_service is None:
+            return verification_unavailable()
         suggestions = ai_service.get_disaster_suggestions(disaster_type, location)
         
         return Response(suggestions)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+# Job fields exposed by job_status; the payload (descriptions, image URLs, spool paths) stays private
+JOB_STATUS_FIELDS = ('id', 'type', 'status', 'attempts', 'created_at', 'updated_at', 'started_at',
+                     'finished_at', 'result', 'last_error')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    """API endpoint to poll the status of a background AI analysis job"""
+    job = analysis_job_queue.get_job(job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({field: job.get(field) for field in JOB_STATUS_FIELDS})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_metrics(request):
+    """API endpoint for AI job queue depth, throughput and latency"""
+    return Response(analysis_job_queue.metrics())
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def service_health(request):
+    """API endpoint for AI service initialisation state, cache hit rates and batching (503 until every service is ready)"""
+    health = ai_registry.health()
+    health['analysis_cache'] = ai_analysis_cache.stats()
+    health['analysis_batching'] = analysis_batcher.stats()
+    health['image_metadata_cache'] = image_metadata_cache.stats()
+    return Response(health, status=status.HTTP_200_OK if health['healthy'] else status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -21,7 +21,7 @@ class CustomSMTPEmailBackend(SMTPEmailBackend):
             ssl_context.verify_mode = ssl.CERT_NONE
             
             # Create SMTP connection with custom SSL context
-            self.connection = smtplib.SMTP(self.host, self.port)
+            self.connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
             
             if self.use_tls:
                 self.connection.starttls(context=ssl_context)
@@ -0,0 +1,227 @@
+"""
+Outbound email queue
+Callers render their message and hand it to a background worker thread, so
+requests do not wait on SMTP. The worker keeps one SMTP connection open while
+there is mail to send (closing it after EMAIL_QUEUE_IDLE_SECONDS without any),
+sends everything queued within EMAIL_QUEUE_BATCH_WINDOW_MS over that session,
+and retries transient failures (dropped connections, 4xx replies) with
+exponential backoff. The queue is in-process: mail still queued when the
+process is killed is lost, which the short-lived OTP emails it carries tolerate.
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from typing import Dict, List, Tuple
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a send failure is worth retrying"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPConnectError):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # Socket errors and timeouts
+    return isinstance(error, OSError)
+
+
+class EmailQueue:
+    """In-process outbound mail queue with one worker and a persistent SMTP connection"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'EMAIL_QUEUE_ENABLED', True)
+        self.batch_size = getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 20)
+        self.batch_window = getattr(settings, 'EMAIL_QUEUE_BATCH_WINDOW_MS', 50) / 1000
+        self.idle_seconds = getattr(settings, 'EMAIL_QUEUE_IDLE_SECONDS', 30)
+        self.max_attempts = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+        self.retry_seconds = getattr(settings, 'EMAIL_QUEUE_RETRY_SECONDS', 2)
+
+        self._queue: 'queue.Queue[Tuple[EmailMessage, int]]' = queue.Queue()
+        # (ready at, sequence, message, attempt) for messages waiting to be retried
+        self._delayed: List[tuple] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self._connection = None
+        self._last_used = 0.0
+        # Messages accepted but not yet sent or given up on (queued, retrying or in flight)
+        self._outstanding = 0
+        self._counts = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0, 'connections': 0}
+
+    def send(self, message: EmailMessage) -> bool:
+        """Queue a message for delivery; sends it in the caller's thread when the queue is disabled"""
+        if not self.enabled:
+            return self._send_now(message)
+        self._ensure_worker()
+        with self._lock:
+            self._outstanding += 1
+            self._counts['queued'] += 1
+        self._queue.put((message, 1))
+        return True
+
+    def flush(self, timeout: float = 30) -> bool:
+        """Wait until every queued message was sent or given up on; False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._outstanding:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._counts,
+                'outstanding': self._outstanding,
+                'retrying': len(self._delayed),
+                'connected': self._connection is not None,
+            }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent's worker thread and SMTP socket did not come along
+                self._queue = queue.Queue()
+                self._delayed = []
+                self._connection = None
+                self._outstanding = 0
+                self._worker = None
+                self._pid = os.getpid()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._worker_loop, name='email-queue', daemon=True)
+                self._worker.start()
+
+    # Worker
+
+    def _worker_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._deliver(batch)
+                self._last_used = time.monotonic()
+            elif time.monotonic() - self._last_used >= self.idle_seconds:
+                # Idle: give the SMTP connection back rather than let the server time it out
+                self._close()
+
+    def _next_batch(self) -> List[Tuple[EmailMessage, int]]:
+        """Due retries plus whatever arrives within the batch window; blocks up to the idle timeout"""
+        batch = []
+        now = time.monotonic()
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now and len(batch) < self.batch_size:
+                _, _, message, attempt = heapq.heappop(self._delayed)
+                batch.append((message, attempt))
+            next_retry = self._delayed[0][0] - now if self._delayed else None
+
+        if not batch:
+            wait = self.idle_seconds if next_retry is None else min(self.idle_seconds, next_retry)
+            try:
+                batch.append(self._queue.get(timeout=max(wait, 0.01)))
+            except queue.Empty:
+                return []
+
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch: List[Tuple[EmailMessage, int]]):
+        """Send a batch over the shared connection, one message at a time so failures stay per message"""
+        with self._lock:
+            self._counts['batches'] += 1
+        for message, attempt in batch:
+            try:
+                self._open().send_messages([message])
+                with self._lock:
+                    self._counts['sent'] += 1
+                    self._outstanding -= 1
+            except Exception as e:
+                transient = is_transient(e)
+                if transient:
+                    # The session is probably gone; the next message reconnects
+                    self._close()
+                self._failed(message, attempt, e, transient)
+
+    def _failed(self, message: EmailMessage, attempt: int, error: Exception, transient: bool):
+        recipients = ', '.join(message.recipients())
+        if transient and attempt < self.max_attempts:
+            delay = self.retry_seconds * 2 ** (attempt - 1)
+            with self._lock:
+                heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), message, attempt + 1))
+                self._counts['retried'] += 1
+            logger.warning(f"Email to {recipients} failed ({error}); retry {attempt} in {delay:g}s")
+            return
+        with self._lock:
+            self._counts['failed'] += 1
+            self._outstanding -= 1
+        logger.error(f"Giving up on email to {recipients} after {attempt} attempt(s): {error}")
+        self._console_fallback(message)
+
+    def _open(self):
+        if self._connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self._connection = connection
+            with self._lock:
+                self._counts['connections'] += 1
+        return self._connection
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    # Synchronous path
+
+    def _send_now(self, message: EmailMessage) -> bool:
+        try:
+            message.send(fail_silently=False)
+            return True
+        except Exception as e:
+            logger.error(f"SMTP error: {str(e)}")
+            if self._console_fallback(message):
+                return True
+            raise
+
+    def _console_fallback(self, message: EmailMessage) -> bool:
+        """Development mode: print undeliverable mail (and its OTP) to the console"""
+        if not settings.DEBUG:
+            return False
+        try:
+            get_connection('django.core.mail.backends.console.EmailBackend').send_messages([message])
+            logger.warning(f"Development mode: email to {', '.join(message.recipients())} written to the console")
+            return True
+        except Exception as console_error:
+            logger.error(f"Console email also failed: {str(console_error)}")
+            return False
+
+
+# Global instance
+email_queue = EmailQueue()
+# Give queued mail a moment to go out on a clean shutdown
+atexit.register(email_queue.flush, getattr(settings, 'EMAIL_QUEUE_SHUTDOWN_SECONDS', 5))
@@ -0,0 +1,109 @@
+"""
+Index declarations for the authentication collections
+"""
+from datetime import datetime
+from django.conf import settings
+from mongodb_integration.indexes import register_indexes
+from .principal_cache import INVALIDATIONS_COLLECTION
+from .revocation import REVOKED_COLLECTION
+
+USERS_COLLECTION = 'users'
+
+USER_INDEXES = [
+    {
+        'name': 'created_at_-1__id_-1',
+        'keys': [('created_at', -1), ('_id', -1)],
+        'used_by': ['get_all_users', 'get_users_page'],
+    },
+]
+
+USER_QUERY_SHAPES = [
+    {'name': 'get_users_page', 'filter': {}, 'sort': [('created_at', -1), ('_id', -1)], 'used_by': 'get_users_page'},
+]
+
+register_indexes(USERS_COLLECTION, USER_INDEXES, USER_QUERY_SHAPES)
+
+
+# Opaque API tokens and password reset OTPs: unique lookups, removed by TTL once expired
+AUTH_TOKENS_COLLECTION = 'auth_tokens'
+PASSWORD_RESET_COLLECTION = 'password_reset_tokens'
+
+AUTH_TOKEN_INDEXES = [
+    {
+        'name': 'token_1',
+        'keys': [('token', 1)],
+        'options': {'unique': True},
+        'used_by': ['lookup_token', 'delete_token'],
+    },
+    {
+        'name': 'expires_at_ttl',
+        'keys': [('expires_at', 1)],
+        'options': {'expireAfterSeconds': 0},
+        'used_by': ['create_token'],
+    },
+]
+
+AUTH_TOKEN_QUERY_SHAPES = [
+    {'name': 'lookup_token', 'filter': {'token': 'x', 'expires_at': {'$gt': 0}}, 'used_by': 'lookup_token'},
+]
+
+PASSWORD_RESET_INDEXES = [
+    {
+        'name': 'email_1_otp_1',
+        'keys': [('email', 1), ('otp', 1)],
+        'options': {'unique': True},
+        'used_by': ['create_password_reset_token', 'verify_password_reset_otp', 'reset_password_with_token'],
+    },
+    {
+        'name': 'expires_at_ttl',
+        'keys': [('expires_at', 1)],
+        'options': {'expireAfterSeconds': 0},
+        'used_by': ['create_password_reset_token', 'cleanup_expired_tokens'],
+    },
+]
+
+PASSWORD_RESET_QUERY_SHAPES = [
+    {'name': 'verify_password_reset_otp', 'filter': {'email': 'x', 'otp': '0', 'is_used': False}, 'used_by': 'verify_password_reset_otp'},
+    {'name': 'reset_password_with_token', 'filter': {'email': 'x', 'verified_at': {'$exists': True}}, 'used_by': 'reset_password_with_token'},
+]
+
+register_indexes(AUTH_TOKENS_COLLECTION, AUTH_TOKEN_INDEXES, AUTH_TOKEN_QUERY_SHAPES)
+register_indexes(PASSWORD_RESET_COLLECTION, PASSWORD_RESET_INDEXES, PASSWORD_RESET_QUERY_SHAPES)
+
+# Principal cache invalidation log (authentication.principal_cache); workers poll it by created_at
+
+INVALIDATION_INDEXES = [
+    {
+        'name': 'created_at_ttl',
+        'keys': [('created_at', 1)],
+        'options': {'expireAfterSeconds': getattr(settings, 'AUTH_CACHE_INVALIDATION_RETENTION_SECONDS', 3600)},
+        'used_by': ['PrincipalCache._poll', 'PrincipalCache._publish'],
+    },
+]
+
+INVALIDATION_QUERY_SHAPES = [
+    {'name': 'poll_invalidations', 'filter': {'created_at': {'$gte': datetime(2024, 1, 1)}}, 'sort': [('created_at', 1)], 'used_by': 'PrincipalCache._poll'},
+]
+
+register_indexes(INVALIDATIONS_COLLECTION, INVALIDATION_INDEXES, INVALIDATION_QUERY_SHAPES)
+
+# JWT revocation list (authentication.revocation): entries are removed once the token has expired
+REVOKED_INDEXES = [
+    {
+        'name': 'expires_at_ttl',
+        'keys': [('expires_at', 1)],
+        'options': {'expireAfterSeconds': 0},
+        'used_by': ['TokenRevocationList._refresh'],
+    },
+    {
+        'name': 'revoked_at_1',
+        'keys': [('revoked_at', 1)],
+        'used_by': ['TokenRevocationList._refresh'],
+    },
+]
+
+REVOKED_QUERY_SHAPES = [
+    {'name': 'refresh_revocations', 'filter': {'expires_at': {'$gt': 0}, 'revoked_at': {'$gte': 0}}, 'used_by': 'TokenRevocationList._refresh'},
+]
+
+register_indexes(REVOKED_COLLECTION, REVOKED_INDEXES, REVOKED_QUERY_SHAPES)
@@ -0,0 +1,77 @@
+"""
+One-off cleanup of auth_tokens and password_reset_tokens before their TTL and unique indexes
+
+    python manage.py cleanup_auth_tokens              # delete stale documents, then create the indexes
+    python manage.py cleanup_auth_tokens --dry-run    # only count what would be deleted
+
+Deletes documents that are already expired or have no date expires_at (the TTL
+index would never remove those), then duplicates of a token or of an
+(email, otp) pair, keeping the newest. New documents expire through the TTL
+indexes registered in authentication.indexes. build.sh runs it on every deploy,
+before ensure_mongodb_indexes.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from authentication.indexes import AUTH_TOKENS_COLLECTION, PASSWORD_RESET_COLLECTION
+from mongodb_integration.connection import mongo_connection
+from mongodb_integration.indexes import MongoIndexManager, INDEX_REGISTRY
+
+# collection -> fields that identify a document under its unique index
+UNIQUE_KEYS = {
+    AUTH_TOKENS_COLLECTION: ['token'],
+    PASSWORD_RESET_COLLECTION: ['email', 'otp'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and duplicate auth tokens / reset OTPs and create their TTL and unique indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Count stale documents without deleting them')
+
+    def handle(self, *args, **options):
+        db = mongo_connection.get_database()
+        dry_run = options['dry_run']
+
+        for collection_name, keys in UNIQUE_KEYS.items():
+            collection = db[collection_name]
+            stale = {'$or': [
+                {'expires_at': {'$lt': datetime.utcnow()}},
+                {'expires_at': {'$not': {'$type': 'date'}}},
+            ]}
+            duplicate_ids = self._duplicate_ids(collection, keys)
+
+            if dry_run:
+                expired = collection.count_documents(stale)
+                self.stdout.write(f'   {collection_name}: {expired} expired, {len(duplicate_ids)} duplicate document(s)')
+                continue
+
+            expired = collection.delete_many(stale).deleted_count
+            duplicates = collection.delete_many({'_id': {'$in': duplicate_ids}}).deleted_count if duplicate_ids else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {collection_name}: deleted {expired} expired and {duplicates} duplicate document(s)'
+            ))
+
+        if dry_run:
+            return
+
+        manager = MongoIndexManager(db, {name: INDEX_REGISTRY[name] for name in UNIQUE_KEYS})
+        result = manager.ensure_indexes()
+        for name in result['created']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Created {name}'))
+        for name in result['failed']:
+            self.stdout.write(self.style.ERROR(f'❌ Failed  {name}'))
+
+    def _duplicate_ids(self, collection, keys):
+        """_ids of every document sharing its unique key with a newer one"""
+        pipeline = [
+            {'$sort': {'created_at': -1, '_id': -1}},
+            {'$group': {'_id': {key: f'${key}' for key in keys}, 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': 1}}},
+        ]
+        duplicate_ids = []
+        for group in collection.aggregate(pipeline, allowDiskUse=True):
+            duplicate_ids.extend(group['ids'][1:])
+        return duplicate_ids
@@ -1,54 +1,104 @@
 """
 Custom MongoDB Authentication Backend for Django REST Framework
+The same resolution backs mongodb_integration.middleware for plain Django views,
+and the result is memoised on the request, so each request is authenticated once.
 """
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from authentication.services import auth_mongodb_service
+from authentication.principal_cache import principal_cache
+from authentication.revocation import token_revocations
+from datetime import datetime
+import time
 import jwt
 from django.conf import settings
 
-class MongoDBTokenAuthentication(BaseAuthentication):
-    """
-    Custom authentication class that uses MongoDB for token validation
+# Attribute on the Django HttpRequest holding the resolved (user, credential) or None
+PRINCIPAL_ATTR = '_mongodb_principal'
+
+
+def resolve_request(request):
+    """Authenticate a request once; Django middleware and DRF share the memoised result
+
+    Accepts a Django HttpRequest or a DRF Request (which wraps one).
     """
-    
-    def authenticate(self, request):
-        """
-        Returns a two-tuple of `User` and `token` if authentication should
-        succeed, or `None` if authentication should fail.
-        """
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        if not auth_header:
-            return None
+    http_request = getattr(request, '_request', request)
+    if not hasattr(http_request, PRINCIPAL_ATTR):
+        setattr(http_request, PRINCIPAL_ATTR, resolve_authorization(http_request.META.get('HTTP_AUTHORIZATION', '')))
+    return getattr(http_request, PRINCIPAL_ATTR)
 
-        try:
-            scheme, token = auth_header.split(' ', 1)
-        except ValueError:
+
+def resolve_authorization(auth_header):
+    """(MongoDBUser, credential) for an Authorization header, or None"""
+    if not auth_header:
+        return None
+
+    try:
+        scheme, token = auth_header.split(' ', 1)
+    except ValueError:
+        return None
+
+    # Support opaque Token and JWT Bearer
+    # Resolved principals are cached in-process until invalidated (see principal_cache)
+    if scheme == 'Token':
+        if not auth_mongodb_service:
             return None
+        user_data = principal_cache.get('token', token)
+        if user_data:
+            return (MongoDBUser(user_data), token)
+        resolved = auth_mongodb_service.lookup_token(token)
+        if resolved:
+            expires_in = (resolved['expires_at'] - datetime.utcnow()).total_seconds()
+            principal_cache.set('token', token, resolved['user'], expires_in)
+            return (MongoDBUser(resolved['user']), token)
+        # API tokens of the mongoengine user service (mongodb_integration.auth_views) live on the user
+        user_data = auth_mongodb_service.get_user_by_api_token(token)
+        if user_data:
+            principal_cache.set('token', token, user_data)
+            return (MongoDBUser(user_data), token)
+        return None
 
-        # Support opaque Token and JWT Bearer
-        if scheme == 'Token':
+    if scheme == 'Bearer':
+        try:
+            # Signature and expiry are checked on every request; only the user lookup is cached
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            # Refresh tokens are signed with the same key but only buy new access tokens
+            if payload.get('token_type') != 'access':
+                return None
+            user_id = str(payload.get('user_id'))
+            if not user_id or token_revocations.is_revoked(payload):
+                return None
+            # Stateless mode: tokens issued with claims need no database read at all
+            if token_revocations.stateless and 'role' in payload:
+                return (MongoDBUser(user_from_claims(payload)), token)
             if not auth_mongodb_service:
                 return None
-            user_data = auth_mongodb_service.validate_token(token)
+            user_data = principal_cache.get('jwt', token)
+            if user_data:
+                return (MongoDBUser(user_data), token)
+            # Load user from Mongo to get full profile
+            user_data = auth_mongodb_service.get_user_by_id(user_id)
             if user_data:
+                expires_in = payload['exp'] - time.time() if 'exp' in payload else None
+                principal_cache.set('jwt', token, user_data, expires_in)
                 return (MongoDBUser(user_data), token)
+        except Exception:
             return None
 
-        if scheme == 'Bearer':
-            try:
-                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-                user_id = str(payload.get('user_id'))
-                if not user_id or not auth_mongodb_service:
-                    return None
-                # Load user from Mongo to get full profile
-                user_data = auth_mongodb_service.get_user_by_id(user_id)
-                if user_data:
-                    return (MongoDBUser(user_data), token)
-            except Exception:
-                return None
+    return None
 
-        return None
+
+class MongoDBTokenAuthentication(BaseAuthentication):
+    """
+    Custom authentication class that uses MongoDB for token validation
+    """
+    
+    def authenticate(self, request):
+        """
+        Returns a two-tuple of `User` and `token` if authentication should
+        succeed, or `None` if authentication should fail.
+        """
+        return resolve_request(request)
     
     def authenticate_header(self, request):
         """
@@ -57,6 +107,16 @@ class MongoDBTokenAuthentication(BaseAuthentication):
         """
         return 'Token'
 
+def user_from_claims(payload):
+    """User data for MongoDBUser from the claims of a stateless JWT"""
+    return {
+        'id': str(payload['user_id']),
+        'username': payload.get('username', ''),
+        'email': payload.get('email', ''),
+        'role': payload.get('role', 'VIEWER'),
+        'is_staff': payload.get('is_staff', False),
+    }
+
 class MongoDBUser:
     """
     Simple user object that mimics Django's User model for REST Framework
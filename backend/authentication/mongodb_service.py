@@ -5,27 +5,37 @@ Handles all user authentication operations using MongoDB
 
 import logging
 import time
-from pymongo import MongoClient
 import ssl
 from django.conf import settings
 from datetime import datetime, timedelta
 import hashlib
 import secrets
 from typing import Dict, Optional, List
+from mongodb_integration.connection import LazyMongoService, mongo_connection
+from mongodb_integration.pagination import paginate, InvalidCursor
+from pymongo.errors import DuplicateKeyError
+from .principal_cache import principal_cache
+from .revocation import token_revocations, CLAIM_FIELDS
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-class AuthMongoDBService:
-    """Service class for Authentication operations with MongoDB"""
+# New OTPs drawn when one collides with a live OTP for the same email
+OTP_INSERT_ATTEMPTS = 5
+
+class AuthMongoDBService(LazyMongoService):
+    """Service class for Authentication operations with MongoDB
+    
+    With connect_on_init=False nothing is done until the first query, which makes a single connect attempt.
+    """
     
     def __init__(self, connect_on_init=True):
-        self.client = None
-        self.db = None
         self._is_connected = False
         self._connection_string = None
         self._database_name = None
         self.otp_expiry = 600  # 10 minutes in seconds
+        self.token_lifetime = getattr(settings, 'AUTH_TOKEN_LIFETIME_SECONDS', 365 * 24 * 3600)
+        mongo_connection.after_fork(self._rebind)
         if connect_on_init:
             self.connect()
         
@@ -64,20 +74,12 @@ class AuthMongoDBService:
             try:
                 logger.info(f"Attempting to connect to MongoDB (Attempt {retry_count + 1}/{max_retries})")
                 
-                # Set connection timeouts
-                self.client = MongoClient(
-                    self._connection_string,
-                    serverSelectionTimeoutMS=10000,  # 10 second timeout
-                    connectTimeoutMS=15000,          # 15 second connection timeout
-                    socketTimeoutMS=30000,           # 30 second socket timeout
-                    retryWrites=True,
-                    retryReads=True,
-                    connect=False  # Defer connection
-                )
+                # Shared process-wide client (mongodb_integration.connection); timeouts come from settings
+                self.client = mongo_connection.client
                 
                 # Force connection with a ping
                 self.client.admin.command('ping')
-                self.db = self.client[self._database_name]
+                self.db = mongo_connection.get_database(self._database_name)
                 self._is_connected = True
                 logger.info("✅ Successfully connected to MongoDB Atlas")
                 return  # Success, exit the retry loop
@@ -95,17 +97,21 @@ class AuthMongoDBService:
                 delay = min(delay * 2, 30)  # Cap the delay at 30 seconds
                 
     def close(self):
-        """Close the MongoDB connection"""
-        if self.client and self._is_connected:
-            try:
-                self.client.close()
-                logger.info("Closed MongoDB connection")
-            except Exception as e:
-                logger.error(f"Error closing MongoDB connection: {e}")
-            finally:
-                self.client = None
-                self.db = None
-                self._is_connected = False
+        """Release this service's handles; the shared client stays open for the other services"""
+        self.client = None
+        self.db = None
+        self._is_connected = False
+    
+    def _lazy_connect(self):
+        # First use: one attempt, no backoff sleeps on the request path
+        try:
+            self.connect(max_retries=1)
+        except ConnectionError as e:
+            logger.warning(f"MongoDB unavailable for authentication: {e}")
+    
+    def _rebind(self):
+        super()._rebind()
+        self._is_connected = False
     
     def hash_password(self, password: str) -> str:
         """Hash password using SHA-256"""
@@ -242,27 +248,46 @@ class AuthMongoDBService:
                 user = collection.find_one({'_id': user_id})
             
             if user:
-                user['id'] = str(user['_id'])
-                del user['_id']
-                if 'password' in user:
-                    del user['password']  # Remove password
-                
-                # Format dates
-                if 'created_at' in user and isinstance(user['created_at'], datetime):
-                    user['created_at'] = user['created_at'].isoformat()
-                if 'updated_at' in user and isinstance(user['updated_at'], datetime):
-                    user['updated_at'] = user['updated_at'].isoformat()
-                if 'last_login' in user and isinstance(user['last_login'], datetime):
-                    user['last_login'] = user['last_login'].isoformat()
-                
-                # Ensure all ObjectIds are converted to strings for JSON serialization
-                return self._serialize_user_data(user)
+                return self._public_user(user)
             
             return None
         except Exception as e:
             print(f"Error getting user by ID from MongoDB: {e}")
             return None
     
+    def get_user_by_api_token(self, token: str) -> Optional[Dict]:
+        """Get an active user by the api_token stored on the user (mongoengine user service tokens)"""
+        try:
+            if self.db is None:
+                return None
+            
+            user = self.db['users'].find_one({'api_token': token, 'is_active': True})
+            if user:
+                return self._public_user(user)
+            
+            return None
+        except Exception as e:
+            print(f"Error getting user by API token from MongoDB: {e}")
+            return None
+    
+    def _public_user(self, user: Dict) -> Dict:
+        """A users document without secrets, with string id and ISO dates"""
+        user['id'] = str(user['_id'])
+        del user['_id']
+        for secret in ('password', 'password_hash', 'api_token'):
+            user.pop(secret, None)
+        
+        # Format dates
+        if 'created_at' in user and isinstance(user['created_at'], datetime):
+            user['created_at'] = user['created_at'].isoformat()
+        if 'updated_at' in user and isinstance(user['updated_at'], datetime):
+            user['updated_at'] = user['updated_at'].isoformat()
+        if 'last_login' in user and isinstance(user['last_login'], datetime):
+            user['last_login'] = user['last_login'].isoformat()
+        
+        # Ensure all ObjectIds are converted to strings for JSON serialization
+        return self._serialize_user_data(user)
+    
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """Get user by username"""
         try:
@@ -347,6 +372,9 @@ class AuthMongoDBService:
             )
             
             if result.modified_count > 0:
+                principal_cache.invalidate_user(user_id)
+                if set(CLAIM_FIELDS) & set(update_data):
+                    token_revocations.claims_changed(user_id)
                 # Return the updated user
                 return self.get_user_by_id(user_id)
             
@@ -371,6 +399,10 @@ class AuthMongoDBService:
                 {'_id': user_id},
                 {'$set': update_data}
             )
+            if result.modified_count > 0:
+                principal_cache.invalidate_user(user_id)
+                if set(CLAIM_FIELDS) & set(update_data):
+                    token_revocations.claims_changed(user_id)
             
             return result.modified_count > 0
         except Exception as e:
@@ -398,6 +430,8 @@ class AuthMongoDBService:
                     'updated_at': datetime.utcnow()
                 }}
             )
+            if result.modified_count > 0:
+                principal_cache.invalidate_user(user_id)
             
             return result.modified_count > 0
         except Exception as e:
@@ -415,12 +449,13 @@ class AuthMongoDBService:
             # Generate token
             token = secrets.token_urlsafe(32)
             
-            # Store token
+            # Store token; the TTL index on expires_at removes it once expired
+            now = datetime.utcnow()
             token_data = {
                 'user_id': user_id,
                 'token': token,
-                'created_at': datetime.utcnow(),
-                'expires_at': datetime.utcnow().replace(year=datetime.utcnow().year + 1)  # 1 year expiry
+                'created_at': now,
+                'expires_at': now + timedelta(seconds=self.token_lifetime)
             }
             
             result = collection.insert_one(token_data)
@@ -435,6 +470,11 @@ class AuthMongoDBService:
     
     def validate_token(self, token: str) -> Optional[Dict]:
         """Validate authentication token"""
+        resolved = self.lookup_token(token)
+        return resolved['user'] if resolved else None
+    
+    def lookup_token(self, token: str) -> Optional[Dict]:
+        """Resolve a token to {'user': ..., 'expires_at': ...} so callers can cache it until expiry"""
         try:
             if self.db is None:
                 return None
@@ -451,7 +491,8 @@ class AuthMongoDBService:
                 # Get user by ID (convert to string if needed)
                 user_id = str(token_doc['user_id'])
                 user = self.get_user_by_id(user_id)
-                return user
+                if user:
+                    return {'user': user, 'expires_at': token_doc['expires_at']}
             
             return None
         except Exception as e:
@@ -466,6 +507,7 @@ class AuthMongoDBService:
             
             collection = self.db['auth_tokens']
             result = collection.delete_one({'token': token})
+            principal_cache.invalidate_credential('token', token)
             
             return result.deleted_count > 0
         except Exception as e:
@@ -479,33 +521,51 @@ class AuthMongoDBService:
                 return []
             
             collection = self.db['users']
-            cursor = collection.find({}).sort('created_at', -1).skip(skip).limit(limit)
+            cursor = collection.find({}, {'password': 0}).sort('created_at', -1).skip(skip).limit(limit)
             users = list(cursor)
             
-            # Convert ObjectId to string and remove passwords
-            for user in users:
-                user['id'] = str(user['_id'])
-                del user['_id']
-                if 'password' in user:
-                    del user['password']
-                
-                # Format dates
-                if 'created_at' in user and isinstance(user['created_at'], datetime):
-                    user['created_at'] = user['created_at'].isoformat()
-                if 'updated_at' in user and isinstance(user['updated_at'], datetime):
-                    user['updated_at'] = user['updated_at'].isoformat()
-                if 'last_login' in user and isinstance(user['last_login'], datetime):
-                    user['last_login'] = user['last_login'].isoformat()
-            
+            self._format_users(users)
             return users
         except Exception as e:
             print(f"Error getting all users from MongoDB: {e}")
             return []
     
+    def get_users_page(self, limit: int = 100, cursor: Optional[str] = None) -> Dict:
+        """Get one keyset page of users: {'results', 'next', 'prev'}; raises InvalidCursor for bad tokens"""
+        try:
+            if self.db is None:
+                return {'results': [], 'next': None, 'prev': None}
+            
+            users, next_cursor, prev_cursor = paginate(self.db['users'], {}, limit, cursor, {'password': 0})
+            
+            self._format_users(users)
+            return {'results': users, 'next': next_cursor, 'prev': prev_cursor}
+        except InvalidCursor:
+            raise
+        except Exception as e:
+            print(f"Error getting users page from MongoDB: {e}")
+            return {'results': [], 'next': None, 'prev': None}
+    
+    def _format_users(self, users: List[Dict]):
+        """Convert ObjectId to string, drop passwords and format dates in place"""
+        for user in users:
+            user['id'] = str(user['_id'])
+            del user['_id']
+            if 'password' in user:
+                del user['password']
+            
+            # Format dates
+            if 'created_at' in user and isinstance(user['created_at'], datetime):
+                user['created_at'] = user['created_at'].isoformat()
+            if 'updated_at' in user and isinstance(user['updated_at'], datetime):
+                user['updated_at'] = user['updated_at'].isoformat()
+            if 'last_login' in user and isinstance(user['last_login'], datetime):
+                user['last_login'] = user['last_login'].isoformat()
+    
     def create_password_reset_token(self, email: str) -> Optional[Dict]:
         """Create password reset token for email"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             # Check if user exists
@@ -513,23 +573,28 @@ class AuthMongoDBService:
             if not user:
                 return None
             
-            # Generate OTP
             from .email_service import EmailService
-            otp = EmailService.generate_otp()
-            
-            # Create reset token document
-            reset_data = {
-                'email': email,
-                'otp': otp,
-                'user_id': user['id'],
-                'created_at': datetime.now(),
-                'expires_at': datetime.now() + timedelta(seconds=900),  # 15 minutes
-                'is_used': False,
-                'attempts': 0
-            }
-            
             collection = self.db['password_reset_tokens']
-            result = collection.insert_one(reset_data)
+            
+            # (email, otp) is unique: on the rare collision with a live OTP, draw another
+            for attempt in range(OTP_INSERT_ATTEMPTS):
+                otp = EmailService.generate_otp()
+                now = datetime.utcnow()
+                reset_data = {
+                    'email': email,
+                    'otp': otp,
+                    'user_id': user['id'],
+                    'created_at': now,
+                    'expires_at': now + timedelta(seconds=900),  # 15 minutes; TTL index deletes it after
+                    'is_used': False,
+                    'attempts': 0
+                }
+                try:
+                    result = collection.insert_one(reset_data)
+                    break
+                except DuplicateKeyError:
+                    if attempt == OTP_INSERT_ATTEMPTS - 1:
+                        raise
             
             if result.inserted_id:
                 # Send OTP email
@@ -559,7 +624,7 @@ class AuthMongoDBService:
     def verify_password_reset_otp(self, email: str, otp: str) -> Optional[Dict]:
         """Verify password reset OTP"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['password_reset_tokens']
@@ -569,7 +634,7 @@ class AuthMongoDBService:
                 'email': email,
                 'otp': otp,
                 'is_used': False,
-                'expires_at': {'$gt': datetime.now()}
+                'expires_at': {'$gt': datetime.utcnow()}
             })
             
             if not token_doc:
@@ -583,14 +648,14 @@ class AuthMongoDBService:
             # Mark token as verified but not used yet
             collection.update_one(
                 {'_id': token_doc['_id']},
-                {'$set': {'verified_at': datetime.now()}}
+                {'$set': {'verified_at': datetime.utcnow()}}
             )
             
             return {
                 'id': str(token_doc['_id']),
                 'user_id': token_doc['user_id'],
                 'email': email,
-                'verified_at': datetime.now().isoformat()
+                'verified_at': datetime.utcnow().isoformat()
             }
         except Exception as e:
             print(f"Error verifying password reset OTP: {e}")
@@ -606,7 +671,7 @@ class AuthMongoDBService:
             str: The generated OTP
         """
         try:
-            if not self.db:
+            if self.db is None:
                 self.connect()
                 
             # Generate a 6-digit OTP
@@ -641,7 +706,7 @@ class AuthMongoDBService:
             bool: True if OTP is valid, False otherwise
         """
         try:
-            if not self.db:
+            if self.db is None:
                 self.connect()
                 
             # Find and validate OTP
@@ -666,7 +731,7 @@ class AuthMongoDBService:
             otp: The OTP to invalidate
         """
         try:
-            if not self.db:
+            if self.db is None:
                 self.connect()
                 
             self.db.otps.update_one(
@@ -688,7 +753,7 @@ class AuthMongoDBService:
             bool: True if password was reset successfully, False otherwise
         """
         try:
-            if not self.db:
+            if self.db is None:
                 self.connect()
                 
             # Hash the new password using the same scheme as authenticate_user
@@ -706,6 +771,8 @@ class AuthMongoDBService:
                 filter_id,
                 {'$set': {'password': hashed_password}}
             )
+            if result.modified_count > 0:
+                principal_cache.invalidate_user(user_id)
             
             return result.modified_count > 0
             
@@ -716,7 +783,7 @@ class AuthMongoDBService:
     def reset_password_with_token(self, email: str, new_password: str) -> bool:
         """Reset password using verified token"""
         try:
-            if not self.db:
+            if self.db is None:
                 return False
             
             # Find verified token (either used or recently verified)
@@ -743,16 +810,18 @@ class AuthMongoDBService:
                 {
                     '$set': {
                         'password': hashed_password,
-                        'updated_at': datetime.now()
+                        'updated_at': datetime.utcnow()
                     }
                 }
             )
             
             if result.modified_count > 0:
+                principal_cache.invalidate_user(user_id)
+                
                 # Mark token as used and completed
                 collection.update_one(
                     {'_id': token_doc['_id']},
-                    {'$set': {'is_used': True, 'completed_at': datetime.now()}}
+                    {'$set': {'is_used': True, 'completed_at': datetime.utcnow()}}
                 )
                 
                 # Send success email
@@ -774,12 +843,12 @@ class AuthMongoDBService:
     def cleanup_expired_tokens(self):
         """Clean up expired password reset tokens"""
         try:
-            if not self.db:
+            if self.db is None:
                 return
             
             collection = self.db['password_reset_tokens']
             result = collection.delete_many({
-                'expires_at': {'$lt': datetime.now()}
+                'expires_at': {'$lt': datetime.utcnow()}
             })
             
             if result.deleted_count > 0:
@@ -787,10 +856,6 @@ class AuthMongoDBService:
         except Exception as e:
             print(f"Error cleaning up expired tokens: {e}")
 
-    def close(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
 
 # Global instance
-auth_mongodb_service = AuthMongoDBService()
+auth_mongodb_service = AuthMongoDBService(connect_on_init=False)
@@ -0,0 +1,254 @@
+"""
+In-process cache of authenticated principals for MongoDBTokenAuthentication
+Resolved users are kept in a bounded LRU keyed by the sha256 of the credential
+(never the credential itself) for AUTH_PRINCIPAL_CACHE_TTL_SECONDS, capped by
+the token's own expiry. Writes that change what a credential resolves to
+(token deletion, user updates, password and role changes) invalidate the
+local entries at once and append to the auth_cache_invalidations collection;
+other workers poll it at most every AUTH_PRINCIPAL_CACHE_POLL_SECONDS, so a
+stale principal outlives a change by at most that interval. Polls look back
+AUTH_PRINCIPAL_CACHE_POLL_OVERLAP_SECONDS past the previous one, so entries
+written late or stamped by a slightly slower clock are still picked up. When
+MongoDB is unreachable the log is retried every MONGODB_RECONNECT_SECONDS;
+on reconnect the cache starts empty (changes made meanwhile were not seen)
+and this worker's own invalidations from the outage are published.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from django.conf import settings
+from mongodb_integration.connection import mongo_connection
+
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS_COLLECTION = 'auth_cache_invalidations'
+
+
+def credential_key(kind: str, credential: str) -> str:
+    """Cache key for a credential ('token' or 'jwt')"""
+    return hashlib.sha256(f'{kind}:{credential}'.encode()).hexdigest()
+
+
+class PrincipalCache:
+    """Bounded TTL/LRU of credential hash -> user data, invalidated across workers"""
+
+    def __init__(self):
+        self.enabled = getattr(settings, 'AUTH_PRINCIPAL_CACHE_ENABLED', True)
+        self.max_entries = getattr(settings, 'AUTH_PRINCIPAL_CACHE_MAX_ENTRIES', 10000)
+        self.ttl_seconds = getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL_SECONDS', 300)
+        self.poll_seconds = getattr(settings, 'AUTH_PRINCIPAL_CACHE_POLL_SECONDS', 2)
+        self.poll_overlap = timedelta(seconds=getattr(settings, 'AUTH_PRINCIPAL_CACHE_POLL_OVERLAP_SECONDS', 30))
+
+        # key -> (expires_at monotonic, user_id, user data)
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._counts = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'remote_invalidations': 0}
+
+        self._collection = None
+        self._connected = False
+        self._failed_at: Optional[float] = None
+        # (scope, value, monotonic time) invalidated while the log was unreachable
+        self._unpublished: List[tuple] = []
+        self._polled_until: Optional[datetime] = None
+        # _id -> created_at of log entries already applied inside the overlap window
+        self._applied: Dict = {}
+        self._next_poll = 0.0
+        self._poll_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+
+    def _connect(self):
+        """Find the invalidation log on first use; while MongoDB is unreachable invalidations stay local"""
+        if self._connected:
+            return
+        retry_seconds = getattr(settings, 'MONGODB_RECONNECT_SECONDS', 30)
+        with self._connect_lock:
+            if self._connected:
+                return
+            if self._failed_at is not None and time.monotonic() - self._failed_at < retry_seconds:
+                return
+            try:
+                if not mongo_connection.ping(timeout=5):
+                    raise ConnectionError('MongoDB is not reachable')
+                collection = mongo_connection.get_database()[INVALIDATIONS_COLLECTION]
+            except Exception as e:
+                logger.warning(f"Principal cache invalidations are local to this process, retrying in {retry_seconds}s: {e}")
+                self._collection = None
+                self._failed_at = time.monotonic()
+                return
+            # Start from now; older invalidations predate this cache
+            self._polled_until = datetime.utcnow()
+            self._applied = {}
+            self._collection = collection
+            self._connected = True
+            if self._failed_at is not None:
+                # Other workers' changes during the outage were missed
+                self.clear()
+                self._failed_at = None
+            with self._lock:
+                unpublished, self._unpublished = self._unpublished, []
+        for scope, value, at in unpublished:
+            # Older than the TTL, the entries it targeted have expired everywhere anyway
+            if time.monotonic() - at < self.ttl_seconds:
+                self._publish(scope, value)
+
+    def _after_fork(self):
+        """The child starts with an empty cache and reads the invalidation log afresh"""
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._collection = None
+        self._connected = False
+        self._failed_at = None
+        self._next_poll = 0.0
+
+    # Lookups
+
+    def get(self, kind: str, credential: str) -> Optional[Dict]:
+        """Cached user data for a credential, or None on a miss"""
+        if not self.enabled:
+            return None
+        self._poll()
+        key = credential_key(kind, credential)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counts['hits'] += 1
+                    return copy.deepcopy(entry[2])
+                self._drop(key)
+            self._counts['misses'] += 1
+        return None
+
+    def set(self, kind: str, credential: str, user_data: Dict, expires_in: Optional[float] = None):
+        """Remember what a credential resolved to; expires_in caps the TTL (e.g. the token's remaining life)"""
+        if not self.enabled or not user_data:
+            return
+        ttl = self.ttl_seconds if expires_in is None else min(self.ttl_seconds, expires_in)
+        if ttl <= 0:
+            return
+        key = credential_key(kind, credential)
+        user_id = str(user_data.get('id'))
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, user_id, copy.deepcopy(user_data))
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            self._counts['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        # Caller holds self._lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[1])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[1]]
+
+    # Invalidation
+
+    def invalidate_credential(self, kind: str, credential: str):
+        """Forget one credential here and in every other worker"""
+        key = credential_key(kind, credential)
+        self._invalidate_local('credential', key)
+        self._publish('credential', key)
+
+    def invalidate_user(self, user_id):
+        """Forget every credential of a user (profile, password or role changed)"""
+        user_id = str(user_id)
+        self._invalidate_local('user', user_id)
+        self._publish('user', user_id)
+
+    def _invalidate_local(self, scope: str, value: str):
+        with self._lock:
+            if scope == 'user':
+                for key in list(self._keys_by_user.get(value, ())):
+                    self._drop(key)
+            else:
+                self._drop(value)
+            self._counts['invalidations'] += 1
+
+    def _publish(self, scope: str, value: str):
+        if not self.enabled:
+            return
+        self._connect()
+        if self._collection is None:
+            now = time.monotonic()
+            with self._lock:
+                self._unpublished = [item for item in self._unpublished if now - item[2] < self.ttl_seconds]
+                self._unpublished.append((scope, value, now))
+            return
+        try:
+            self._collection.insert_one({'scope': scope, 'value': value, 'created_at': datetime.utcnow()})
+        except Exception as e:
+            logger.error(f"Error publishing auth cache invalidation: {e}")
+
+    def _poll(self):
+        """Apply other workers' invalidations, at most once per poll interval"""
+        now = time.monotonic()
+        if now < self._next_poll or not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_poll = now + self.poll_seconds
+            self._connect()
+            if self._collection is None:
+                return
+            started = datetime.utcnow()
+            since = self._polled_until - self.poll_overlap
+            changes = [
+                change for change in self._collection.find({'created_at': {'$gte': since}}).sort('created_at', 1)
+                if change['_id'] not in self._applied
+            ]
+            for change in changes:
+                self._invalidate_local(change['scope'], change['value'])
+                self._applied[change['_id']] = change['created_at']
+            # Entries older than the next poll's window cannot come back
+            next_since = started - self.poll_overlap
+            self._applied = {
+                _id: created_at for _id, created_at in self._applied.items() if created_at >= next_since
+            }
+            self._polled_until = started
+            if changes:
+                with self._lock:
+                    self._counts['remote_invalidations'] += len(changes)
+        except Exception as e:
+            logger.error(f"Error polling auth cache invalidations: {e}")
+            # Without the log we cannot tell what changed elsewhere; start over
+            self.clear()
+        finally:
+            self._poll_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._entries)
+        lookups = counts['hits'] + counts['misses']
+        return {
+            'enabled': self.enabled,
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'shared_invalidations': self._collection is not None,
+            **counts,
+            'hit_rate': round(counts['hits'] / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global instance
+principal_cache = PrincipalCache()
+mongo_connection.after_fork(principal_cache._after_fork)
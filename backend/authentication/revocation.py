@@ -0,0 +1,193 @@
+"""
+Revocation list for JWT access and refresh tokens
+Revoked token ids (jti) are stored in the small revoked_jwts collection until
+the token would have expired anyway (a TTL index removes them), and every
+worker keeps them in an in-memory set refreshed at most every
+AUTH_JWT_REVOCATION_REFRESH_SECONDS. In stateless mode (AUTH_JWT_STATELESS)
+a change to the claims a token carries revokes every token issued to that
+user before the change. While MongoDB is unreachable revocations are kept
+locally and written once a reconnect (tried every MONGODB_RECONNECT_SECONDS)
+succeeds.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from mongodb_integration.connection import mongo_connection
+
+logger = logging.getLogger(__name__)
+
+REVOKED_COLLECTION = 'revoked_jwts'
+
+# User fields copied into stateless tokens (authentication.utils.get_tokens_for_user)
+CLAIM_FIELDS = ('username', 'email', 'role', 'is_staff', 'is_active')
+
+
+def refresh_token_lifetime() -> float:
+    """Longest lifetime of any token we issue, in seconds"""
+    from rest_framework_simplejwt.settings import api_settings
+    return max(api_settings.REFRESH_TOKEN_LIFETIME, api_settings.ACCESS_TOKEN_LIFETIME).total_seconds()
+
+
+class TokenRevocationList:
+    """In-memory view of revoked_jwts: revoked jti -> exp, user id -> tokens issued before this are revoked"""
+
+    def __init__(self):
+        self.stateless = getattr(settings, 'AUTH_JWT_STATELESS', False)
+        self.refresh_seconds = getattr(settings, 'AUTH_JWT_REVOCATION_REFRESH_SECONDS', 30)
+
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._collection = None
+        self._connected = False
+        self._failed_at: Optional[float] = None
+        # Revocations made while MongoDB was unreachable, written on the next successful connect
+        self._unsaved: List[Dict] = []
+        self._loaded_until: Optional[datetime] = None
+        self._next_refresh = 0.0
+
+    def _connect(self):
+        """Find revoked_jwts on first use; while MongoDB is unreachable revocations stay local and it is retried"""
+        if self._connected:
+            return
+        retry_seconds = getattr(settings, 'MONGODB_RECONNECT_SECONDS', 30)
+        if self._failed_at is not None and time.monotonic() - self._failed_at < retry_seconds:
+            return
+        try:
+            if not mongo_connection.ping(timeout=5):
+                raise ConnectionError('MongoDB is not reachable')
+            self._collection = mongo_connection.get_database()[REVOKED_COLLECTION]
+        except Exception as e:
+            logger.warning(f"JWT revocations are local to this process, retrying in {retry_seconds}s: {e}")
+            self._collection = None
+            self._failed_at = time.monotonic()
+            return
+        self._failed_at = None
+        self._connected = True
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+        for document in unsaved:
+            self._store(document)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._collection = None
+        self._connected = False
+        self._failed_at = None
+        self._loaded_until = None
+        self._next_refresh = 0.0
+
+    # Checks
+
+    def is_revoked(self, payload: Dict) -> bool:
+        """True if the decoded token was revoked, or issued before its user's claims changed"""
+        self._refresh()
+        jti = payload.get('jti')
+        if jti and jti in self._tokens:
+            return True
+        revoked_user = self._users.get(str(payload.get('user_id')))
+        return bool(revoked_user) and payload.get('iat', 0) < revoked_user['not_before']
+
+    # Revocation
+
+    def revoke(self, payload: Dict):
+        """Revoke one decoded token (logout) until it expires"""
+        jti = payload.get('jti')
+        if not jti:
+            return
+        expires = float(payload.get('exp') or time.time() + refresh_token_lifetime())
+        with self._lock:
+            self._tokens[jti] = expires
+        self._store({
+            '_id': f'jti:{jti}',
+            'jti': jti,
+            'user_id': str(payload.get('user_id')),
+            'revoked_at': datetime.utcnow(),
+            'expires_at': datetime.utcfromtimestamp(expires),
+        })
+
+    def claims_changed(self, user_id):
+        """In stateless mode, revoke the user's earlier tokens because their claims are stale"""
+        if not self.stateless:
+            return
+        user_id = str(user_id)
+        # Whole seconds, like iat: a token issued in the same second as the change stays valid
+        not_before = float(int(time.time()))
+        expires = not_before + refresh_token_lifetime()
+        with self._lock:
+            self._users[user_id] = {'not_before': not_before, 'expires': expires}
+        self._store({
+            '_id': f'user:{user_id}',
+            'user_id': user_id,
+            'not_before': not_before,
+            'revoked_at': datetime.utcnow(),
+            'expires_at': datetime.utcfromtimestamp(expires),
+        })
+
+    def _store(self, document: Dict):
+        self._connect()
+        if self._collection is None:
+            with self._lock:
+                self._unsaved.append(document)
+            return
+        try:
+            self._collection.replace_one({'_id': document['_id']}, document, upsert=True)
+        except Exception as e:
+            logger.error(f"Error storing JWT revocation: {e}")
+
+    def _refresh(self):
+        """Pull revocations made by other workers, at most once per refresh interval"""
+        now = time.monotonic()
+        if now < self._next_refresh or not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = now + self.refresh_seconds
+            self._connect()
+            self._prune()
+            if self._collection is None:
+                return
+            started = datetime.utcnow()
+            query = {'expires_at': {'$gt': started}}
+            if self._loaded_until is not None:
+                # Overlap a little so writes that raced the previous refresh are not missed
+                query['revoked_at'] = {'$gte': self._loaded_until - timedelta(seconds=5)}
+            for doc in self._collection.find(query, {'revoked_at': 0}):
+                expires = doc['expires_at'].replace(tzinfo=None)
+                expires = (expires - datetime(1970, 1, 1)).total_seconds()
+                with self._lock:
+                    if 'jti' in doc:
+                        self._tokens[doc['jti']] = expires
+                    else:
+                        self._users[doc['user_id']] = {'not_before': doc['not_before'], 'expires': expires}
+            self._loaded_until = started
+        except Exception as e:
+            logger.error(f"Error refreshing JWT revocations: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _prune(self):
+        """Drop entries for tokens that have expired on their own"""
+        now = time.time()
+        with self._lock:
+            self._tokens = {jti: expires for jti, expires in self._tokens.items() if expires > now}
+            self._users = {user: entry for user, entry in self._users.items() if entry['expires'] > now}
+            self._unsaved = [document for document in self._unsaved if document['expires_at'] > datetime.utcnow()]
+
+    def stats(self) -> Dict:
+        return {
+            'stateless': self.stateless,
+            'revoked_tokens': len(self._tokens),
+            'revoked_users': len(self._users),
+            'shared': self._collection is not None,
+            'unsaved': len(self._unsaved),
+        }
+
+
+# Global instance
+token_revocations = TokenRevocationList()
+mongo_connection.after_fork(token_revocations._after_fork)
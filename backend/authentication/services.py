@@ -16,15 +16,13 @@ class ServiceInitializationError(Exception):
 _auth_mongodb_service = None
 
 def get_mongodb_service():
-    """Get the MongoDB service instance with lazy initialization"""
+    """Get the shared MongoDB service instance; it connects on its first query, not here"""
     global _auth_mongodb_service
     
     if _auth_mongodb_service is None:
         try:
-            from .mongodb_service import AuthMongoDBService
-            _auth_mongodb_service = AuthMongoDBService(connect_on_init=False)
-            _auth_mongodb_service.connect(max_retries=3, initial_delay=2)
-            logger.info("✅ Successfully initialized MongoDB service")
+            from .mongodb_service import auth_mongodb_service as service
+            _auth_mongodb_service = service
         except Exception as e:
             error_msg = f"Failed to initialize MongoDB service: {str(e)}"
             logger.error(error_msg)
@@ -33,7 +31,7 @@ def get_mongodb_service():
     
     return _auth_mongodb_service
 
-# For backward compatibility
+# For backward compatibility (no I/O: importing this module must not block worker startup)
 try:
     auth_mongodb_service = get_mongodb_service()
 except ServiceInitializationError:
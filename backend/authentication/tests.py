@@ -0,0 +1,242 @@
+import socketserver
+import threading
+import time
+from datetime import datetime
+from unittest import mock
+
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from authentication.email_queue import EmailQueue
+from authentication.mongodb_auth import resolve_authorization
+from authentication.principal_cache import PrincipalCache
+from authentication.revocation import TokenRevocationList
+from authentication.utils import get_tokens_for_user
+from authentication.views import logout_view
+from mongodb_integration.connection import mongo_connection
+
+USER = {'id': 'user-1', 'username': 'asha', 'email': 'asha@example.com', 'role': 'MANAGER', 'is_staff': False}
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's backend; counts sessions and delivered messages"""
+
+    def handle(self):
+        stub = self.server
+        with stub.lock:
+            stub.connections += 1
+        # Hold the greeting until the test lets the server answer
+        stub.ready.wait(10)
+        self.reply('220 stub')
+        in_data = False
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            if in_data:
+                if line == '.':
+                    in_data = False
+                    with stub.lock:
+                        stub.messages += 1
+                    self.reply('250 queued')
+                continue
+            command = line[:4].upper()
+            if command == 'MAIL' and stub.refuse_mail:
+                stub.refuse_mail -= 1
+                self.reply('421 try again later')
+                return
+            if command == 'DATA':
+                in_data = True
+                self.reply('354 go ahead')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPStubHandler)
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.ready.set()
+        self.connections = 0
+        self.messages = 0
+        # Number of MAIL commands to answer with 421 (and hang up)
+        self.refuse_mail = 0
+
+
+class EmailQueueTests(SimpleTestCase):
+    """The queue sends in the background over one reused SMTP session and retries transient failures"""
+
+    def setUp(self):
+        self.stub = SMTPStub()
+        threading.Thread(target=self.stub.serve_forever, daemon=True).start()
+        self.addCleanup(self.stub.server_close)
+        self.addCleanup(self.stub.shutdown)
+
+        overrides = override_settings(
+            EMAIL_BACKEND='authentication.email_backend.CustomSMTPEmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.stub.server_address[1],
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_TIMEOUT=5,
+            EMAIL_QUEUE_ENABLED=True,
+            EMAIL_QUEUE_RETRY_SECONDS=0.05,
+            DEBUG=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.queue = EmailQueue()
+        self.addCleanup(self.queue._close)
+
+    def message(self, index=0):
+        return EmailMessage(f'OTP {index}', 'Your code is 123456', 'noreply@example.com', [f'user{index}@example.com'])
+
+    def test_messages_share_one_connection(self):
+        for index in range(5):
+            self.queue.send(self.message(index))
+
+        self.assertTrue(self.queue.flush(10))
+        self.assertEqual(self.stub.messages, 5)
+        self.assertEqual(self.stub.connections, 1)
+        self.assertEqual(self.queue.stats()['sent'], 5)
+
+    def test_421_is_retried_on_a_new_connection(self):
+        self.stub.refuse_mail = 1
+        self.queue.send(self.message())
+
+        self.assertTrue(self.queue.flush(10))
+        stats = self.queue.stats()
+        self.assertEqual(self.stub.messages, 1)
+        self.assertEqual((stats['retried'], stats['sent'], stats['failed']), (1, 1, 0))
+        self.assertEqual(self.stub.connections, 2)
+
+    def test_send_does_not_wait_for_smtp(self):
+        self.stub.ready.clear()
+        started = time.monotonic()
+        for index in range(3):
+            self.assertTrue(self.queue.send(self.message(index)))
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self.stub.messages, 0)
+        self.stub.ready.set()
+        self.assertTrue(self.queue.flush(10))
+        self.assertEqual(self.stub.messages, 3)
+
+
+@override_settings(MONGODB_RECONNECT_SECONDS=0, AUTH_PRINCIPAL_CACHE_POLL_SECONDS=0)
+class PrincipalCacheTests(SimpleTestCase):
+    """A worker whose first look at the invalidation log failed keeps trying and catches up"""
+
+    def test_first_ping_failing_does_not_stop_invalidations(self):
+        cache = PrincipalCache()
+        collection = mock.MagicMock()
+        collection.find.return_value.sort.return_value = []
+
+        with mock.patch.object(mongo_connection, 'ping', return_value=False):
+            cache.set('jwt', 'token-1', {'id': 'user-1'})
+            self.assertIsNotNone(cache.get('jwt', 'token-1'))
+            cache.invalidate_user('user-2')
+        self.assertFalse(cache.stats()['shared_invalidations'])
+
+        with mock.patch.object(mongo_connection, 'ping', return_value=True), \
+                mock.patch.object(mongo_connection, 'get_database', return_value={'auth_cache_invalidations': collection}):
+            # Reconnecting drops what may have changed unseen and publishes the local invalidation
+            self.assertIsNone(cache.get('jwt', 'token-1'))
+            self.assertTrue(cache.stats()['shared_invalidations'])
+            published = collection.insert_one.call_args[0][0]
+            self.assertEqual((published['scope'], published['value']), ('user', 'user-2'))
+
+            # Another worker revokes user-1's access; the next lookup polls the log and sees it
+            cache.set('jwt', 'token-1', {'id': 'user-1'})
+            collection.find.return_value.sort.return_value = [
+                {'_id': 'change-1', 'scope': 'user', 'value': 'user-1', 'created_at': datetime.utcnow()}
+            ]
+            self.assertIsNone(cache.get('jwt', 'token-1'))
+
+
+@override_settings(AUTH_JWT_STATELESS=True)
+class TokenRevocationTests(SimpleTestCase):
+    """Stateless JWTs stop working after logout and after the claims they carry change"""
+
+    def setUp(self):
+        # No MongoDB: the revocation list stays local to this process
+        patcher = mock.patch.object(mongo_connection, 'ping', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.revocations = TokenRevocationList()
+        for module in ('authentication.mongodb_auth', 'authentication.views'):
+            patcher = mock.patch(f'{module}.token_revocations', self.revocations)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def authenticate(self, access):
+        principal = resolve_authorization(f'Bearer {access}')
+        return principal[0] if principal else None
+
+    def test_tokens_carry_the_users_email(self):
+        # login_view passes the login name, which may be the username
+        tokens = get_tokens_for_user(USER['id'], USER['username'], USER)
+
+        self.assertEqual(AccessToken(tokens['access'])['email'], USER['email'])
+        self.assertEqual(self.authenticate(tokens['access']).email, USER['email'])
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        tokens = get_tokens_for_user(USER['id'], USER['email'], USER)
+        self.assertEqual(self.authenticate(tokens['access']).id, USER['id'])
+
+        request = APIRequestFactory().post(
+            '/api/auth/logout/', {'refresh': tokens['refresh']}, format='json',
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access']}"
+        )
+        response = logout_view(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.authenticate(tokens['access']))
+        self.assertTrue(self.revocations.is_revoked(RefreshToken(tokens['refresh']).payload))
+
+    def test_claim_change_rejects_tokens_issued_before_it(self):
+        old = AccessToken(get_tokens_for_user(USER['id'], USER['email'], USER)['access'])
+        old['iat'] = int(time.time()) - 60
+        self.assertIsNotNone(self.authenticate(str(old)))
+
+        self.revocations.claims_changed(USER['id'])
+
+        self.assertIsNone(self.authenticate(str(old)))
+        # Re-issued after the change (same second counts as after)
+        fresh = get_tokens_for_user(USER['id'], USER['email'], {**USER, 'role': 'ADMIN'})['access']
+        self.assertEqual(self.authenticate(fresh).role, 'ADMIN')
+
+    def test_refresh_token_is_not_an_access_token(self):
+        tokens = get_tokens_for_user(USER['id'], USER['email'], USER)
+
+        self.assertIsNone(self.authenticate(tokens['refresh']))
+
+    @override_settings(MONGODB_RECONNECT_SECONDS=0)
+    def test_reconnects_after_a_failed_ping_and_stores_local_revocations(self):
+        tokens = get_tokens_for_user(USER['id'], USER['email'], USER)
+        self.revocations.revoke(AccessToken(tokens['access']).payload)
+        self.assertEqual(self.revocations.stats()['unsaved'], 1)
+
+        collection = mock.MagicMock()
+        collection.find.return_value = []
+        with mock.patch.object(mongo_connection, 'ping', return_value=True), \
+                mock.patch.object(mongo_connection, 'get_database', return_value={'revoked_jwts': collection}):
+            self.revocations.claims_changed(USER['id'])
+
+        self.assertTrue(self.revocations.stats()['shared'])
+        self.assertEqual(self.revocations.stats()['unsaved'], 0)
+        stored = [call.args[0]['_id'] for call in collection.replace_one.call_args_list]
+        self.assertEqual(stored, [f"jti:{AccessToken(tokens['access'])['jti']}", f"user:{USER['id']}"])
@@ -10,6 +10,7 @@ urlpatterns = [
     path('password-reset/request/', views.password_reset_request, name='password_reset_request'),
     path('password-reset/verify-otp/', views.password_reset_verify_otp, name='password_reset_verify_otp'),
     path('password-reset/confirm/', views.password_reset_confirm, name='password_reset_confirm'),
+    path('users/', views.UserListView.as_view(), name='user_list'),
     path('organizations/', views.OrganizationListView.as_view(), name='organization_list'),
     path('organizations/<str:org_id>/', views.OrganizationDetailView.as_view(), name='organization_detail'),
     path('profile/upload-image/', views.upload_profile_image, name='upload_profile_image'),
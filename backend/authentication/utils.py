@@ -2,28 +2,35 @@
 Utility functions for authentication app
 """
 import logging
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 
 logger = logging.getLogger(__name__)
 
-def get_tokens_for_user(user_id, email):
+def get_tokens_for_user(user_id, email, user=None):
     """
     Generate tokens for the user.
     - Primary: JWT access/refresh tokens signed with SECRET_KEY
     - Compatibility: include 'token' alias (access) for existing frontend
+    - With the user document, the tokens also carry the claims MongoDBUser needs
+      (username, role, is_staff) so AUTH_JWT_STATELESS can skip the user lookup;
+      the email claim is then taken from the document too
     """
     from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-    access = AccessToken()
-    access['user_id'] = str(user_id)
-    access['email'] = email
+    claims = {'user_id': str(user_id), 'email': email}
+    if user:
+        claims.update({
+            'email': user.get('email') or email,
+            'username': user.get('username', ''),
+            'role': user.get('role', 'VIEWER'),
+            'is_staff': bool(user.get('is_staff', False)),
+        })
 
+    access = AccessToken()
     refresh = RefreshToken()
-    refresh['user_id'] = str(user_id)
-    refresh['email'] = email
+    for claim, value in claims.items():
+        access[claim] = value
+        refresh[claim] = value
 
     return {
         'access': str(access),
@@ -40,7 +47,7 @@ def send_password_reset_email(email, otp):
         otp (str): The OTP to include in the email
         
     Returns:
-        bool: True if email was sent successfully, False otherwise
+        bool: True if email was queued successfully, False otherwise
     """
     try:
         subject = 'Password Reset Request'
@@ -52,31 +59,15 @@ def send_password_reset_email(email, otp):
             'support_email': settings.DEFAULT_FROM_EMAIL,
         }
         
-        # Render HTML email
-        html_message = render_to_string('emails/password_reset.html', context)
-        plain_message = f"""
-        Your password reset OTP is: {otp}
-        
-        This OTP is valid for 10 minutes.
-        
-        If you didn't request this, please ignore this email.
-        """
-        
-        # Send email
         # If email backend creds are missing, fall back to console log
         if not settings.EMAIL_HOST_USER or not settings.EMAIL_HOST_PASSWORD:
             logger.warning(f"EMAIL not configured; OTP for {email}: {otp}")
         else:
-            send_mail(
-                subject=subject,
-                message=strip_tags(plain_message),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                html_message=html_message,
-                fail_silently=False,
-            )
+            # Rendered from emails/password_reset.html/.txt and delivered by the email queue
+            from .email_service import EmailService
+            EmailService.queue_email(email, subject, 'password_reset', context)
         
-        logger.info(f"Password reset email sent to {email}")
+        logger.info(f"Password reset email queued for {email}")
         return True
         
     except Exception as e:
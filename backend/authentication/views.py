@@ -3,7 +3,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from .mongodb_service import AuthMongoDBService
+from .services import get_mongodb_service
+from mongodb_integration.pagination import InvalidCursor
 from .serializers import (
     UserRegistrationSerializer,
     LoginSerializer,
@@ -14,7 +15,9 @@ from .serializers import (
     OrganizationSerializer
 )
 from .utils import get_tokens_for_user, send_password_reset_email
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from .revocation import token_revocations
 from rest_framework.decorators import api_view, permission_classes
 from django.core.exceptions import ValidationError
 from django.http import JsonResponse
@@ -28,7 +31,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 # Initialize MongoDB service
-mongo_service = AuthMongoDBService()
+mongo_service = get_mongodb_service()
 
 class RegisterView(APIView):
     def post(self, request):
@@ -43,15 +46,20 @@ class RegisterView(APIView):
                         status=status.HTTP_400_BAD_REQUEST
                     )
                 
-                # Create user in MongoDB
-                user_id = mongo_service.create_user(user_data)
+                # Create user in MongoDB (returns the stored user without password)
+                user = mongo_service.create_user(user_data)
+                if not user:
+                    return Response(
+                        {'error': 'User with this username or email already exists.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
                 
                 # Generate tokens
-                tokens = get_tokens_for_user(str(user_id), user_data['email'])
+                tokens = get_tokens_for_user(user['id'], user['email'], user)
                 
                 return Response({
                     'message': 'User registered successfully',
-                    'user_id': str(user_id),
+                    'user_id': user['id'],
                     'tokens': tokens
                 }, status=status.HTTP_201_CREATED)
                 
@@ -75,7 +83,7 @@ def login_view(request):
             if user:
                 # Generate token and respond in shape expected by frontend
                 user_id = user.get('id') or str(user.get('_id'))
-                tokens = get_tokens_for_user(user_id, username)
+                tokens = get_tokens_for_user(user_id, username, user)
                 token_value = tokens.get('access') or tokens.get('token')
 
                 # Minimal safe user payload for client
@@ -114,9 +122,13 @@ def logout_view(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Add token to blacklist
-        token = RefreshToken(refresh_token)
-        token.blacklist()
+        # Revoke the refresh token and the access token used for this request
+        token_revocations.revoke(RefreshToken(refresh_token).payload)
+        if isinstance(request.auth, str):
+            try:
+                token_revocations.revoke(AccessToken(request.auth).payload)
+            except TokenError:
+                pass  # opaque Token auth, nothing to revoke
         
         return Response({'message': 'Successfully logged out'})
     except Exception as e:
@@ -289,6 +301,37 @@ def password_reset_confirm(request):
             )
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class UserListView(APIView):
+    """Admin listing of users; ?cursor= (empty for the first page) switches to keyset pagination"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not (getattr(request.user, 'role', None) == 'ADMIN' or request.user.is_staff):
+            return Response(
+                {'error': 'Admin access required'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), 100)
+            if 'cursor' in request.query_params:
+                return Response(mongo_service.get_users_page(
+                    limit=limit,
+                    cursor=request.query_params.get('cursor')
+                ))
+            
+            skip = int(request.query_params.get('skip', 0))
+            return Response(mongo_service.get_all_users(limit=limit, skip=skip))
+        except (InvalidCursor, ValueError) as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 class OrganizationListView(APIView):
     permission_classes = [IsAuthenticated]
 
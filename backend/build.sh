@@ -9,4 +9,12 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Apply database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Remove expired and duplicate auth tokens / reset OTPs, which would keep their
+# unique indexes from building (safe to repeat on every deploy)
+python manage.py cleanup_auth_tokens
+
+# Create the MongoDB indexes the apps declare and fail the build if one is missing
+# or a registered query shape would still scan its whole collection
+python manage.py ensure_mongodb_indexes --explain
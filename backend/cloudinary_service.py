@@ -42,7 +42,7 @@ class CloudinaryService:
         Upload a file to Cloudinary
         
         Args:
-            file: File object or base64 string
+            file: File object, local file path or base64 string
             folder: Folder path in Cloudinary
             filename: Custom filename (optional)
             tags: List of tags (optional)
@@ -55,13 +55,19 @@ class CloudinaryService:
                 raise Exception("Cloudinary not initialized")
             
             # Prepare file data
-            if hasattr(file, 'read'):
-                # Django file object - reset file pointer to beginning
-                file.seek(0)
-                file_data = file.read()
+            if hasattr(file, 'temporary_file_path'):
+                # Large Django upload already on disk - let the SDK stream it from the temp file
+                file_data = file.temporary_file_path()
                 file_name = filename or file.name
-                # Reset file pointer again for any subsequent reads
+            elif hasattr(file, 'read'):
+                # Django file object - hand the SDK the file itself instead of a copy of its bytes
                 file.seek(0)
+                file_data = file
+                file_name = filename or file.name
+            elif isinstance(file, str) and os.path.isfile(file):
+                # Local path (e.g. a spooled upload) - streamed by the SDK
+                file_data = file
+                file_name = filename or os.path.basename(file)
             elif isinstance(file, bytes):
                 # Raw bytes data
                 file_data = file
@@ -7,6 +7,9 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nudrrs.settings')
+    # Time project imports when STARTUP_TIMING=True (see nudrrs.startup)
+    from nudrrs.startup import install_import_timer
+    install_import_timer()
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
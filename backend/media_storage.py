@@ -0,0 +1,329 @@
+"""
+Pluggable media storage for report attachments
+`media_storage` exposes the CloudinaryService API (upload_file, delete_file,
+get_file_info, transform_url) and routes it to the configured backend:
+Cloudinary, or a local content-addressed store for offline deployments and
+tests. Local files are stored by sha256 (identical uploads share one blob),
+thumbnails are generated on first request at a fixed set of sizes and cached
+on disk, and both are served by nudrrs.views.serve_media with ETag/Range support.
+"""
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+LOCAL_PREFIX = 'local/'
+CHUNK_SIZE = 1024 * 1024
+
+
+def _parse_sizes(value) -> Tuple[Tuple[int, int], ...]:
+    if isinstance(value, str):
+        value = [size.split('x') for size in value.split(',') if size.strip()]
+    return tuple(sorted((int(width), int(height)) for width, height in value))
+
+
+class LocalMediaStorage:
+    """Content-addressed file store under MEDIA_STORAGE_ROOT with cached thumbnails"""
+
+    def __init__(self, root=None, base_url=None, thumbnail_sizes=None):
+        self.root = str(root or getattr(settings, 'MEDIA_STORAGE_ROOT', os.path.join(settings.MEDIA_ROOT, 'store')))
+        self.base_url = (base_url or getattr(settings, 'MEDIA_STORAGE_URL', '/api/media/')).rstrip('/') + '/'
+        self.thumbnail_sizes = _parse_sizes(thumbnail_sizes or getattr(settings, 'MEDIA_THUMBNAIL_SIZES', '160x120,320x240,300x300,640x480'))
+        self._lock = threading.Lock()
+
+    # Paths
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.root, 'objects', content_hash[:2], content_hash)
+
+    def _meta_path(self, content_hash: str) -> str:
+        return self._blob_path(content_hash) + '.json'
+
+    def _thumbnail_path(self, content_hash: str, variant: str) -> str:
+        return os.path.join(self.root, 'thumbnails', content_hash[:2], f'{content_hash}_{variant}.jpg')
+
+    @staticmethod
+    def content_hash(public_id: str) -> Optional[str]:
+        """The sha256 behind a local public_id, or None for ids of other backends"""
+        if public_id and public_id.startswith(LOCAL_PREFIX):
+            content_hash = public_id[len(LOCAL_PREFIX):]
+            if len(content_hash) == 64 and all(c in '0123456789abcdef' for c in content_hash):
+                return content_hash
+        return None
+
+    def _read_meta(self, content_hash: str) -> Optional[Dict]:
+        try:
+            with open(self._meta_path(content_hash)) as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, content_hash: str, meta: Dict):
+        path = self._meta_path(content_hash)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temp_path, path)
+
+    # CloudinaryService API
+
+    def upload_file(self, file, folder="nudrrs", filename=None, tags=None):
+        """Store a file (UploadedFile, file object, local path or bytes); same result shape as Cloudinary"""
+        try:
+            if hasattr(file, 'temporary_file_path'):
+                source, name = open(file.temporary_file_path(), 'rb'), filename or file.name
+            elif hasattr(file, 'read'):
+                file.seek(0)
+                source, name = file, filename or getattr(file, 'name', None)
+            elif isinstance(file, str) and os.path.isfile(file):
+                source, name = open(file, 'rb'), filename or os.path.basename(file)
+            elif isinstance(file, bytes):
+                source, name = None, filename or 'uploaded_image.jpg'
+            else:
+                raise ValueError("Unsupported file type")
+
+            # Hash while copying to a temp file in the store, so large uploads are never held in memory
+            os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+            digest = hashlib.sha256()
+            size = 0
+            with tempfile.NamedTemporaryFile(dir=os.path.join(self.root, 'objects'), delete=False) as temp_file:
+                temp_path = temp_file.name
+                try:
+                    chunks = [file] if source is None else iter(lambda: source.read(CHUNK_SIZE), b'')
+                    for chunk in chunks:
+                        digest.update(chunk)
+                        temp_file.write(chunk)
+                        size += len(chunk)
+                finally:
+                    if source is not None and source is not file:
+                        source.close()
+
+            content_hash = digest.hexdigest()
+            blob_path = self._blob_path(content_hash)
+            with self._lock:
+                meta = self._read_meta(content_hash)
+                if meta is None or not os.path.exists(blob_path):
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(temp_path, blob_path)
+                    meta = {
+                        'bytes': size,
+                        'content_type': mimetypes.guess_type(name or '')[0] or 'application/octet-stream',
+                        'created_at': datetime.utcnow().isoformat() + 'Z',
+                        'refs': 0,
+                        'tags': [],
+                    }
+                    meta.update(self._image_info(blob_path, name))
+                else:
+                    # Identical content already stored
+                    os.unlink(temp_path)
+                meta['refs'] = meta.get('refs', 0) + 1
+                meta['tags'] = sorted(set(meta.get('tags', [])) | set(tags or []))
+                self._write_meta(content_hash, meta)
+
+            public_id = LOCAL_PREFIX + content_hash
+            url = self.base_url + content_hash + '/'
+            return {
+                'success': True,
+                'url': url,
+                'public_id': public_id,
+                'format': meta.get('format'),
+                'width': meta.get('width'),
+                'height': meta.get('height'),
+                'bytes': meta['bytes'],
+                'created_at': meta['created_at'],
+                'file_id': public_id,  # For compatibility with existing code
+                'imagekit_url': url,  # For compatibility
+                'file_url': url,  # For compatibility
+                'image_url': url,  # For compatibility
+            }
+        except Exception as e:
+            logger.error(f"Local media upload failed: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'url': None,
+                'public_id': None
+            }
+
+    @staticmethod
+    def _image_info(path: str, name: Optional[str]) -> Dict:
+        try:
+            # Header parse only
+            with Image.open(path) as img:
+                return {'format': (img.format or '').lower() or None, 'width': img.size[0], 'height': img.size[1]}
+        except Exception:
+            extension = os.path.splitext(name or '')[1].lstrip('.').lower()
+            return {'format': extension or None, 'width': None, 'height': None}
+
+    def delete_file(self, public_id):
+        """Drop one reference; the blob and its thumbnails go once no upload refers to it"""
+        content_hash = self.content_hash(public_id)
+        try:
+            if content_hash is None:
+                raise ValueError("Not a local media id")
+            with self._lock:
+                meta = self._read_meta(content_hash)
+                if meta is None:
+                    return {'success': False, 'result': 'not found', 'public_id': public_id}
+                meta['refs'] = meta.get('refs', 1) - 1
+                if meta['refs'] > 0:
+                    self._write_meta(content_hash, meta)
+                else:
+                    for path in [self._blob_path(content_hash), self._meta_path(content_hash)] + [
+                        self._thumbnail_path(content_hash, variant) for variant in self._variants()
+                    ]:
+                        if os.path.exists(path):
+                            os.unlink(path)
+            return {'success': True, 'result': 'ok', 'public_id': public_id}
+        except Exception as e:
+            logger.error(f"Local media deletion failed: {e}")
+            return {'success': False, 'error': str(e), 'public_id': public_id}
+
+    def get_file_info(self, public_id):
+        content_hash = self.content_hash(public_id)
+        meta = self._read_meta(content_hash) if content_hash else None
+        if meta is None:
+            return {'success': False, 'error': 'File not found', 'public_id': public_id}
+        return {
+            'success': True,
+            'public_id': public_id,
+            'url': self.base_url + content_hash + '/',
+            'format': meta.get('format'),
+            'width': meta.get('width'),
+            'height': meta.get('height'),
+            'bytes': meta.get('bytes'),
+            'created_at': meta.get('created_at'),
+            'tags': meta.get('tags', [])
+        }
+
+    def transform_url(self, public_id, transformations=None):
+        """URL of the smallest fixed-size thumbnail covering the requested width/height"""
+        content_hash = self.content_hash(public_id)
+        if content_hash is None:
+            return None
+        options = dict(transformations or {})
+        # Accept Cloudinary's {'transformation': [{...}]} form as well as flat options
+        for step in options.pop('transformation', None) or []:
+            options.update(step)
+        width, height = options.get('width'), options.get('height')
+        if not width and not height:
+            return self.base_url + content_hash + '/'
+        size = self.snap_size(int(width or height), int(height or width))
+        crop = 'fill' if options.get('crop') in ('fill', 'lfill', 'thumb') else 'fit'
+        return f'{self.base_url}{content_hash}/{size[0]}x{size[1]}_{crop}/'
+
+    # Serving
+
+    def snap_size(self, width: int, height: int) -> Tuple[int, int]:
+        for size in self.thumbnail_sizes:
+            if size[0] >= width and size[1] >= height:
+                return size
+        return self.thumbnail_sizes[-1]
+
+    def _variants(self):
+        return [f'{width}x{height}_{crop}' for width, height in self.thumbnail_sizes for crop in ('fill', 'fit')]
+
+    def open_original(self, content_hash: str) -> Optional[Tuple[str, Dict]]:
+        """(blob path, metadata) for a stored file, or None"""
+        meta = self._read_meta(content_hash)
+        path = self._blob_path(content_hash)
+        if meta is None or not os.path.exists(path):
+            return None
+        return path, meta
+
+    def thumbnail(self, content_hash: str, variant: str) -> Optional[str]:
+        """Path of a cached thumbnail, generating it on first use; None for unknown sizes or non-images"""
+        if variant not in self._variants():
+            return None
+        path = self._thumbnail_path(content_hash, variant)
+        if os.path.exists(path):
+            return path
+        original = self.open_original(content_hash)
+        if original is None or not original[1].get('width'):
+            return None
+
+        size, crop = variant.split('_')
+        width, height = (int(value) for value in size.split('x'))
+        try:
+            with Image.open(original[0]) as img:
+                # JPEG decoders can scale down while decoding, far cheaper than a full-size decode
+                img.draft('RGB', (width, height))
+                img = ImageOps.exif_transpose(img).convert('RGB')
+                if crop == 'fill':
+                    img = ImageOps.fit(img, (width, height), Image.LANCZOS)
+                else:
+                    img.thumbnail((width, height), Image.LANCZOS)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                img.save(temp_path, 'JPEG', quality=85, optimize=True)
+                os.replace(temp_path, path)
+            return path
+        except Exception as e:
+            logger.error(f"Thumbnail generation failed for {content_hash}: {e}")
+            return None
+
+    def path_for_url(self, url: str) -> Optional[str]:
+        """Blob path behind one of this store's URLs (used to analyse locally stored images)"""
+        if not url or not url.startswith(self.base_url):
+            return None
+        content_hash = url[len(self.base_url):].split('/')[0]
+        original = self.open_original(content_hash) if len(content_hash) == 64 else None
+        return original[0] if original else None
+
+
+class MediaStorage:
+    """Routes the storage API to the configured backend; local ids always resolve locally"""
+
+    def __init__(self):
+        self.local = LocalMediaStorage()
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    if getattr(settings, 'MEDIA_STORAGE_BACKEND', 'local') == 'cloudinary':
+                        # Imported lazily: the SDK is only needed when Cloudinary is configured
+                        from cloudinary_service import cloudinary_service
+                        self._backend = cloudinary_service
+                    else:
+                        self._backend = self.local
+        return self._backend
+
+    def _for(self, public_id):
+        return self.local if LocalMediaStorage.content_hash(public_id) else self.backend
+
+    def upload_file(self, file, folder="nudrrs", filename=None, tags=None):
+        """Upload to the configured backend, falling back to the local store if it fails"""
+        try:
+            result = self.backend.upload_file(file, folder=folder, filename=filename, tags=tags)
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'url': None, 'public_id': None}
+        if not result['success'] and self.backend is not self.local and getattr(settings, 'MEDIA_STORAGE_LOCAL_FALLBACK', True):
+            logger.warning(f"Media upload failed ({result.get('error')}), storing locally")
+            result = self.local.upload_file(file, folder=folder, filename=filename, tags=tags)
+        return result
+
+    def delete_file(self, public_id):
+        return self._for(public_id).delete_file(public_id)
+
+    def get_file_info(self, public_id):
+        return self._for(public_id).get_file_info(public_id)
+
+    def transform_url(self, public_id, transformations=None):
+        return self._for(public_id).transform_url(public_id, transformations)
+
+
+# Global instance
+media_storage = MediaStorage()
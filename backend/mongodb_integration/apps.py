@@ -1,6 +1,47 @@
+import logging
+import threading
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 class MongodbIntegrationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mongodb_integration'
-    verbose_name = 'MongoDB Integration'
\ No newline at end of file
+    verbose_name = 'MongoDB Integration'
+
+    def ready(self):
+        # Apps listed before this one have registered their indexes by now
+        if getattr(settings, 'MONGODB_AUTO_CREATE_INDEXES', False):
+            thread = threading.Thread(target=self._ensure_indexes, name='mongodb-index-provisioning', daemon=True)
+            thread.start()
+        if getattr(settings, 'MONGODB_WARMUP', False):
+            thread = threading.Thread(target=self.warm_up, name='mongodb-warmup', daemon=True)
+            thread.start()
+
+    @staticmethod
+    def warm_up():
+        """Connect the lazy MongoDB service singletons ahead of the first request"""
+        from authentication.mongodb_service import auth_mongodb_service
+        from notifications.mongodb_service import notification_mongodb_service
+        from sos_reports.mongodb_service import mongodb_service
+
+        for service in (mongodb_service, notification_mongodb_service, auth_mongodb_service):
+            if service.db is None:
+                logger.warning(f"MongoDB warm-up: {type(service).__name__} could not connect")
+
+    @staticmethod
+    def _ensure_indexes():
+        """Create registered indexes in the background so worker boot is not blocked"""
+        from .connection import mongo_connection
+        from .indexes import MongoIndexManager
+
+        try:
+            manager = MongoIndexManager(mongo_connection.get_database())
+            result = manager.ensure_indexes()
+            if result['created']:
+                logger.info(f"Created MongoDB indexes: {', '.join(result['created'])}")
+            if result['failed']:
+                logger.error(f"Failed to create MongoDB indexes: {', '.join(result['failed'])}")
+        except Exception as e:
+            logger.warning(f"MongoDB index provisioning skipped: {e}")
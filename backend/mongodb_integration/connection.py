@@ -0,0 +1,265 @@
+"""
+Shared MongoDB connection for the whole process
+Every service (reports, notifications, auth, the AI job queue and cache, and
+mongoengine) gets its database handle from `mongo_connection`, so a worker holds
+one configured MongoClient and one connection pool instead of one per module.
+Pool size, timeouts, read preference and compression come from the MONGODB_*
+settings. After os.fork() (pre-fork servers) the child drops the inherited
+client and the services re-bind to a fresh one on first use. Services derive
+from LazyMongoService, so importing them does no network I/O: the first
+access to `service.db` connects.
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional
+import pymongo
+from django.conf import settings
+from pymongo import MongoClient, monitoring
+from nudrrs.startup import startup_timings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts pool events per server; read by MongoConnectionManager.stats()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.servers: Dict[str, Dict[str, int]] = {}
+
+    def _inc(self, address, name, amount=1):
+        key = f'{address[0]}:{address[1]}'
+        with self._lock:
+            server = self.servers.setdefault(key, {
+                'connections_open': 0, 'connections_created': 0, 'connections_closed': 0,
+                'checked_out': 0, 'checkouts': 0, 'checkout_failures': 0, 'pool_cleared': 0,
+            })
+            server[name] += amount
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {address: dict(counts) for address, counts in self.servers.items()}
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._inc(event.address, 'pool_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._inc(event.address, 'connections_created')
+        self._inc(event.address, 'connections_open')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._inc(event.address, 'connections_closed')
+        self._inc(event.address, 'connections_open', -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc(event.address, 'checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._inc(event.address, 'checkouts')
+        self._inc(event.address, 'checked_out')
+
+    def connection_checked_in(self, event):
+        self._inc(event.address, 'checked_out', -1)
+
+
+class MongoConnectionManager:
+    """Owns the process-wide MongoClient; rebuilt lazily after a fork"""
+
+    def __init__(self):
+        self._client: Optional[MongoClient] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._fork_callbacks: List[Callable[[], Optional[Callable]]] = []
+        self.pool_stats = PoolStatsListener()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def client_options(self) -> Dict:
+        """MongoClient keyword arguments built from settings"""
+        options = {
+            'maxPoolSize': getattr(settings, 'MONGODB_MAX_POOL_SIZE', 50),
+            'minPoolSize': getattr(settings, 'MONGODB_MIN_POOL_SIZE', 0),
+            'maxIdleTimeMS': getattr(settings, 'MONGODB_MAX_IDLE_TIME_MS', 300000),
+            'waitQueueTimeoutMS': getattr(settings, 'MONGODB_WAIT_QUEUE_TIMEOUT_MS', 10000),
+            'serverSelectionTimeoutMS': getattr(settings, 'MONGODB_SERVER_SELECTION_TIMEOUT_MS', 10000),
+            'connectTimeoutMS': getattr(settings, 'MONGODB_CONNECT_TIMEOUT_MS', 15000),
+            'socketTimeoutMS': getattr(settings, 'MONGODB_SOCKET_TIMEOUT_MS', 30000),
+            'retryWrites': True,
+            'retryReads': True,
+            'readPreference': getattr(settings, 'MONGODB_READ_PREFERENCE', 'primary'),
+            'appname': getattr(settings, 'MONGODB_APP_NAME', 'nudrrs'),
+            # Sockets are opened on the first operation, not at construction
+            'connect': False,
+        }
+        compressors = getattr(settings, 'MONGODB_COMPRESSORS', '')
+        if compressors:
+            options['compressors'] = compressors
+        return options
+
+    @property
+    def client(self) -> MongoClient:
+        """The shared client, created on first use in this process"""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = MongoClient(
+                        settings.MONGODB_SETTINGS['host'],
+                        event_listeners=[self.pool_stats],
+                        **self.client_options()
+                    )
+                    self._pid = os.getpid()
+                    logger.info(f"MongoDB client created for process {self._pid}")
+        return self._client
+
+    def get_database(self, name: Optional[str] = None):
+        """Database handle on the shared client (the configured database by default)"""
+        return self.client[name or settings.MONGODB_SETTINGS['db']]
+
+    def ping(self, timeout: Optional[float] = None) -> bool:
+        """True if the server answers; `timeout` (seconds) bounds this call only"""
+        try:
+            if timeout:
+                with pymongo.timeout(timeout):
+                    self.client.admin.command('ping')
+            else:
+                self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB ping failed: {e}")
+            return False
+
+    def after_fork(self, callback: Callable[[], None]):
+        """Run `callback` in a forked child so a service can drop handles bound to the parent's client
+
+        Bound methods are held weakly, so short-lived service instances are not kept alive.
+        """
+        if hasattr(callback, '__self__'):
+            self._fork_callbacks.append(weakref.WeakMethod(callback))
+        else:
+            self._fork_callbacks.append(lambda: callback)
+
+    def _after_fork(self):
+        # The parent's client (sockets, monitor threads, locks) must not be used or closed in the child
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pool_stats = PoolStatsListener()
+        self._fork_callbacks = [reference for reference in self._fork_callbacks if reference() is not None]
+        for reference in self._fork_callbacks:
+            try:
+                reference()()
+            except Exception as e:
+                logger.error(f"MongoDB after-fork callback failed: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+    def stats(self) -> Dict:
+        options = self.client_options()
+        return {
+            'pid': os.getpid(),
+            'client_created': self._client is not None and self._pid == os.getpid(),
+            'max_pool_size': options['maxPoolSize'],
+            'min_pool_size': options['minPoolSize'],
+            'read_preference': options['readPreference'],
+            'compressors': options.get('compressors', ''),
+            'servers': self.pool_stats.snapshot(),
+        }
+
+
+class LazyMongoService:
+    """Base for the MongoDB service singletons: `self.db` connects on first access, not in the constructor
+
+    Subclasses implement connect(), which sets self.db (None on failure). After a
+    failure, `self.db` is None until MONGODB_RECONNECT_SECONDS have passed, then
+    the next access tries again. Forked children re-connect on their own.
+    """
+
+    _db = None
+    _db_resolved = False
+    _db_failed_at = None
+    client = None
+
+    @property
+    def db(self):
+        if not self._db_resolved and self._connect_due():
+            with self._connect_lock():
+                if not self._db_resolved and self._connect_due():
+                    started = time.perf_counter()
+                    self._lazy_connect()
+                    startup_timings.record_connect(type(self).__name__, time.perf_counter() - started, self._db is not None)
+                    if self._db is None:
+                        self._db_failed_at = time.monotonic()
+        return self._db
+
+    @db.setter
+    def db(self, value):
+        self._db = value
+        self._db_resolved = value is not None
+        if value is not None:
+            self._db_failed_at = None
+
+    def _connect_due(self) -> bool:
+        retry_seconds = getattr(settings, 'MONGODB_RECONNECT_SECONDS', 30)
+        return self._db_failed_at is None or time.monotonic() - self._db_failed_at >= retry_seconds
+
+    def _connect_lock(self) -> threading.Lock:
+        # dict.setdefault is atomic, so concurrent first accesses share one lock
+        return self.__dict__.setdefault('_lock_for_connect', threading.Lock())
+
+    def _lazy_connect(self):
+        self.connect()
+
+    def _rebind(self):
+        """After a fork: drop the parent's handles and connect again on next use"""
+        self.__dict__.pop('_lock_for_connect', None)
+        self.client = None
+        self.db = None
+        self._db_failed_at = None
+
+
+def shared_mongo_client(**_ignored):
+    """mongoengine `mongo_client_class`: hand it the shared client instead of building its own"""
+    return mongo_connection.client
+
+
+def release_mongoengine(keep_registration: bool = True):
+    """Forget mongoengine's cached client without closing it (it is the shared one)"""
+    from mongoengine import connection as mongoengine_connection
+    alias = mongoengine_connection.DEFAULT_CONNECTION_NAME
+    mongoengine_connection._connections.pop(alias, None)
+    mongoengine_connection._dbs.pop(alias, None)
+    if not keep_registration:
+        mongoengine_connection._connection_settings.pop(alias, None)
+
+
+# Global instance
+mongo_connection = MongoConnectionManager()
+# mongoengine re-connects to the child's client on its next query
+mongo_connection.after_fork(release_mongoengine)
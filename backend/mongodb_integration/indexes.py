@@ -0,0 +1,151 @@
+"""
+Declarative MongoDB index management
+Apps register the indexes their query shapes need; the manager creates them,
+verifies them and explains the registered query shapes to catch COLLSCAN plans.
+"""
+import logging
+from typing import Dict, List, Optional
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# collection name -> {'indexes': [...], 'query_shapes': [...]}
+INDEX_REGISTRY: Dict[str, Dict[str, List[Dict]]] = {}
+
+
+def register_indexes(collection: str, indexes: List[Dict], query_shapes: Optional[List[Dict]] = None):
+    """Register index specs (and the query shapes they serve) for a collection
+
+    Index spec: {'name': str, 'keys': [(field, direction), ...], 'options': {...}, 'used_by': [...]}
+    Query shape: {'name': str, 'filter': {...}, 'sort': [(field, direction), ...], 'used_by': str}
+    """
+    entry = INDEX_REGISTRY.setdefault(collection, {'indexes': [], 'query_shapes': []})
+    registered = {index['name'] for index in entry['indexes']}
+    for index in indexes:
+        if index['name'] not in registered:
+            entry['indexes'].append(index)
+    entry['query_shapes'].extend(query_shapes or [])
+
+
+def _key_pattern(keys) -> tuple:
+    """Normalise an index key pattern for comparison"""
+    return tuple((field, direction) for field, direction in keys)
+
+
+def _plan_stages(plan) -> List[str]:
+    """Collect every stage name in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+class MongoIndexManager:
+    """Creates and verifies the registered indexes against a database"""
+
+    def __init__(self, db, registry: Optional[Dict] = None):
+        self.db = db
+        self.registry = INDEX_REGISTRY if registry is None else registry
+
+    def _existing_indexes(self, collection: str) -> Dict[tuple, str]:
+        """Map key pattern -> index name for indexes that already exist"""
+        try:
+            info = self.db[collection].index_information()
+        except OperationFailure:
+            return {}
+        return {_key_pattern(spec['key']): name for name, spec in info.items()}
+
+    def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create every registered index that does not exist yet"""
+        result = {'created': [], 'existing': [], 'failed': []}
+
+        for collection, entry in self.registry.items():
+            existing = self._existing_indexes(collection)
+            to_create = []
+
+            for index in entry['indexes']:
+                label = f"{collection}.{index['name']}"
+                if _key_pattern(index['keys']) in existing:
+                    result['existing'].append(label)
+                else:
+                    to_create.append(IndexModel(index['keys'], name=index['name'], **index.get('options', {})))
+
+            if not to_create:
+                continue
+
+            try:
+                created = self.db[collection].create_indexes(to_create)
+                result['created'].extend(f"{collection}.{name}" for name in created)
+            except OperationFailure:
+                # Fall back to one at a time so a single conflict does not block the rest
+                for model in to_create:
+                    name = model.document['name']
+                    try:
+                        self.db[collection].create_indexes([model])
+                        result['created'].append(f"{collection}.{name}")
+                    except OperationFailure as index_error:
+                        logger.error(f"Failed to create index {collection}.{name}: {index_error}")
+                        result['failed'].append(f"{collection}.{name}")
+
+        return result
+
+    def find_missing(self) -> List[str]:
+        """Registered indexes that do not exist in the database"""
+        missing = []
+        for collection, entry in self.registry.items():
+            existing = self._existing_indexes(collection)
+            for index in entry['indexes']:
+                if _key_pattern(index['keys']) not in existing:
+                    missing.append(f"{collection}.{index['name']}")
+        return missing
+
+    def find_unused(self) -> List[Dict]:
+        """Indexes on registered collections with no recorded accesses since server start"""
+        unused = []
+        for collection, entry in self.registry.items():
+            declared = {_key_pattern(index['keys']) for index in entry['indexes']}
+            try:
+                stats = list(self.db[collection].aggregate([{'$indexStats': {}}]))
+            except OperationFailure as e:
+                logger.warning(f"$indexStats unavailable for {collection}: {e}")
+                continue
+
+            for stat in stats:
+                if stat['name'] == '_id_':
+                    continue
+                if stat.get('accesses', {}).get('ops', 0) == 0:
+                    unused.append({
+                        'collection': collection,
+                        'name': stat['name'],
+                        'declared': _key_pattern(stat['key'].items()) in declared,
+                        'since': stat.get('accesses', {}).get('since'),
+                    })
+        return unused
+
+    def explain_query_shapes(self) -> List[Dict]:
+        """Explain every registered query shape and flag the ones that fall back to COLLSCAN"""
+        results = []
+        for collection, entry in self.registry.items():
+            for shape in entry['query_shapes']:
+                cursor = self.db[collection].find(shape.get('filter', {}))
+                if shape.get('sort'):
+                    cursor = cursor.sort(shape['sort'])
+                cursor = cursor.limit(shape.get('limit', 20))
+
+                plan = cursor.explain().get('queryPlanner', {})
+                stages = _plan_stages(plan.get('winningPlan', {}))
+                results.append({
+                    'collection': collection,
+                    'name': shape['name'],
+                    'used_by': shape.get('used_by'),
+                    'stages': stages,
+                    'collscan': 'COLLSCAN' in stages,
+                })
+        return results
@@ -0,0 +1,85 @@
+"""
+Create and verify the MongoDB indexes registered by the apps
+
+    python manage.py ensure_mongodb_indexes              # create missing indexes (deploy step, see build.sh)
+    python manage.py ensure_mongodb_indexes --explain    # also fail if any query shape uses COLLSCAN
+    python manage.py ensure_mongodb_indexes --check      # CI check, no writes: same as --dry-run --explain
+
+Unique indexes cannot build over duplicate documents: run cleanup_auth_tokens
+first (build.sh does) so auth_tokens.token_1 and password_reset_tokens.email_1_otp_1
+can be created.
+
+Exits non-zero when a declared index is missing, a query shape falls back to
+COLLSCAN (with --explain/--check) or MongoDB cannot be reached.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from mongodb_integration.connection import mongo_connection
+from mongodb_integration.indexes import MongoIndexManager, INDEX_REGISTRY
+
+
+class Command(BaseCommand):
+    help = 'Create registered MongoDB indexes, report missing/unused ones and check query plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only verify, do not create indexes')
+        parser.add_argument('--explain', action='store_true', help='Explain registered query shapes and fail on COLLSCAN')
+        parser.add_argument('--report-unused', action='store_true', help='List indexes with no recorded accesses')
+        parser.add_argument('--check', action='store_true', help='Verify indexes and query plans without writing (CI)')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            options['dry_run'] = options['explain'] = True
+        try:
+            self._run(options)
+        except PyMongoError as e:
+            raise CommandError(f'MongoDB index check failed: {e}')
+
+    def _run(self, options):
+        manager = MongoIndexManager(mongo_connection.get_database())
+        problems = []
+
+        if not INDEX_REGISTRY:
+            self.stdout.write(self.style.WARNING('No indexes registered'))
+            return
+
+        if not options['dry_run']:
+            result = manager.ensure_indexes()
+            for name in result['created']:
+                self.stdout.write(self.style.SUCCESS(f'✅ Created {name}'))
+            for name in result['existing']:
+                self.stdout.write(f'   Exists  {name}')
+            for name in result['failed']:
+                self.stdout.write(self.style.ERROR(f'❌ Failed  {name}'))
+
+        missing = manager.find_missing()
+        for name in missing:
+            self.stdout.write(self.style.ERROR(f'❌ Missing {name}'))
+        if missing:
+            problems.append(f'{len(missing)} missing index(es)')
+
+        if options['report_unused']:
+            for index in manager.find_unused():
+                note = '' if index['declared'] else ' (not declared)'
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️  Unused {index['collection']}.{index['name']}{note} since {index['since']}"
+                ))
+
+        if options['explain']:
+            shapes = manager.explain_query_shapes()
+            for shape in shapes:
+                label = f"{shape['collection']}:{shape['name']}"
+                stages = ' > '.join(shape['stages'])
+                if shape['collscan']:
+                    self.stdout.write(self.style.ERROR(f'❌ COLLSCAN {label} [{stages}]'))
+                else:
+                    self.stdout.write(f'   OK       {label} [{stages}]')
+            collscans = [shape for shape in shapes if shape['collscan']]
+            if collscans:
+                problems.append(f'{len(collscans)} query shape(s) fall back to COLLSCAN')
+
+        if problems:
+            raise CommandError('; '.join(problems))
+
+        self.stdout.write(self.style.SUCCESS('MongoDB indexes verified'))
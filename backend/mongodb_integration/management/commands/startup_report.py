@@ -0,0 +1,47 @@
+"""
+Show where process startup time goes: project module imports and service connects
+
+    python manage.py startup_report              # imports only (no network I/O expected)
+    python manage.py startup_report --connect    # also connect the MongoDB services
+    python manage.py startup_report --limit 40
+
+Import times are only recorded when the timer is installed before Django starts
+(STARTUP_TIMING=True); without it the command re-runs itself with the timer on.
+"""
+import importlib
+import os
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from nudrrs.startup import startup_timings, timing_enabled
+
+
+class Command(BaseCommand):
+    help = 'Report per-module import time and MongoDB connect time for a fresh process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connect', action='store_true', help='Connect the MongoDB services and time it')
+        parser.add_argument('--limit', type=int, default=20, help='Slowest modules to list')
+
+    def handle(self, *args, **options):
+        if not timing_enabled():
+            env = {**os.environ, 'STARTUP_TIMING': 'True'}
+            result = subprocess.run([sys.executable, *sys.argv], env=env)
+            if result.returncode:
+                sys.exit(result.returncode)
+            return
+
+        importlib.import_module(settings.ROOT_URLCONF)
+        if options['connect']:
+            apps.get_app_config('mongodb_integration').warm_up()
+
+        self.stdout.write(startup_timings.format_report(options['limit']))
+        failed = [item['service'] for item in startup_timings.connects if not item['ok']]
+        if failed:
+            self.stdout.write(self.style.WARNING(f"⚠️  Could not connect: {', '.join(failed)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Startup report complete'))
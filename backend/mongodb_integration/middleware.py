@@ -1,38 +1,30 @@
+from django.contrib.auth.models import AnonymousUser
 from django.utils.deprecation import MiddlewareMixin
-from .user_service import MongoDBUserService
+from django.utils.functional import SimpleLazyObject
+from authentication.mongodb_auth import resolve_request
 
 class MongoDBAuthenticationMiddleware(MiddlewareMixin):
     """
     Middleware to authenticate users using MongoDB tokens
+
+    Sets request.user from the Authorization header for plain Django views. The
+    lookup is lazy and shares its memoised result with DRF's
+    MongoDBTokenAuthentication, so a request is resolved at most once. Without
+    a valid header the session user from AuthenticationMiddleware is kept.
     """
-    
-    def __init__(self, get_response):
-        self.get_response = get_response
-        self.user_service = MongoDBUserService()
-        super().__init__(get_response)
-    
+
     def process_request(self, request):
         """Process request and set user from MongoDB token"""
-        # Get token from Authorization header
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        
-        if auth_header.startswith('Token '):
-            token = auth_header.replace('Token ', '')
-            user = self.user_service.get_user_by_token(token)
-            
-            if user and user.is_active:
-                # Set user on request
-                request.user = user
-                request._cached_user = user
-            else:
-                request.user = None
-                request._cached_user = None
-        else:
-            request.user = None
-            request._cached_user = None
-        
+        if not request.META.get('HTTP_AUTHORIZATION'):
+            return None
+
+        session_user = getattr(request, 'user', None)
+
+        def get_user():
+            principal = resolve_request(request)
+            if principal:
+                return principal[0]
+            return session_user if session_user is not None else AnonymousUser()
+
+        request.user = SimpleLazyObject(get_user)
         return None
-    
-    def process_response(self, request, response):
-        """Process response"""
-        return response
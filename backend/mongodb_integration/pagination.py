@@ -0,0 +1,100 @@
+"""
+Keyset (cursor) pagination over (created_at, _id), newest first
+Cursors are opaque base64url tokens; each page is an index range scan on
+(created_at, _id) so deep pages cost the same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'d': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'o': str(value)}
+    return {'v': value}
+
+
+def _decode_value(encoded: Dict):
+    if 'd' in encoded:
+        return datetime.fromisoformat(encoded['d'])
+    if 'o' in encoded:
+        return ObjectId(encoded['o'])
+    return encoded['v']
+
+
+def encode_cursor(document: Dict, direction: str) -> str:
+    """Opaque token pointing just past `document` in the given direction ('next' or 'prev')"""
+    payload = {
+        'c': _encode_value(document.get('created_at')),
+        'i': _encode_value(document['_id']),
+        'r': direction,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[object, object, str]:
+    """(created_at, _id, direction) for a token produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        direction = payload['r']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return _decode_value(payload['c']), _decode_value(payload['i']), direction
+    except Exception as e:
+        raise InvalidCursor(f'Invalid cursor: {token}') from e
+
+
+def paginate(collection, query: Dict, limit: int, cursor: Optional[str] = None,
+             projection: Optional[Dict] = None) -> Tuple[List[Dict], Optional[str], Optional[str]]:
+    """Fetch one page of `query` ordered by (created_at, _id) descending
+
+    Returns (documents, next_cursor, prev_cursor); documents keep their raw _id/created_at,
+    so a projection must include created_at. An empty or missing cursor returns the first page.
+    """
+    direction = 'next'
+    range_query = dict(query)
+    if cursor:
+        created_at, last_id, direction = decode_cursor(cursor)
+        op = '$lt' if direction == 'next' else '$gt'
+        keyset = {'$or': [
+            {'created_at': {op: created_at}},
+            {'created_at': created_at, '_id': {op: last_id}},
+        ]}
+        range_query = {'$and': [query, keyset]} if query else keyset
+
+    order = DESCENDING if direction == 'next' else ASCENDING
+
+    # One extra document tells us whether another page exists in this direction
+    documents = list(
+        collection.find(range_query, projection)
+        .sort([('created_at', order), ('_id', order)])
+        .limit(limit + 1)
+    )
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+
+    if direction == 'prev':
+        documents.reverse()
+
+    if not documents:
+        return documents, None, None
+
+    if direction == 'next':
+        next_cursor = encode_cursor(documents[-1], 'next') if has_more else None
+        prev_cursor = encode_cursor(documents[0], 'prev') if cursor else None
+    else:
+        next_cursor = encode_cursor(documents[-1], 'next')
+        prev_cursor = encode_cursor(documents[0], 'prev') if has_more else None
+
+    return documents, next_cursor, prev_cursor
@@ -1,5 +1,6 @@
-from mongoengine import connect, disconnect
+from mongoengine import connect
 from django.conf import settings
+from .connection import release_mongoengine, shared_mongo_client
 from .models import EmergencyReport, AnalyticsData, NotificationLog, SystemLog
 import logging
 
@@ -9,32 +10,20 @@ class MongoDBService:
     """Service class for MongoDB operations"""
     
     def __init__(self):
+        # Every operation calls connect() first, so nothing happens at import time
         self.connected = False
-        self.connect()
     
     def connect(self):
         """Connect to MongoDB"""
         try:
             if not self.connected:
-                # Handle both local and Atlas connections
+                # mongoengine shares the process-wide client (mongodb_integration.connection)
                 host = settings.MONGODB_SETTINGS['host']
-                db_name = settings.MONGODB_SETTINGS['db']
-                
-                # Check if it's an Atlas connection string
-                if 'mongodb+srv://' in host or 'mongodb://' in host:
-                    # For Atlas or connection string format
-                    connect(
-                        db=db_name,
-                        host=host
-                    )
-                else:
-                    # For local MongoDB
-                    port = settings.MONGODB_SETTINGS.get('port', 27017)
-                    connect(
-                        db=db_name,
-                        host=host,
-                        port=port
-                    )
+                connect(
+                    db=settings.MONGODB_SETTINGS['db'],
+                    host=host,
+                    mongo_client_class=shared_mongo_client
+                )
                 
                 self.connected = True
                 logger.info(f"Connected to MongoDB successfully: {host}")
@@ -46,7 +35,8 @@ class MongoDBService:
         """Disconnect from MongoDB"""
         try:
             if self.connected:
-                disconnect()
+                # mongoengine's disconnect() would close the client every other service shares
+                release_mongoengine(keep_registration=False)
                 self.connected = False
                 logger.info("Disconnected from MongoDB")
         except Exception as e:
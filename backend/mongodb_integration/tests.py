@@ -1,3 +1,268 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import SkipTest, mock
 
-# Create your tests here.
+from bson import ObjectId
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, SimpleTestCase
+from pymongo import MongoClient
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authentication.principal_cache import principal_cache
+from authentication.services import auth_mongodb_service
+from mongodb_integration.middleware import MongoDBAuthenticationMiddleware
+from sos_reports.mongodb_service import SOSReportMongoDBService
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Settings that make startup reach out to MongoDB or the AI providers when turned on
+STARTUP_FLAGS = ('MONGODB_AUTO_CREATE_INDEXES', 'MONGODB_WARMUP', 'AI_JOB_WORKERS_AUTOSTART', 'AI_SERVICES_WARMUP')
+
+# Runs in a fresh interpreter: any socket connect or DNS lookup during startup fails the check
+IMPORT_WITHOUT_IO = '''
+import socket
+import sys
+
+attempts = []
+
+def refuse(*args, **kwargs):
+    attempts.append(repr(args[1:] if args and isinstance(args[0], socket.socket) else args))
+    raise OSError('network access during import')
+
+socket.socket.connect = refuse
+socket.socket.connect_ex = refuse
+socket.getaddrinfo = refuse
+
+import django
+django.setup()
+import nudrrs.urls
+
+if attempts:
+    sys.stderr.write('network access during import: ' + ', '.join(attempts))
+    sys.exit(3)
+'''
+
+
+class StartupIOTests(SimpleTestCase):
+    """Worker boot and management commands must not block on MongoDB or other network services"""
+
+    def test_importing_urls_does_no_network_io(self):
+        # The shipped defaults: drop any startup overrides from the environment running the tests
+        env = {name: value for name, value in os.environ.items() if name not in STARTUP_FLAGS}
+        env['DJANGO_SETTINGS_MODULE'] = 'nudrrs.settings'
+        result = subprocess.run(
+            [sys.executable, '-c', IMPORT_WITHOUT_IO],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+
+
+class CountingDatabase:
+    """Stands in for the auth service's database and records every collection call"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.operations = []
+
+    def __getitem__(self, name):
+        return CountingCollection(self, name)
+
+
+class CountingCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+
+    def find_one(self, filter, *args, **kwargs):
+        self.database.operations.append(f'{self.name}.find_one')
+        # Equality conditions only; operator conditions ($gt, ...) hold for the fixtures
+        for document in self.database.documents.get(self.name, []):
+            if all(document.get(field) == value for field, value in filter.items() if not isinstance(value, dict)):
+                return dict(document)
+        return None
+
+
+class WhoAmIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'id': request.user.id, 'role': request.user.role})
+
+
+def django_then_drf_view(request):
+    """A plain Django view reading request.user, then handing over to a DRF view"""
+    django_user_id = request.user.id
+    response = WhoAmIView.as_view()(request)
+    response.data['django_user_id'] = django_user_id
+    return response
+
+
+class RequestAuthenticationTests(SimpleTestCase):
+    """The middleware and the DRF authenticator resolve a request's principal once, together"""
+
+    user_id = ObjectId()
+
+    def setUp(self):
+        self.database = CountingDatabase({
+            'auth_tokens': [{
+                'token': 'opaque-token',
+                'user_id': str(self.user_id),
+                'expires_at': datetime.utcnow() + timedelta(days=1),
+            }],
+            'users': [{
+                '_id': self.user_id,
+                'username': 'responder',
+                'email': 'responder@example.com',
+                'role': 'MANAGER',
+                'is_active': True,
+                'api_token': 'legacy-api-token',
+            }],
+        })
+        auth_mongodb_service.db = self.database
+        self.addCleanup(setattr, auth_mongodb_service, 'db', None)
+        # The principal cache would otherwise look for its invalidation log in MongoDB
+        patcher = mock.patch.multiple(principal_cache, _connected=True, _collection=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(principal_cache.clear)
+        self.middleware = MongoDBAuthenticationMiddleware(django_then_drf_view)
+
+    def request(self, authorization):
+        request = RequestFactory().get('/whoami/', HTTP_AUTHORIZATION=authorization)
+        request.user = AnonymousUser()  # as set by AuthenticationMiddleware
+        return self.middleware(request)
+
+    def test_token_request_costs_one_token_and_one_user_lookup(self):
+        with mock.patch.object(principal_cache, 'enabled', False):
+            response = self.request('Token opaque-token')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': str(self.user_id), 'role': 'MANAGER', 'django_user_id': str(self.user_id)})
+        self.assertEqual(self.database.operations, ['auth_tokens.find_one', 'users.find_one'])
+
+    def test_api_token_falls_back_to_users_collection(self):
+        with mock.patch.object(principal_cache, 'enabled', False):
+            response = self.request('Token legacy-api-token')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], str(self.user_id))
+        self.assertEqual(self.database.operations, ['auth_tokens.find_one', 'users.find_one'])
+
+    def test_cached_principal_needs_no_database_operations(self):
+        self.request('Token opaque-token')
+        self.database.operations.clear()
+
+        response = self.request('Token opaque-token')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.database.operations, [])
+
+    def test_invalid_token_keeps_session_user(self):
+        with mock.patch.object(principal_cache, 'enabled', False):
+            response = self.request('Token unknown')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIsNone(response.data['django_user_id'])  # still the AnonymousUser
+        self.assertEqual(self.database.operations, ['auth_tokens.find_one', 'users.find_one'])
+
+
+class VoteStatusTests(SimpleTestCase):
+    """add_vote's pipeline update: vote counts and the automatic status rules (needs a MongoDB server)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = MongoClient(settings.MONGODB_SETTINGS['host'], serverSelectionTimeoutMS=2000)
+        try:
+            cls.client.admin.command('ping')
+        except Exception as e:
+            cls.client.close()
+            raise SkipTest(f'MongoDB is not reachable: {e}')
+        cls.db = cls.client[f"{settings.MONGODB_SETTINGS['db']}_test_votes"]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.drop_database(cls.db.name)
+        cls.client.close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.db.emergency_reports.delete_many({})
+        self.db.report_votes.delete_many({})
+        self.db.emergency_reports.insert_one({
+            'report_id': 'report-1', 'user_id': 1, 'status': 'PENDING', 'priority': 'HIGH',
+            'disaster_type': 'FLOOD', 'created_at': datetime.utcnow(),
+        })
+        self.service = SOSReportMongoDBService()
+        self.service.db = self.db
+        patcher = mock.patch.object(self.service.counters, 'record_changed')
+        self.record_changed = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def vote(self, user_id, vote_type):
+        return self.service.add_vote('report-1', {'user_id': user_id, 'vote_type': vote_type, 'username': f'user{user_id}'})
+
+    def report(self):
+        return self.db.emergency_reports.find_one({'report_id': 'report-1'})
+
+    def test_owner_resolving_resolves_the_report(self):
+        self.vote(1, 'RESOLVED')
+
+        self.assertEqual(self.report()['status'], 'RESOLVED')
+        self.assertEqual(self.report()['last_status_change']['reason'], 'owner vote')
+        self.record_changed.assert_called_once()
+        self.assertEqual(self.record_changed.call_args[0][1], {'status': 'RESOLVED'})
+
+    def test_community_needs_three_votes_and_sixty_percent(self):
+        self.vote(2, 'RESOLVED')
+        self.vote(3, 'RESOLVED')
+        self.assertEqual(self.report()['status'], 'PENDING')
+
+        result = self.vote(4, 'STILL_THERE')
+
+        self.assertEqual(result['vote_counts'], {'still_there': 1, 'resolved': 2, 'fake_report': 0, 'total': 3})
+        self.assertEqual(self.report()['status'], 'RESOLVED')
+        self.record_changed.assert_called_once()
+
+    def test_first_vote_on_a_legacy_report_keeps_its_votes(self):
+        self.db.emergency_reports.update_one({'report_id': 'report-1'}, {'$set': {'votes': [
+            {'user_id': 2, 'vote_type': 'RESOLVED'},
+            {'user_id': 3, 'vote_type': 'RESOLVED'},
+            {'user_id': 4, 'vote_type': 'STILL_THERE'},
+        ]}})
+
+        # User 4 changes their legacy vote rather than adding a fourth one
+        result = self.vote(4, 'RESOLVED')
+
+        self.assertEqual(result['vote_counts'], {'still_there': 0, 'resolved': 3, 'fake_report': 0, 'total': 3})
+        self.assertEqual(self.report()['status'], 'RESOLVED')
+
+    def test_community_rejects_fake_reports(self):
+        for user_id in (2, 3, 4):
+            self.vote(user_id, 'FAKE_REPORT')
+
+        self.assertEqual(self.report()['status'], 'REJECTED')
+        self.assertEqual(self.report()['vote_percentages']['fake_report'], 100)
+
+    def test_changed_vote_moves_the_count(self):
+        self.vote(2, 'FAKE_REPORT')
+        result = self.vote(2, 'STILL_THERE')
+
+        self.assertEqual(result['vote_counts'], {'still_there': 1, 'resolved': 0, 'fake_report': 0, 'total': 1})
+        self.assertEqual(self.db.report_votes.count_documents({}), 1)
+
+    def test_later_vote_in_the_same_instant_is_not_a_status_change(self):
+        instant = datetime.utcnow()
+        with mock.patch('sos_reports.mongodb_service.datetime') as clock:
+            clock.utcnow.return_value = instant
+            self.vote(1, 'RESOLVED')
+            self.vote(2, 'STILL_THERE')
+
+        self.assertEqual(self.report()['status'], 'RESOLVED')
+        self.record_changed.assert_called_once()
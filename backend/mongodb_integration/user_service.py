@@ -1,5 +1,7 @@
 from .user_models import MongoDBUser
 from .services import MongoDBService
+from authentication.principal_cache import principal_cache
+from authentication.revocation import token_revocations, CLAIM_FIELDS
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
 from datetime import datetime
@@ -111,6 +113,9 @@ class MongoDBUserService:
                     setattr(user, field, value)
             
             user.save()
+            principal_cache.invalidate_user(user.id)
+            if set(CLAIM_FIELDS) & set(update_data):
+                token_revocations.claims_changed(user.id)
             return user
             
         except Exception as e:
@@ -122,6 +127,8 @@ class MongoDBUserService:
             user = self.get_user_by_id(user_id)
             if user:
                 user.delete()
+                principal_cache.invalidate_user(user.id)
+                token_revocations.claims_changed(user.id)
                 return True
             return False
         except Exception as e:
@@ -153,6 +160,7 @@ class MongoDBUserService:
             
             user.set_password(new_password)
             user.save()
+            principal_cache.invalidate_user(user.id)
             return True
             
         except Exception as e:
@@ -165,6 +173,7 @@ class MongoDBUserService:
             if user:
                 user.generate_api_token()
                 user.save()
+                principal_cache.invalidate_user(user.id)
                 return user.api_token
             return None
         except Exception as e:
@@ -2,7 +2,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from .connection import mongo_connection
 from .services import mongodb_service
+from authentication.principal_cache import principal_cache
+from authentication.revocation import token_revocations
 import json
 
 @api_view(['GET'])
@@ -15,7 +18,10 @@ def mongodb_status(request):
         return Response({
             'status': 'connected',
             'message': 'MongoDB is connected and working',
-            'reports_count': len(reports_count)
+            'reports_count': len(reports_count),
+            'connection_pool': mongo_connection.stats(),
+            'auth_principal_cache': principal_cache.stats(),
+            'jwt_revocations': token_revocations.stats()
         })
     except Exception as e:
         return Response({
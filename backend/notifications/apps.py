@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
+
+    def ready(self):
+        # Register the notifications collection indexes with the MongoDB index manager
+        from . import indexes  # noqa: F401
@@ -0,0 +1,26 @@
+"""
+Index declarations for the notifications collection
+"""
+from mongodb_integration.indexes import register_indexes
+
+NOTIFICATIONS_COLLECTION = 'notifications'
+
+NOTIFICATION_INDEXES = [
+    {
+        'name': 'created_at_-1__id_-1',
+        'keys': [('created_at', -1), ('_id', -1)],
+        'used_by': ['get_notifications', 'get_notifications_page'],
+    },
+    {
+        'name': 'recipient_1_created_at_-1__id_-1',
+        'keys': [('recipient', 1), ('created_at', -1), ('_id', -1)],
+        'used_by': ['get_notifications', 'get_notifications_page'],
+    },
+]
+
+NOTIFICATION_QUERY_SHAPES = [
+    {'name': 'get_notifications', 'filter': {}, 'sort': [('created_at', -1), ('_id', -1)], 'used_by': 'get_notifications_page'},
+    {'name': 'get_notifications:recipient', 'filter': {'recipient': 'user'}, 'sort': [('created_at', -1), ('_id', -1)], 'used_by': 'get_notifications_page'},
+]
+
+register_indexes(NOTIFICATIONS_COLLECTION, NOTIFICATION_INDEXES, NOTIFICATION_QUERY_SHAPES)
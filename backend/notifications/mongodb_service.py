@@ -2,29 +2,23 @@
 MongoDB service for Notifications
 Handles all notification operations using MongoDB
 """
-from pymongo import MongoClient
-from django.conf import settings
 from datetime import datetime
 from typing import List, Dict, Optional
+from mongodb_integration.connection import LazyMongoService, mongo_connection
+from mongodb_integration.pagination import paginate, InvalidCursor
 
-class NotificationMongoDBService:
-    """Service class for Notification operations with MongoDB"""
+class NotificationMongoDBService(LazyMongoService):
+    """Service class for Notification operations with MongoDB (connects on first use)"""
     
     def __init__(self):
-        self.client = None
-        self.db = None
-        self.connect()
+        mongo_connection.after_fork(self._rebind)
     
     def connect(self):
         """Connect to MongoDB Atlas"""
         try:
-            # Get connection string from environment variables
-            connection_string = settings.MONGODB_SETTINGS['host']
-            database_name = settings.MONGODB_SETTINGS['db']
-            
-            # PyMongo 4+: rely on URI TLS options; do not pass legacy ssl_cert_reqs
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=10000)
-            self.db = self.client[database_name]
+            # Shared process-wide client (mongodb_integration.connection)
+            self.client = mongo_connection.client
+            self.db = mongo_connection.get_database()
             
             # Test connection
             self.client.admin.command('ping')
@@ -37,7 +31,7 @@ class NotificationMongoDBService:
     def create_notification(self, notification_data: Dict) -> Optional[Dict]:
         """Create a new notification in MongoDB"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['notifications']
@@ -65,44 +59,68 @@ class NotificationMongoDBService:
     def get_notifications(self, limit: int = 50, skip: int = 0, user_id: Optional[str] = None) -> List[Dict]:
         """Get notifications from MongoDB"""
         try:
-            if not self.db:
+            if self.db is None:
                 return []
             
             collection = self.db['notifications']
-            query = {}
-            
-            # Filter by user if specified
-            if user_id:
-                query['recipient'] = user_id
             
             # Execute query
-            cursor = collection.find(query).sort('created_at', -1).skip(skip).limit(limit)
+            cursor = collection.find(self._build_query(user_id)).sort('created_at', -1).skip(skip).limit(limit)
             notifications = list(cursor)
             
-            # Convert ObjectId to string and format dates
-            for notification in notifications:
-                if '_id' in notification:
-                    notification['id'] = str(notification['_id'])
-                    del notification['_id']
-                
-                # Ensure dates are properly formatted
-                if 'created_at' in notification and isinstance(notification['created_at'], datetime):
-                    notification['created_at'] = notification['created_at'].isoformat()
-                
-                if 'sent_at' in notification and isinstance(notification['sent_at'], datetime):
-                    notification['sent_at'] = notification['sent_at'].isoformat()
-                elif 'sent_at' in notification and notification['sent_at'] is None:
-                    notification['sent_at'] = None
-            
+            self._format_notifications(notifications)
             return notifications
         except Exception as e:
             print(f"Error getting notifications from MongoDB: {e}")
             return []
     
+    def get_notifications_page(self, limit: int = 50, cursor: Optional[str] = None, user_id: Optional[str] = None) -> Dict:
+        """Get one keyset page of notifications: {'results', 'next', 'prev'}; raises InvalidCursor for bad tokens"""
+        try:
+            if self.db is None:
+                return {'results': [], 'next': None, 'prev': None}
+            
+            collection = self.db['notifications']
+            notifications, next_cursor, prev_cursor = paginate(collection, self._build_query(user_id), limit, cursor)
+            
+            self._format_notifications(notifications)
+            return {'results': notifications, 'next': next_cursor, 'prev': prev_cursor}
+        except InvalidCursor:
+            raise
+        except Exception as e:
+            print(f"Error getting notifications page from MongoDB: {e}")
+            return {'results': [], 'next': None, 'prev': None}
+    
+    def _build_query(self, user_id: Optional[str] = None) -> Dict:
+        """Mongo filter for the notification listing"""
+        query = {}
+        
+        # Filter by user if specified
+        if user_id:
+            query['recipient'] = user_id
+        
+        return query
+    
+    def _format_notifications(self, notifications: List[Dict]):
+        """Convert ObjectId to string and format dates in place"""
+        for notification in notifications:
+            if '_id' in notification:
+                notification['id'] = str(notification['_id'])
+                del notification['_id']
+            
+            # Ensure dates are properly formatted
+            if 'created_at' in notification and isinstance(notification['created_at'], datetime):
+                notification['created_at'] = notification['created_at'].isoformat()
+            
+            if 'sent_at' in notification and isinstance(notification['sent_at'], datetime):
+                notification['sent_at'] = notification['sent_at'].isoformat()
+            elif 'sent_at' in notification and notification['sent_at'] is None:
+                notification['sent_at'] = None
+    
     def update_notification_status(self, notification_id: str, status: str) -> bool:
         """Update notification status"""
         try:
-            if not self.db:
+            if self.db is None:
                 return False
             
             collection = self.db['notifications']
@@ -124,7 +142,7 @@ class NotificationMongoDBService:
     def get_notification_by_id(self, notification_id: str) -> Optional[Dict]:
         """Get a single notification by ID"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['notifications']
@@ -152,7 +170,7 @@ class NotificationMongoDBService:
     def delete_notification(self, notification_id: str) -> bool:
         """Delete a notification from MongoDB"""
         try:
-            if not self.db:
+            if self.db is None:
                 return False
             
             collection = self.db['notifications']
@@ -166,7 +184,7 @@ class NotificationMongoDBService:
     def get_notifications_by_recipient(self, recipient: str, limit: int = 50) -> List[Dict]:
         """Get notifications for a specific recipient"""
         try:
-            if not self.db:
+            if self.db is None:
                 return []
             
             collection = self.db['notifications']
@@ -196,7 +214,7 @@ class NotificationMongoDBService:
     def broadcast_notification(self, message: str, notification_type: str = 'BROADCAST', priority: str = 'MEDIUM') -> Optional[Dict]:
         """Create a broadcast notification"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             # Create broadcast notification
@@ -215,9 +233,9 @@ class NotificationMongoDBService:
             return None
     
     def close(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
+        """Release this service's handles; the shared client stays open for the other services"""
+        self.client = None
+        self.db = None
 
 # Global instance
 notification_mongodb_service = NotificationMongoDBService()
@@ -5,6 +5,7 @@ from rest_framework import status
 from .models import Notification, NotificationTemplate
 from .services import NotificationService
 from .mongodb_service import notification_mongodb_service
+from mongodb_integration.pagination import InvalidCursor
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -91,6 +92,18 @@ def get_notifications(request):
         skip = int(request.query_params.get('skip', 0))
         user_id = request.query_params.get('user_id')
         
+        # ?cursor= (empty for the first page) switches to keyset pagination
+        if 'cursor' in request.query_params:
+            try:
+                page = notification_mongodb_service.get_notifications_page(
+                    limit=min(limit, 100),
+                    cursor=request.query_params.get('cursor'),
+                    user_id=user_id
+                )
+            except InvalidCursor as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(page)
+        
         # Get notifications from MongoDB
         notifications = notification_mongodb_service.get_notifications(
             limit=limit,
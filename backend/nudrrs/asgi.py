@@ -1,4 +1,9 @@
 import os
+from nudrrs.startup import install_import_timer
+
+# Time project imports when STARTUP_TIMING=True
+install_import_timer()
+
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
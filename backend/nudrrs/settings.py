@@ -49,10 +49,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Token/Bearer users for plain Django views; shares one resolution per request with DRF
+    'mongodb_integration.middleware.MongoDBAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -101,6 +99,35 @@ MONGODB_SETTINGS = {
     'port': 27017,
 }
 
+# Shared MongoClient (mongodb_integration.connection): one pool per process for every service
+MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', '50'))
+MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', '0'))
+MONGODB_MAX_IDLE_TIME_MS = int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS', '300000'))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS', '10000'))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGODB_CONNECT_TIMEOUT_MS', '15000'))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGODB_SOCKET_TIMEOUT_MS', '30000'))
+MONGODB_READ_PREFERENCE = os.environ.get('MONGODB_READ_PREFERENCE', 'primary')
+# Services connect on first use; after a failed connect they report unavailable for this many seconds
+MONGODB_RECONNECT_SECONDS = int(os.environ.get('MONGODB_RECONNECT_SECONDS', '30'))
+# Connect the MongoDB services in a background thread at startup instead of on the first request
+MONGODB_WARMUP = os.environ.get('MONGODB_WARMUP', 'False') == 'True'
+# Comma-separated wire compressors, e.g. 'zstd,snappy,zlib' (zstd/snappy need their Python packages)
+MONGODB_COMPRESSORS = os.environ.get('MONGODB_COMPRESSORS', 'zlib')
+
+# Create the indexes registered by the apps (see mongodb_integration.indexes) at startup. Deploys
+# create them with `manage.py ensure_mongodb_indexes` in build.sh instead, so this is opt-in
+MONGODB_AUTO_CREATE_INDEXES = os.environ.get('MONGODB_AUTO_CREATE_INDEXES', 'False') == 'True'
+
+# Hard caps for the $geoNear nearby-reports endpoint
+NEARBY_REPORTS_MAX_LIMIT = int(os.environ.get('NEARBY_REPORTS_MAX_LIMIT', '100'))
+NEARBY_REPORTS_MAX_RADIUS_KM = float(os.environ.get('NEARBY_REPORTS_MAX_RADIUS_KM', '100'))
+# $geoNear has no keyset cursor; the server computes and discards every skipped result
+NEARBY_REPORTS_MAX_OFFSET = int(os.environ.get('NEARBY_REPORTS_MAX_OFFSET', '1000'))
+
+# Seconds a per-user dashboard stats result is served from cache; writes invalidate it early
+DASHBOARD_STATS_CACHE_TTL = int(os.environ.get('DASHBOARD_STATS_CACHE_TTL', '30'))
+
 # Cache configuration for sessions
 CACHES = {
     'default': {
@@ -138,6 +165,8 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Absolute base for locally stored media in API responses
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', 'http://localhost:8000/media/')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -152,6 +181,22 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# In-process cache of authenticated principals (authentication.principal_cache). Entries live for at
+# most the TTL; changes made by other workers are picked up within the poll interval.
+AUTH_PRINCIPAL_CACHE_ENABLED = os.environ.get('AUTH_PRINCIPAL_CACHE_ENABLED', 'True') == 'True'
+AUTH_PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_PRINCIPAL_CACHE_MAX_ENTRIES', '10000'))
+AUTH_PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL_SECONDS', '300'))
+AUTH_PRINCIPAL_CACHE_POLL_SECONDS = float(os.environ.get('AUTH_PRINCIPAL_CACHE_POLL_SECONDS', '2'))
+AUTH_PRINCIPAL_CACHE_POLL_OVERLAP_SECONDS = float(os.environ.get('AUTH_PRINCIPAL_CACHE_POLL_OVERLAP_SECONDS', '30'))
+AUTH_CACHE_INVALIDATION_RETENTION_SECONDS = int(os.environ.get('AUTH_CACHE_INVALIDATION_RETENTION_SECONDS', '3600'))
+# Lifetime of opaque API tokens (auth_tokens); a TTL index deletes them once expired
+AUTH_TOKEN_LIFETIME_SECONDS = int(os.environ.get('AUTH_TOKEN_LIFETIME_SECONDS', str(365 * 24 * 3600)))
+
+# Stateless JWT mode: Bearer tokens carrying claims (id, username, role, is_staff) are trusted without a
+# user lookup; only the revoked_jwts list is consulted, refreshed from MongoDB at this interval
+AUTH_JWT_STATELESS = os.environ.get('AUTH_JWT_STATELESS', 'False') == 'True'
+AUTH_JWT_REVOCATION_REFRESH_SECONDS = float(os.environ.get('AUTH_JWT_REVOCATION_REFRESH_SECONDS', '30'))
+
 # CORS and Security Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -255,6 +300,40 @@ CORS_ALLOW_HEADERS = [
 AI_MODEL_PATH = BASE_DIR / 'ai_models'
 YOLO_MODEL_PATH = AI_MODEL_PATH / 'yolov8n.pt'
 
+# Background AI analysis job queue (ai_services.job_queue)
+AI_JOB_WORKERS = int(os.environ.get('AI_JOB_WORKERS', '4'))
+AI_JOB_MAX_ATTEMPTS = int(os.environ.get('AI_JOB_MAX_ATTEMPTS', '3'))
+AI_JOB_RETRY_BACKOFF_SECONDS = int(os.environ.get('AI_JOB_RETRY_BACKOFF_SECONDS', '5'))
+AI_JOB_LEASE_SECONDS = int(os.environ.get('AI_JOB_LEASE_SECONDS', '300'))
+AI_JOB_POLL_SECONDS = float(os.environ.get('AI_JOB_POLL_SECONDS', '2'))
+AI_JOB_RETENTION_SECONDS = int(os.environ.get('AI_JOB_RETENTION_SECONDS', str(7 * 24 * 3600)))
+# Start the worker pool when the WSGI app loads so jobs queued before a restart are resumed
+AI_JOB_WORKERS_AUTOSTART = os.environ.get('AI_JOB_WORKERS_AUTOSTART', 'True') == 'True'
+
+# Shared AI service clients: build them when a serving process starts (opt-in), and how long to wait
+# before retrying a failed init
+AI_SERVICES_WARMUP = os.environ.get('AI_SERVICES_WARMUP', 'False') == 'True'
+AI_SERVICE_RETRY_SECONDS = int(os.environ.get('AI_SERVICE_RETRY_SECONDS', '60'))
+# Upper bound on each model call made by the async analysis path
+AI_CALL_TIMEOUT_SECONDS = float(os.environ.get('AI_CALL_TIMEOUT_SECONDS', '30'))
+AI_CALL_THREADS = int(os.environ.get('AI_CALL_THREADS', '16'))
+# Header metadata of analysed images, cached by content hash (ai_services.image_metadata)
+AI_IMAGE_METADATA_CACHE_SIZE = int(os.environ.get('AI_IMAGE_METADATA_CACHE_SIZE', '4096'))
+# Largest batch accepted by /api/ai/classify-texts/
+AI_CLASSIFY_TEXTS_MAX = int(os.environ.get('AI_CLASSIFY_TEXTS_MAX', '1000'))
+
+# Content-addressed cache of Gemini results (ai_services.cache): memory LRU + MongoDB with TTL
+AI_ANALYSIS_CACHE_ENABLED = os.environ.get('AI_ANALYSIS_CACHE_ENABLED', 'True') == 'True'
+AI_ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('AI_ANALYSIS_CACHE_MAX_ENTRIES', '1000'))
+AI_ANALYSIS_CACHE_TTL_SECONDS = int(os.environ.get('AI_ANALYSIS_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# Micro-batching of report analyses (ai_services.batching): coalesce calls made within the window
+AI_BATCH_ENABLED = os.environ.get('AI_BATCH_ENABLED', 'False') == 'True'
+AI_BATCH_WINDOW_MS = float(os.environ.get('AI_BATCH_WINDOW_MS', '50'))
+AI_BATCH_MAX_SIZE = int(os.environ.get('AI_BATCH_MAX_SIZE', '8'))
+AI_BATCH_CONCURRENCY = int(os.environ.get('AI_BATCH_CONCURRENCY', '4'))
+AI_BATCH_TIMEOUT_SECONDS = int(os.environ.get('AI_BATCH_TIMEOUT_SECONDS', '120'))
+
 # External API Keys
 GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
@@ -268,6 +347,24 @@ CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME', '')
 CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY', '')
 CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET', '')
 
+# Media storage backend: 'cloudinary' or 'local' (content-addressed files under MEDIA_STORAGE_ROOT,
+# served with thumbnails from /api/media/). Failed Cloudinary uploads fall back to the local store.
+MEDIA_STORAGE_BACKEND = os.environ.get('MEDIA_STORAGE_BACKEND', 'cloudinary' if CLOUDINARY_CLOUD_NAME else 'local')
+MEDIA_STORAGE_ROOT = os.environ.get('MEDIA_STORAGE_ROOT', str(BASE_DIR / 'media' / 'store'))
+MEDIA_STORAGE_URL = '/api/media/'
+MEDIA_STORAGE_LOCAL_FALLBACK = os.environ.get('MEDIA_STORAGE_LOCAL_FALLBACK', 'True') == 'True'
+MEDIA_THUMBNAIL_SIZES = os.environ.get('MEDIA_THUMBNAIL_SIZES', '160x120,320x240,300x300,640x480')
+
+# Report media uploads: concurrent uploads per report; deferred mode stores the report first and
+# uploads from the spool directory in a background job run by the same process
+MEDIA_UPLOAD_WORKERS = int(os.environ.get('MEDIA_UPLOAD_WORKERS', '4'))
+MEDIA_UPLOAD_DEFERRED = os.environ.get('MEDIA_UPLOAD_DEFERRED', 'False') == 'True'
+MEDIA_UPLOAD_SPOOL_DIR = os.environ.get('MEDIA_UPLOAD_SPOOL_DIR', str(BASE_DIR / 'media' / 'upload_spool'))
+# Spool files and pending placeholders older than this belong to a lost job and are removed/marked failed
+# (uploads still queued in some process are kept: each sweep touches its own live spool files)
+MEDIA_UPLOAD_SPOOL_MAX_AGE_SECONDS = int(os.environ.get('MEDIA_UPLOAD_SPOOL_MAX_AGE_SECONDS', '3600'))
+MEDIA_UPLOAD_SWEEP_SECONDS = int(os.environ.get('MEDIA_UPLOAD_SWEEP_SECONDS', '600'))
+
 # Email Configuration
 EMAIL_BACKEND = 'authentication.email_backend.CustomSMTPEmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
@@ -281,6 +378,15 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@nudrrs.com')
 # Email timeout settings
 EMAIL_TIMEOUT = 30
 
+# Outbound email queue (authentication.email_queue): a background worker sends over one persistent
+# SMTP connection, batching mail queued within the window and retrying transient failures
+EMAIL_QUEUE_ENABLED = os.environ.get('EMAIL_QUEUE_ENABLED', 'True') == 'True'
+EMAIL_QUEUE_BATCH_SIZE = int(os.environ.get('EMAIL_QUEUE_BATCH_SIZE', '20'))
+EMAIL_QUEUE_BATCH_WINDOW_MS = float(os.environ.get('EMAIL_QUEUE_BATCH_WINDOW_MS', '50'))
+EMAIL_QUEUE_IDLE_SECONDS = float(os.environ.get('EMAIL_QUEUE_IDLE_SECONDS', '30'))
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.environ.get('EMAIL_QUEUE_MAX_ATTEMPTS', '5'))
+EMAIL_QUEUE_RETRY_SECONDS = float(os.environ.get('EMAIL_QUEUE_RETRY_SECONDS', '2'))
+
 # SSL Context for email (fixes certificate issues on macOS)
 import ssl
 EMAIL_SSL_CONTEXT = ssl.create_default_context()
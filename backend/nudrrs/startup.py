@@ -0,0 +1,157 @@
+"""
+Startup timing for workers and management commands
+With STARTUP_TIMING=True in the environment, manage.py / wsgi.py / asgi.py
+install an import timer before Django starts. It records the import time of
+every project module (inclusive, and excluding the project modules it imports),
+and the lazy MongoDB services record how long their first connect took.
+wsgi.py logs the report once the URLconf is loaded; `manage.py startup_report`
+prints it.
+"""
+import importlib.abc
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class StartupTimings:
+    """Import and connect timings collected during process startup"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports: Dict[str, Dict[str, float]] = {}
+        self.connects: List[Dict] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enter_import(self, module: str):
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append([module, time.perf_counter(), 0.0])
+
+    def exit_import(self, module: str):
+        stack = self._local.stack
+        _, started, children = stack.pop()
+        inclusive = time.perf_counter() - started
+        if stack:
+            stack[-1][2] += inclusive
+        with self._lock:
+            self.imports[module] = {'inclusive_ms': inclusive * 1000, 'self_ms': (inclusive - children) * 1000}
+
+    def record_connect(self, label: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self.connects.append({'service': label, 'ms': seconds * 1000, 'ok': ok})
+
+    def report(self, limit: int = 20) -> Dict:
+        with self._lock:
+            imports = sorted(
+                ({'module': module, **timing} for module, timing in self.imports.items()),
+                key=lambda item: item['self_ms'], reverse=True
+            )
+            connects = list(self.connects)
+        return {
+            'elapsed_ms': (time.perf_counter() - self.started) * 1000,
+            'modules_timed': len(imports),
+            'import_ms': sum(item['self_ms'] for item in imports),
+            'imports': imports[:limit],
+            'connects': connects,
+        }
+
+    def format_report(self, limit: int = 20) -> str:
+        report = self.report(limit)
+        lines = [
+            f"Startup: {report['elapsed_ms']:.0f} ms since timer install, "
+            f"{report['import_ms']:.0f} ms importing {report['modules_timed']} project module(s)",
+            f"{'module':<50} {'self ms':>9} {'incl ms':>9}",
+        ]
+        for item in report['imports']:
+            lines.append(f"{item['module']:<50} {item['self_ms']:>9.1f} {item['inclusive_ms']:>9.1f}")
+        if report['connects']:
+            lines.append(f"{'connect':<50} {'ms':>9} {'ok':>9}")
+            for item in report['connects']:
+                lines.append(f"{item['service']:<50} {item['ms']:>9.1f} {str(item['ok']):>9}")
+        return '\n'.join(lines)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's real loader and times exec_module"""
+
+    def __init__(self, loader, timings: StartupTimings):
+        self._loader = loader
+        self._timings = timings
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timings.enter_import(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timings.exit_import(module.__name__)
+
+    def __getattr__(self, name):
+        # get_source, get_filename, is_package, ... for tracebacks and pkgutil
+        return getattr(self._loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta path hook that times the imports of the project's own modules"""
+
+    def __init__(self, timings: StartupTimings, packages):
+        self.timings = timings
+        self.packages = set(packages)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname.partition('.')[0] not in self.packages:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self.timings)
+                return spec
+        return None
+
+
+def project_packages() -> List[str]:
+    """Top-level packages and modules of the backend"""
+    names = []
+    for entry in BASE_DIR.iterdir():
+        if entry.name.startswith(('.', '_')):
+            continue
+        # nudrrs itself is a namespace package (no __init__.py)
+        if entry.is_dir() and any(entry.glob('*.py')):
+            names.append(entry.name)
+        elif entry.suffix == '.py' and entry.stem != 'manage':
+            names.append(entry.stem)
+    return names
+
+
+# Global instance
+startup_timings = StartupTimings()
+_import_timer: Optional[ImportTimer] = None
+
+
+def install_import_timer() -> bool:
+    """Install the import timer if STARTUP_TIMING=True; call before django.setup()"""
+    global _import_timer
+    if os.environ.get('STARTUP_TIMING', 'False') != 'True':
+        return False
+    if _import_timer is None:
+        startup_timings.started = time.perf_counter()
+        _import_timer = ImportTimer(startup_timings, project_packages())
+        sys.meta_path.insert(0, _import_timer)
+    return True
+
+
+def timing_enabled() -> bool:
+    return _import_timer is not None
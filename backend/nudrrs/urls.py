@@ -11,6 +11,8 @@ urlpatterns = [
     path('admin/emergency-dashboard/', emergency_dashboard_view, name='emergency_dashboard'),
     path('admin/', admin.site.urls),
     path('health/', views.health_check, name='health_check'),
+    path('api/media/<str:content_hash>/', views.serve_media, name='serve_media'),
+    path('api/media/<str:content_hash>/<str:variant>/', views.serve_media, name='serve_media_variant'),
     path('api/auth/', include('authentication.urls')),
     path('api/mongodb-auth/', include('mongodb_integration.auth_urls')),
     path('api/sos_reports/', include('sos_reports.urls')),
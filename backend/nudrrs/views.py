@@ -46,3 +46,61 @@ def health_check(request):
     
     status_code = 200 if health_status['status'] == 'healthy' else 503
     return JsonResponse(health_status, status=status_code)
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as media_file:
+        media_file.seek(start)
+        while length > 0:
+            chunk = media_file.read(min(length, 64 * 1024))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def serve_media(request, content_hash, variant=None):
+    """Serve a locally stored file or one of its thumbnails with ETag and single-range support"""
+    import os
+    import re
+    from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+    from media_storage import media_storage
+    
+    if not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        raise Http404('Media not found')
+    if variant:
+        path = media_storage.local.thumbnail(content_hash, variant)
+        content_type = 'image/jpeg'
+    else:
+        original = media_storage.local.open_original(content_hash)
+        path, content_type = (original[0], original[1].get('content_type')) if original else (None, None)
+    if path is None:
+        raise Http404('Media not found')
+    
+    # Content-addressed, so the hash (plus variant) is a strong validator and the bytes never change
+    etag = f'"{content_hash}{"-" + variant if variant else ""}"'
+    headers = {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable', 'Accept-Ranges': 'bytes'}
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponse(status=304)
+    else:
+        size = os.path.getsize(path)
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', request.headers.get('Range', '').strip())
+        if_range = request.headers.get('If-Range')
+        if match and match.group(0) != 'bytes=-' and (not if_range or if_range == etag):
+            start, end = match.groups()
+            if start:
+                start, end = int(start), min(int(end) if end else size - 1, size - 1)
+            else:
+                # Suffix range: the last N bytes
+                start, end = max(size - int(end), 0), size - 1
+            if start >= size or start > end:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+            else:
+                response = StreamingHttpResponse(_read_range(path, start, end - start + 1), status=206, content_type=content_type)
+                response['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+    if response.status_code != 416:
+        for header, value in headers.items():
+            response[header] = value
+    return response
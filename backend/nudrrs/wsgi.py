@@ -9,10 +9,38 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 
 import os
 
+from nudrrs.startup import install_import_timer, startup_timings
+
+# Time project imports when STARTUP_TIMING=True
+timing = install_import_timer()
+
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nudrrs.settings')
 
 application = get_wsgi_application()
+
+if timing:
+    # Django loads the URLconf on the first request; load it now so the report covers it
+    import importlib
+    import logging
+    from django.conf import settings as django_settings
+    importlib.import_module(django_settings.ROOT_URLCONF)
+    logging.getLogger('nudrrs.startup').info('\n' + startup_timings.format_report())
+
+# Resume queued AI analysis jobs in serving processes only (not in management commands).
+# Under gunicorn --preload this runs in the master; each forked worker restarts the pool
+# (AnalysisJobQueue._after_fork), and the leases keep the processes from running a job twice.
+from django.conf import settings
+if settings.AI_JOB_WORKERS_AUTOSTART:
+    from ai_services.job_queue import analysis_job_queue
+    analysis_job_queue.start()
+
+# Build the shared AI clients now rather than on the first request (AI_SERVICES_WARMUP=True)
+if settings.AI_SERVICES_WARMUP:
+    import threading
+    from ai_services.registry import ai_registry
+    threading.Thread(target=ai_registry.warm_up, name='ai-services-warmup', daemon=True).start()
+
 # This is needed for Vercel deployment
 app = application
@@ -3,3 +3,9 @@ from django.apps import AppConfig
 class SosReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sos_reports'
+
+    def ready(self):
+        # Register emergency_reports indexes with the MongoDB index manager
+        from . import indexes  # noqa: F401
+        # Register the background AI analysis job handler
+        from . import tasks  # noqa: F401
@@ -0,0 +1,164 @@
+"""
+Incrementally maintained report counters for the analytics dashboard
+One document per UTC creation day plus an 'all' document, each holding
+total/status/priority/disaster_type counts kept current with $inc.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pymongo import ReplaceOne, UpdateOne
+
+COUNTERS_COLLECTION = 'report_counters'
+ALL_COUNTER_ID = 'all'
+COUNTED_FIELDS = ('status', 'priority', 'disaster_type')
+
+
+def _day_key(created_at) -> Optional[str]:
+    """UTC day (YYYY-MM-DD) a report was created on"""
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.utcoffset():
+        created_at = created_at - created_at.utcoffset()
+    return created_at.strftime('%Y-%m-%d')
+
+
+def _bucket(value) -> str:
+    """Counter sub-key for a field value; dots and dollars are not allowed in keys"""
+    return str(value or 'UNKNOWN').replace('.', '_').replace('$', '_')
+
+
+class ReportCountersService:
+    """Maintains and reads the report_counters rollup collection"""
+
+    def __init__(self, db=None, resolve_db=None):
+        # resolve_db: callable returning the database, for owners that connect lazily
+        self._db = db
+        self._resolve_db = resolve_db
+
+    @property
+    def db(self):
+        return self._resolve_db() if self._resolve_db is not None else self._db
+
+    @property
+    def collection(self):
+        return self.db[COUNTERS_COLLECTION]
+
+    def _apply(self, day: Optional[str], increments: Dict[str, int]):
+        """$inc the 'all' counter and the creation-day counter in one bulk write"""
+        if self.db is None or not increments:
+            return
+        operations = [UpdateOne({'_id': ALL_COUNTER_ID}, {'$inc': increments}, upsert=True)]
+        if day:
+            operations.append(UpdateOne(
+                {'_id': f'day:{day}'},
+                {'$inc': increments, '$setOnInsert': {'date': day}},
+                upsert=True
+            ))
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Error updating report counters: {e}")
+
+    def record_created(self, report: Dict):
+        """Count a newly inserted report"""
+        increments = {'total': 1}
+        for field in COUNTED_FIELDS:
+            increments[f'{field}.{_bucket(report.get(field))}'] = 1
+        self._apply(_day_key(report.get('created_at')), increments)
+
+    def record_deleted(self, report: Dict):
+        """Remove a deleted report from the counters"""
+        increments = {'total': -1}
+        for field in COUNTED_FIELDS:
+            increments[f'{field}.{_bucket(report.get(field))}'] = -1
+        self._apply(_day_key(report.get('created_at')), increments)
+
+    def record_changed(self, before: Dict, changes: Dict):
+        """Move a report between buckets when status/priority/disaster_type change"""
+        increments = {}
+        for field in COUNTED_FIELDS:
+            if field not in changes:
+                continue
+            old, new = _bucket(before.get(field)), _bucket(changes[field])
+            if old != new:
+                increments[f'{field}.{old}'] = -1
+                increments[f'{field}.{new}'] = 1
+        self._apply(_day_key(before.get('created_at')), increments)
+
+    def get_rollup(self, days: int = 30, now: Optional[datetime] = None) -> Dict:
+        """Overall counters plus a per-day series for the last `days` UTC days (oldest first)"""
+        if self.db is None:
+            return {'all': {}, 'daily': []}
+
+        now = now or datetime.utcnow()
+        dates = [(now - timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(days - 1, -1, -1)]
+        ids = [ALL_COUNTER_ID] + [f'day:{date}' for date in dates]
+        documents = {document['_id']: document for document in self.collection.find({'_id': {'$in': ids}})}
+
+        daily = []
+        for date in dates:
+            document = documents.get(f'day:{date}', {})
+            daily.append({
+                'date': date,
+                'count': document.get('total', 0),
+                'status': document.get('status', {}),
+                'priority': document.get('priority', {}),
+                'disaster_type': document.get('disaster_type', {}),
+            })
+
+        return {'all': documents.get(ALL_COUNTER_ID, {}), 'daily': daily}
+
+    def rebuild(self, reports_collection) -> int:
+        """Recompute every counter document from the reports collection; returns the number of documents written"""
+        pipeline = [
+            {'$group': {
+                '_id': {
+                    'day': {'$dateToString': {
+                        'format': '%Y-%m-%d',
+                        'date': {'$convert': {'input': '$created_at', 'to': 'date', 'onError': None, 'onNull': None}},
+                        'onNull': None
+                    }},
+                    'status': '$status',
+                    'priority': '$priority',
+                    'disaster_type': '$disaster_type',
+                },
+                'count': {'$sum': 1}
+            }}
+        ]
+
+        documents: Dict[str, Dict] = {}
+
+        def add(counter_id: str, group: Dict, count: int):
+            document = documents.setdefault(counter_id, {'_id': counter_id, 'total': 0, 'status': {}, 'priority': {}, 'disaster_type': {}})
+            document['total'] += count
+            for field in COUNTED_FIELDS:
+                bucket = _bucket(group.get(field))
+                document[field][bucket] = document[field].get(bucket, 0) + count
+
+        for row in reports_collection.aggregate(pipeline, allowDiskUse=True):
+            add(ALL_COUNTER_ID, row['_id'], row['count'])
+            if row['_id'].get('day'):
+                add(f"day:{row['_id']['day']}", row['_id'], row['count'])
+                documents[f"day:{row['_id']['day']}"]['date'] = row['_id']['day']
+
+        # Replace in place so readers never see an empty collection, then drop stale days
+        if documents:
+            self.collection.bulk_write(
+                [ReplaceOne({'_id': counter_id}, document, upsert=True) for counter_id, document in documents.items()],
+                ordered=False
+            )
+        self.collection.delete_many({'_id': {'$nin': list(documents)}})
+        return len(documents)
+
+
+def counter_distribution(counters: Dict, field: str) -> List[Dict]:
+    """[{field: value, 'count': n}, ...] for the non-empty buckets of a counter field"""
+    return [
+        {field: value, 'count': count}
+        for value, count in counters.get(field, {}).items()
+        if count > 0
+    ]
@@ -0,0 +1,92 @@
+"""
+Index declarations for the emergency_reports collection
+Each index lists the SOSReportMongoDBService methods whose query shapes it serves.
+"""
+from datetime import datetime
+
+from mongodb_integration.indexes import register_indexes
+
+REPORTS_COLLECTION = 'emergency_reports'
+
+REPORT_INDEXES = [
+    {
+        'name': 'report_id_1',
+        'keys': [('report_id', 1)],
+        'options': {'unique': True, 'sparse': True},
+        'used_by': ['get_report_by_id', 'update_report', 'delete_report', 'add_vote', 'add_comment'],
+    },
+    {
+        'name': 'created_at_-1__id_-1',
+        'keys': [('created_at', -1), ('_id', -1)],
+        'used_by': ['get_reports', 'get_reports_page'],
+    },
+    {
+        'name': 'user_id_1_created_at_-1__id_-1',
+        'keys': [('user_id', 1), ('created_at', -1), ('_id', -1)],
+        'used_by': ['get_reports', 'get_reports_page', 'get_dashboard_stats'],
+    },
+    {
+        'name': 'disaster_type_1_created_at_-1',
+        'keys': [('disaster_type', 1), ('created_at', -1)],
+        'used_by': ['get_reports'],
+    },
+    {
+        'name': 'geo_location_2dsphere_status_1',
+        'keys': [('geo_location', '2dsphere'), ('status', 1)],
+        'used_by': ['get_nearby_reports'],
+    },
+    {
+        'name': 'media.spooled_at_1_pending',
+        'keys': [('media.spooled_at', 1)],
+        'options': {'partialFilterExpression': {'media.upload_status': 'pending'}},
+        'used_by': ['expire_pending_media'],
+    },
+]
+
+# Representative filters/sorts issued by the service; values only need the right type
+REPORT_QUERY_SHAPES = [
+    {'name': 'get_reports', 'filter': {}, 'sort': [('created_at', -1)], 'used_by': 'get_reports'},
+    {'name': 'get_reports:user', 'filter': {'user_id': 1}, 'sort': [('created_at', -1)], 'used_by': 'get_reports'},
+    {'name': 'get_reports:disaster_type', 'filter': {'disaster_type': 'FLOOD'}, 'sort': [('created_at', -1)], 'used_by': 'get_reports'},
+    {
+        'name': 'get_reports_page:cursor',
+        'filter': {'$or': [{'created_at': {'$lt': 0}}, {'created_at': 0, '_id': {'$lt': 0}}]},
+        'sort': [('created_at', -1), ('_id', -1)],
+        'used_by': 'get_reports_page'
+    },
+    {'name': 'get_report_by_id:report_id', 'filter': {'report_id': 'report-id'}, 'used_by': 'get_report_by_id'},
+    {'name': 'add_vote', 'filter': {'report_id': 'report-id'}, 'used_by': 'add_vote'},
+    {'name': 'get_dashboard_stats:user', 'filter': {'user_id': 1}, 'used_by': 'get_dashboard_stats'},
+    {
+        'name': 'get_nearby_reports',
+        'filter': {
+            'geo_location': {'$nearSphere': {'$geometry': {'type': 'Point', 'coordinates': [77.2, 28.6]}, '$maxDistance': 10000}},
+            'status': {'$in': ['PENDING', 'VERIFIED', 'IN_PROGRESS']}
+        },
+        'used_by': 'get_nearby_reports'
+    },
+    {
+        'name': 'expire_pending_media',
+        'filter': {'media.upload_status': 'pending', 'media.spooled_at': {'$lt': datetime(2024, 1, 1)}},
+        'used_by': 'expire_pending_media'
+    },
+]
+
+register_indexes(REPORTS_COLLECTION, REPORT_INDEXES, REPORT_QUERY_SHAPES)
+
+VOTES_COLLECTION = 'report_votes'
+
+VOTE_INDEXES = [
+    {
+        'name': 'report_id_1_user_id_1',
+        'keys': [('report_id', 1), ('user_id', 1)],
+        'options': {'unique': True},
+        'used_by': ['add_vote', 'delete_report', 'migrate_report_votes'],
+    },
+]
+
+VOTE_QUERY_SHAPES = [
+    {'name': 'add_vote', 'filter': {'report_id': 'report-id', 'user_id': '1'}, 'used_by': 'add_vote'},
+]
+
+register_indexes(VOTES_COLLECTION, VOTE_INDEXES, VOTE_QUERY_SHAPES)
@@ -0,0 +1,57 @@
+"""
+Backfill the GeoJSON geo_location field for reports created before it existed
+
+    python manage.py backfill_report_geo
+    python manage.py backfill_report_geo --batch-size 500 --dry-run
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from mongodb_integration.connection import mongo_connection
+from sos_reports.indexes import REPORTS_COLLECTION
+from sos_reports.mongodb_service import build_geo_point
+
+
+class Command(BaseCommand):
+    help = 'Populate geo_location (GeoJSON Point) from the legacy latitude/longitude fields'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Updates per bulk_write')
+        parser.add_argument('--dry-run', action='store_true', help='Count the reports that would be updated')
+
+    def handle(self, *args, **options):
+        collection = mongo_connection.get_database()[REPORTS_COLLECTION]
+        cursor = collection.find(
+            {'geo_location': {'$exists': False}},
+            {'latitude': 1, 'longitude': 1, 'location': 1}
+        ).batch_size(options['batch_size'])
+
+        updated = skipped = 0
+        batch = []
+        for report in cursor:
+            location = report.get('location') or {}
+            lat = report.get('latitude', location.get('lat'))
+            lng = report.get('longitude', location.get('lng'))
+            geo_location = build_geo_point(lat, lng)
+            if geo_location is None:
+                skipped += 1
+                continue
+
+            batch.append(UpdateOne({'_id': report['_id']}, {'$set': {'geo_location': geo_location}}))
+            if len(batch) >= options['batch_size']:
+                updated += self._flush(collection, batch, options['dry_run'])
+                batch = []
+
+        if batch:
+            updated += self._flush(collection, batch, options['dry_run'])
+
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'✅ {verb} {updated} report(s)'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'⚠️  Skipped {skipped} report(s) without usable coordinates'))
+
+    def _flush(self, collection, batch, dry_run):
+        if dry_run:
+            return len(batch)
+        result = collection.bulk_write(batch, ordered=False)
+        return result.modified_count
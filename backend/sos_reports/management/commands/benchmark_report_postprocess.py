@@ -0,0 +1,83 @@
+"""
+Micro-benchmark for ReportPostProcessor on synthetic report pages
+
+    python manage.py benchmark_report_postprocess
+    python manage.py benchmark_report_postprocess --sizes 100,1000,10000 --repeat 10
+"""
+import copy
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.core.management.base import BaseCommand
+
+from sos_reports.postprocess import ReportPostProcessor
+
+
+def synthetic_report(index: int, stored_votes: bool) -> dict:
+    """A report shaped like the documents create_report/add_vote/add_comment produce"""
+    created_at = datetime(2025, 1, 1) + timedelta(minutes=index)
+    votes = [
+        {'user_id': user_id, 'vote_type': random.choice(['STILL_THERE', 'RESOLVED', 'FAKE_REPORT']), 'created_at': created_at.isoformat()}
+        for user_id in range(random.randint(0, 12))
+    ]
+    report = {
+        '_id': ObjectId(),
+        'report_id': f'report-{index}',
+        'user_id': index % 50,
+        'disaster_type': 'FLOOD',
+        'priority': 'HIGH',
+        'status': 'PENDING',
+        'description': 'Water level rising near the bridge ' * 4,
+        'latitude': 28.6,
+        'longitude': 77.2,
+        'location': {'lat': 28.6, 'lng': 77.2, 'address': 'New Delhi'},
+        'geo_location': {'type': 'Point', 'coordinates': [77.2, 28.6]},
+        'media': [
+            {'media_type': 'IMAGE', 'url': f'https://res.cloudinary.com/demo/image/upload/{index}.jpg', 'public_id': f'nudrrs/{index}'},
+            {'media_type': 'IMAGE', 'file': f'reports/{index}.jpg'},
+        ],
+        'images': [f'https://res.cloudinary.com/demo/image/upload/{index}.jpg', f'reports/{index}.jpg'],
+        'updates': [{'id': str(ObjectId()), 'message': 'Team dispatched', 'created_at': created_at.isoformat()}],
+        'votes': votes,
+        'ai_analysis_data': {'analysis': {'confidence': 0.9, 'keywords': ['flood', 'water']}},
+        'created_at': created_at,
+        'updated_at': created_at,
+    }
+    if stored_votes:
+        counts = {'still_there': 0, 'resolved': 0, 'fake_report': 0, 'total': len(votes)}
+        for vote in votes:
+            counts[vote['vote_type'].lower()] += 1
+        report['vote_counts'] = counts
+    return report
+
+
+class Command(BaseCommand):
+    help = 'Measure per-report post-processing cost at several page sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated page sizes')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per size')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        processor = ReportPostProcessor()
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+
+        self.stdout.write(f"{'page size':>10} {'stored votes':>13} {'median ms':>10} {'us/report':>10}")
+        for size in sizes:
+            for stored_votes in (True, False):
+                template = [synthetic_report(index, stored_votes) for index in range(size)]
+                timings = []
+                for _ in range(options['repeat']):
+                    page = copy.deepcopy(template)  # Not timed: the driver hands us fresh documents
+                    started = time.perf_counter()
+                    processor.process_many(page)
+                    timings.append(time.perf_counter() - started)
+
+                median = statistics.median(timings)
+                self.stdout.write(
+                    f"{size:>10} {('yes' if stored_votes else 'no'):>13} {median * 1000:>10.2f} {median / size * 1e6:>10.2f}"
+                )
@@ -0,0 +1,29 @@
+"""
+Clean up deferred media uploads whose job was lost (e.g. the process was killed)
+
+    python manage.py expire_media_uploads                   # older than MEDIA_UPLOAD_SPOOL_MAX_AGE_SECONDS
+    python manage.py expire_media_uploads --max-age 600     # custom age in seconds
+
+Deletes this host's spool files and marks report media placeholders still
+pending as failed. Upload jobs also run this sweep every
+MEDIA_UPLOAD_SWEEP_SECONDS, skipping their own process's queued uploads and
+touching those spool files so other sweeps skip them too; run the command
+from cron on hosts that spool uploads but rarely get new ones.
+"""
+from django.core.management.base import BaseCommand
+
+from sos_reports.tasks import expire_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete stale upload spool files and fail media placeholders whose upload job was lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=None,
+                            help='Age in seconds (default: MEDIA_UPLOAD_SPOOL_MAX_AGE_SECONDS)')
+
+    def handle(self, *args, **options):
+        expired = expire_stale_uploads(options['max_age'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Deleted {expired['spool_files']} spool file(s), failed {expired['placeholders']} pending upload(s)"
+        ))
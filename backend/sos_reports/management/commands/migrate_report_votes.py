@@ -0,0 +1,95 @@
+"""
+Move legacy embedded report votes into the report_votes collection
+
+    python manage.py migrate_report_votes
+    python manage.py migrate_report_votes --keep-legacy --batch-size 200
+
+Each vote in a report's `votes` array (or its lone legacy `user_vote`) becomes a
+report_votes document; votes already recorded there are left untouched. The
+report's vote_counts/vote_percentages are then recomputed from report_votes.
+Run it during low traffic: a vote cast while its report's batch is being
+recounted can be overwritten by the recount.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from mongodb_integration.connection import mongo_connection
+from sos_reports.indexes import REPORTS_COLLECTION, VOTES_COLLECTION
+from sos_reports.mongodb_service import VOTE_COUNT_KEYS
+from sos_reports.postprocess import vote_percentages
+
+
+class Command(BaseCommand):
+    help = 'Migrate embedded votes arrays to report_votes and rebuild stored vote_counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Reports per batch')
+        parser.add_argument('--keep-legacy', action='store_true', help='Do not remove the embedded votes arrays')
+
+    def handle(self, *args, **options):
+        db = mongo_connection.get_database()
+        reports = db[REPORTS_COLLECTION]
+        cursor = reports.find(
+            {'report_id': {'$exists': True}, '$or': [{'votes.0': {'$exists': True}}, {'user_vote.vote_type': {'$exists': True}}]},
+            {'report_id': 1, 'votes': 1, 'user_vote': 1}
+        ).batch_size(options['batch_size'])
+
+        migrated_reports = migrated_votes = 0
+        batch = []
+        for report in cursor:
+            batch.append(report)
+            if len(batch) >= options['batch_size']:
+                migrated_votes += self._migrate_batch(db, batch, options['keep_legacy'])
+                migrated_reports += len(batch)
+                batch = []
+        if batch:
+            migrated_votes += self._migrate_batch(db, batch, options['keep_legacy'])
+            migrated_reports += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Migrated {migrated_reports} report(s), {migrated_votes} new vote document(s)'
+        ))
+
+    def _migrate_batch(self, db, batch, keep_legacy):
+        vote_operations = []
+        for report in batch:
+            votes = report.get('votes') or [report['user_vote']]
+            for vote in votes:
+                if vote.get('vote_type') not in VOTE_COUNT_KEYS or vote.get('user_id') is None:
+                    continue
+                vote_operations.append(UpdateOne(
+                    {'report_id': report['report_id'], 'user_id': str(vote['user_id'])},
+                    {'$setOnInsert': {
+                        'vote_type': vote['vote_type'],
+                        'username': vote.get('username'),
+                        'created_at': vote.get('created_at'),
+                        'updated_at': vote.get('created_at'),
+                    }},
+                    upsert=True
+                ))
+
+        inserted = 0
+        if vote_operations:
+            inserted = db[VOTES_COLLECTION].bulk_write(vote_operations, ordered=False).upserted_count
+
+        # Recount from report_votes so votes cast after the legacy array stopped being written are included
+        report_ids = [report['report_id'] for report in batch]
+        counts = {report_id: {key: 0 for key in VOTE_COUNT_KEYS.values()} for report_id in report_ids}
+        for row in db[VOTES_COLLECTION].aggregate([
+            {'$match': {'report_id': {'$in': report_ids}}},
+            {'$group': {'_id': {'report_id': '$report_id', 'vote_type': '$vote_type'}, 'count': {'$sum': 1}}}
+        ]):
+            key = VOTE_COUNT_KEYS.get(row['_id']['vote_type'])
+            if key:
+                counts[row['_id']['report_id']][key] = row['count']
+
+        report_operations = []
+        for report_id, vote_counts in counts.items():
+            vote_counts['total'] = sum(vote_counts.values())
+            update = {'$set': {'vote_counts': vote_counts, 'vote_percentages': vote_percentages(vote_counts)}}
+            if not keep_legacy:
+                update['$unset'] = {'votes': ''}
+            report_operations.append(UpdateOne({'report_id': report_id}, update))
+        db[REPORTS_COLLECTION].bulk_write(report_operations, ordered=False)
+
+        return inserted
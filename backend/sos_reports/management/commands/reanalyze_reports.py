@@ -0,0 +1,220 @@
+"""
+Re-run the AI analysis over existing reports (e.g. after tuning the heuristics)
+
+    python manage.py reanalyze_reports
+    python manage.py reanalyze_reports --batch-size 200 --processes 4 --model-concurrency 8
+    python manage.py reanalyze_reports --no-model --status PENDING --limit 1000
+    python manage.py reanalyze_reports --restart          # ignore the saved checkpoint
+
+Reports are streamed in _id order. For each batch the keyword/image heuristics
+run in a process pool while the Gemini calls run concurrently (bounded by
+--model-concurrency) on the AI call threads; results are written back with one
+bulk_write. The last processed _id is checkpointed after every batch so an
+interrupted run resumes where it stopped.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from ai_services.gemini_service import run_model_call
+from ai_services.registry import ai_registry
+from ai_services.services import AIVerificationService
+from media_storage import media_storage
+from mongodb_integration.connection import mongo_connection
+from sos_reports.counters import ReportCountersService
+from sos_reports.indexes import REPORTS_COLLECTION
+from sos_reports.mongodb_service import COUNTER_PROJECTION, mongodb_service
+from sos_reports.tasks import triage_from_analysis
+
+CHECKPOINTS_COLLECTION = 'maintenance_checkpoints'
+
+_heuristics_service = None
+
+
+def _local_image_paths(report):
+    """Paths of the report's locally stored images; remote (Cloudinary) URLs are skipped"""
+    paths = []
+    for image in report.get('images') or []:
+        if not image or image.startswith('http'):
+            continue
+        stored_path = media_storage.local.path_for_url(image)
+        if stored_path:
+            paths.append(stored_path)
+            continue
+        relative = image.lstrip('/')
+        media_prefix = settings.MEDIA_URL.strip('/') + '/'
+        if relative.startswith(media_prefix):
+            relative = relative[len(media_prefix):]
+        path = os.path.join(settings.MEDIA_ROOT, relative)
+        if os.path.exists(path):
+            paths.append(path)
+    return paths
+
+
+def heuristic_analysis(item):
+    """Process-pool task: keyword and image heuristics for one report"""
+    global _heuristics_service
+    if _heuristics_service is None:
+        # Heuristic workers never call the model, so they do not build a Gemini client
+        _heuristics_service = AIVerificationService(gemini_service=False)
+    return _heuristics_service._traditional_analysis(
+        item['description'], item['image_paths'], item['disaster_type'], item['location']
+    )
+
+
+class Command(BaseCommand):
+    help = 'Re-run AI analysis over stored reports with batched, resumable writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Reports per batch / bulk_write')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 2, help='Heuristic worker processes')
+        parser.add_argument('--model-concurrency', type=int, default=8, help='Gemini calls in flight')
+        parser.add_argument('--no-model', action='store_true', help='Heuristics only; skip Gemini')
+        parser.add_argument('--apply-triage', action='store_true', help='Also update priority/status from the analysis')
+        parser.add_argument('--status', help='Only reports with this status')
+        parser.add_argument('--limit', type=int, help='Stop after this many reports')
+        parser.add_argument('--checkpoint', default='reanalyze_reports', help='Checkpoint name')
+        parser.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint')
+        parser.add_argument('--dry-run', action='store_true', help='Analyse but do not write')
+
+    def handle(self, *args, **options):
+        # fork keeps the configured Django settings in the workers. Fork them before this process
+        # opens MongoDB sockets or builds the Gemini client, neither of which survives a fork
+        context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        processes = ProcessPoolExecutor(max_workers=options['processes'], mp_context=context)
+        try:
+            # The pool starts processes as work is submitted; one task per worker starts them all now
+            for future in [processes.submit(os.getpid) for _ in range(options['processes'])]:
+                future.result()
+
+            gemini = None if options['no_model'] else ai_registry.get('gemini')
+            if gemini is None and not options['no_model']:
+                self.stdout.write(self.style.WARNING('⚠️  Gemini is not available; running heuristics only'))
+
+            db = mongo_connection.get_database()
+            collection = db[REPORTS_COLLECTION]
+            checkpoints = db[CHECKPOINTS_COLLECTION]
+            counters = ReportCountersService(db)
+            service = AIVerificationService(gemini_service=gemini or False)
+
+            checkpoint = None if options['restart'] else checkpoints.find_one({'_id': options['checkpoint']})
+            query = {'status': options['status']} if options['status'] else {}
+            if checkpoint and checkpoint.get('last_id') is not None:
+                query['_id'] = {'$gt': checkpoint['last_id']}
+                self.stdout.write(f"Resuming after {checkpoint['last_id']} ({checkpoint.get('processed', 0)} done earlier)")
+
+            projection = {**COUNTER_PROJECTION, 'description': 1, 'images': 1, 'address': 1}
+            cursor = collection.find(query, projection).sort('_id', 1).batch_size(options['batch_size'])
+            if options['limit']:
+                cursor = cursor.limit(options['limit'])
+
+            started = time.perf_counter()
+            totals = {'processed': 0, 'written': 0, 'model_calls': 0, 'model_failures': 0}
+            batch = []
+            for report in cursor:
+                batch.append(report)
+                if len(batch) >= options['batch_size']:
+                    self._process_batch(batch, service, gemini, processes, collection, counters, checkpoints, options, totals, started)
+                    batch = []
+            if batch:
+                self._process_batch(batch, service, gemini, processes, collection, counters, checkpoints, options, totals, started)
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Re-analysed {totals['processed']} report(s) in {elapsed:.1f}s "
+                f"({totals['processed'] / elapsed if elapsed else 0:.1f} reports/s), wrote {totals['written']}, "
+                f"{totals['model_calls']} model call(s), {totals['model_failures']} fell back to heuristics"
+            ))
+        finally:
+            processes.shutdown()
+
+    def _process_batch(self, reports, service, gemini, processes, collection, counters, checkpoints, options, totals, started):
+        items = [{
+            'description': report.get('description') or '',
+            'image_paths': _local_image_paths(report),
+            'disaster_type': report.get('disaster_type'),
+            'location': report.get('address'),
+        } for report in reports]
+
+        analyses, model_calls, model_failures = asyncio.run(
+            self._analyse(items, service, gemini, processes, options['model_concurrency'])
+        )
+        totals['model_calls'] += model_calls
+        totals['model_failures'] += model_failures
+
+        now = datetime.utcnow()
+        operations = []
+        triage_changes = []
+        for report, analysis in zip(reports, analyses):
+            update_data = {
+                'ai_verified': analysis.get('is_emergency', False),
+                'ai_confidence': analysis.get('confidence', 0.0),
+                'ai_fraud_score': analysis.get('fraud_score', 0.0),
+                'ai_analysis_data': analysis,
+                'ai_reanalyzed_at': now,
+                'updated_at': now,
+            }
+            if options['apply_triage']:
+                triage = triage_from_analysis(analysis)
+                update_data.update(triage)
+                triage_changes.append((report, triage))
+            operations.append(UpdateOne({'_id': report['_id']}, {'$set': update_data}))
+
+        if not options['dry_run']:
+            result = collection.bulk_write(operations, ordered=False)
+            totals['written'] += result.modified_count
+            # bulk_write bypasses update_report, so keep the dashboard counters and caches in step here
+            for report, triage in triage_changes:
+                counters.record_changed(report, triage)
+            for user_id in {report.get('user_id') for report, _ in triage_changes}:
+                mongodb_service.invalidate_dashboard_stats(user_id)
+
+        totals['processed'] += len(reports)
+        if not options['dry_run']:
+            checkpoints.update_one(
+                {'_id': options['checkpoint']},
+                {'$set': {'last_id': reports[-1]['_id'], 'updated_at': now}, '$inc': {'processed': len(reports)}},
+                upsert=True
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"  {totals['processed']} report(s), {totals['processed'] / elapsed if elapsed else 0:.1f} reports/s, "
+            f"last _id {reports[-1]['_id']}"
+        )
+
+    async def _analyse(self, items, service, gemini, processes, model_concurrency):
+        """Heuristics in the process pool and model calls on the AI call threads, overlapped"""
+        loop = asyncio.get_running_loop()
+        heuristics = [loop.run_in_executor(processes, heuristic_analysis, item) for item in items]
+
+        model_results = [None] * len(items)
+        if gemini is not None:
+            slots = asyncio.Semaphore(model_concurrency)
+            timeout = getattr(settings, 'AI_CALL_TIMEOUT_SECONDS', 30)
+
+            async def analyse(item):
+                async with slots:
+                    try:
+                        return await asyncio.wait_for(run_model_call(
+                            gemini.analyze_emergency_situation, item['description'], item['image_paths'],
+                            item['disaster_type'], item['location']
+                        ), timeout)
+                    except Exception as e:
+                        print(f"Model analysis failed: {e}")
+                        return None
+
+            model_results = await asyncio.gather(*(analyse(item) for item in items))
+
+        traditional = await asyncio.gather(*heuristics)
+        analyses = [service.merge_analysis(model, heuristic) for model, heuristic in zip(model_results, traditional)]
+        model_calls = sum(1 for result in model_results if result is not None) if gemini is not None else 0
+        model_failures = sum(1 for result in model_results if not (result or {}).get('success')) if gemini is not None else 0
+        return analyses, model_calls, model_failures
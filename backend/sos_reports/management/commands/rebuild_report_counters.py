@@ -0,0 +1,22 @@
+"""
+Recompute the report_counters rollup from emergency_reports
+
+    python manage.py rebuild_report_counters
+
+Run once after deploying the counters, and whenever they may have drifted
+(e.g. after reports were edited directly in the database).
+"""
+from django.core.management.base import BaseCommand
+
+from mongodb_integration.connection import mongo_connection
+from sos_reports.counters import ReportCountersService, COUNTERS_COLLECTION
+from sos_reports.indexes import REPORTS_COLLECTION
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day/status/priority/disaster_type report counters'
+
+    def handle(self, *args, **options):
+        db = mongo_connection.get_database()
+        written = ReportCountersService(db).rebuild(db[REPORTS_COLLECTION])
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote {written} {COUNTERS_COLLECTION} document(s)'))
@@ -0,0 +1,213 @@
+"""
+Concurrent media uploads for report creation
+Attachments are uploaded to the media storage backend on a bounded thread pool, streamed from
+Django's upload temp file rather than copied into memory. In deferred mode the
+files are spooled to disk, the report is inserted with placeholder media entries,
+and a background job in the same process uploads them and patches the URLs in.
+Spool files left behind by a crash are removed once they are older than
+MEDIA_UPLOAD_SPOOL_MAX_AGE_SECONDS.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+
+SPOOL_PREFIX = 'nudrrs-upload-'
+
+_upload_pool = None
+_upload_pool_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _upload_pool
+    if _upload_pool is None:
+        with _upload_pool_lock:
+            if _upload_pool is None:
+                _upload_pool = ThreadPoolExecutor(max_workers=getattr(settings, 'MEDIA_UPLOAD_WORKERS', 4),
+                                                  thread_name_prefix='media-upload')
+    return _upload_pool
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return 'IMAGE' if (content_type or '').startswith('image/') else 'VIDEO'
+
+
+def _local_media_info(media_type: str, name: str, content_type: str, size: int, detailed: bool = True) -> Dict:
+    """Media entry pointing at MEDIA_URL when no storage backend accepted the file"""
+    url = f"/media/reports/{name}"
+    media_info = {
+        'media_type': media_type,
+        'filename': name,
+        'content_type': content_type,
+        'size': size,
+        'url': url,
+    }
+    if detailed:
+        media_info.update({'public_id': None, 'format': None, 'width': None, 'height': None,
+                           'bytes': size, 'created_at': None})
+    # Legacy compatibility fields
+    media_info.update({'file_url': url, 'image_url': url})
+    return media_info
+
+
+def upload_one(source, name: str, content_type: str, size: int, report_id: str, disaster_type: str) -> Tuple[Dict, Optional[str]]:
+    """Upload one attachment; returns (media entry, image URL or None)
+
+    source: a Django UploadedFile or the path of a spooled file.
+    """
+    media_type = _media_type(content_type)
+    if media_type != 'IMAGE':
+        # For non-image files, store basic info
+        return {'media_type': media_type, 'filename': name, 'content_type': content_type, 'size': size}, None
+
+    try:
+        from media_storage import media_storage
+
+        # Generate unique filename
+        file_extension = name.split('.')[-1] if '.' in name else 'jpg'
+        unique_filename = f"{report_id}_{uuid.uuid4().hex[:8]}.{file_extension}"
+
+        upload_result = media_storage.upload_file(
+            file=source,
+            folder=f"nudrrs/reports/{report_id}",
+            filename=unique_filename,
+            tags=['nudrrs', 'emergency_report', (disaster_type or 'other').lower()]
+        )
+
+        if upload_result['success']:
+            media_info = {
+                'media_type': media_type,
+                'filename': unique_filename,
+                'content_type': content_type,
+                'size': size,
+                'file_id': upload_result['public_id'],
+                'public_id': upload_result['public_id'],
+                'url': upload_result['url'],
+                'format': upload_result.get('format'),
+                'width': upload_result.get('width'),
+                'height': upload_result.get('height'),
+                'bytes': upload_result.get('bytes'),
+                'created_at': upload_result.get('created_at'),
+                # Legacy compatibility fields
+                'imagekit_url': upload_result['url'],
+                'file_url': upload_result['url'],
+                'image_url': upload_result['url']
+            }
+            return media_info, upload_result['url']
+
+        print(f"Media upload failed: {upload_result.get('error', 'Unknown error')}")
+        media_info = _local_media_info(media_type, name, content_type, size)
+    except Exception as e:
+        print(f"Media upload error: {e}")
+        media_info = _local_media_info(media_type, name, content_type, size, detailed=False)
+    return media_info, media_info['url']
+
+
+def upload_files(files, report_id: str, disaster_type: str) -> List[Tuple[Dict, Optional[str]]]:
+    """Upload request files concurrently; results keep the order of `files`"""
+    if len(files) <= 1:
+        return [upload_one(file, file.name, file.content_type, file.size, report_id, disaster_type) for file in files]
+    futures = [
+        _pool().submit(upload_one, file, file.name, file.content_type, file.size, report_id, disaster_type)
+        for file in files
+    ]
+    return [future.result() for future in futures]
+
+
+def _spool_dir() -> str:
+    return getattr(settings, 'MEDIA_UPLOAD_SPOOL_DIR', None) or tempfile.gettempdir()
+
+
+def spool_files(files) -> List[Dict]:
+    """Copy request files to the spool directory so they outlive the request
+
+    Returns [{'upload_id', 'path', 'name', 'content_type', 'size'}, ...]; the copy is streamed
+    (a rename of Django's temp file is not possible, it is deleted when the request ends).
+    """
+    spool_dir = _spool_dir()
+    os.makedirs(spool_dir, exist_ok=True)
+    spooled = []
+    for file in files:
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(spool_dir, f'{SPOOL_PREFIX}{upload_id}')
+        with open(path, 'wb') as destination:
+            if hasattr(file, 'temporary_file_path'):
+                with open(file.temporary_file_path(), 'rb') as source:
+                    shutil.copyfileobj(source, destination)
+            else:
+                for chunk in file.chunks():
+                    destination.write(chunk)
+        spooled.append({'upload_id': upload_id, 'path': path, 'name': file.name,
+                        'content_type': file.content_type, 'size': file.size})
+    return spooled
+
+
+def pending_media_info(spooled: Dict) -> Dict:
+    """Placeholder media entry stored with the report until its upload finishes"""
+    return {
+        'upload_id': spooled['upload_id'],
+        'upload_status': 'pending',
+        'media_type': _media_type(spooled['content_type']),
+        'filename': spooled['name'],
+        'content_type': spooled['content_type'],
+        'size': spooled['size'],
+        'spooled_at': datetime.utcnow(),
+    }
+
+
+def upload_spooled(spooled: List[Dict], report_id: str, disaster_type: str) -> List[Tuple[Dict, Optional[str]]]:
+    """Upload spooled files concurrently; media entries keep their upload_id for the patch"""
+    def upload(item):
+        media_info, image_url = upload_one(item['path'], item['name'], item['content_type'], item['size'],
+                                           report_id, disaster_type)
+        media_info['upload_id'] = item['upload_id']
+        media_info['upload_status'] = 'uploaded'
+        return media_info, image_url
+
+    futures = [_pool().submit(upload, item) for item in spooled]
+    return [future.result() for future in futures]
+
+
+def discard_spooled(spooled: List[Dict]):
+    """Delete spooled files once their URLs are stored on the report"""
+    for item in spooled:
+        try:
+            os.unlink(item['path'])
+        except OSError:
+            pass
+
+
+def sweep_spool_dir(max_age: float, keep: Iterable[str] = ()) -> int:
+    """Delete spool files older than max_age seconds (their job died with its process); returns the count
+
+    keep: paths whose job is still queued or running here; they are touched instead, so the
+    sweeps of other processes sharing the spool directory see them as fresh.
+    """
+    keep = set(keep)
+    for path in keep:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(_spool_dir()))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(SPOOL_PREFIX) or entry.path in keep:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -152,10 +152,10 @@ class ReportMedia(models.Model):
     
     @property
     def thumbnail_url(self):
-        """Get thumbnail URL via Cloudinary transformation if available"""
+        """Get thumbnail URL via the media storage transformation if available"""
         if self.public_id:
-            from cloudinary_service import cloudinary_service
-            return cloudinary_service.transform_url(self.public_id, {
+            from media_storage import media_storage
+            return media_storage.transform_url(self.public_id, {
                 'transformation': [
                     { 'width': 300, 'height': 300, 'crop': 'fill', 'gravity': 'auto' }
                 ]
@@ -2,9 +2,10 @@
 MongoDB service for SOS Reports
 Handles all database operations for reports using MongoDB
 """
-from pymongo import MongoClient
+from pymongo import ReturnDocument
 import ssl
 from django.conf import settings
+from django.core.cache import cache
 from datetime import datetime
 from django.utils import timezone
 import json
@@ -12,25 +13,94 @@ import math
 import uuid
 from typing import List, Dict, Optional, Any
 from bson import ObjectId
+from .counters import ReportCountersService
+from .postprocess import ReportPostProcessor
+from mongodb_integration.connection import LazyMongoService, mongo_connection
+from mongodb_integration.pagination import paginate, InvalidCursor
 
-class SOSReportMongoDBService:
-    """Service class for SOS Report operations with MongoDB"""
+def build_geo_point(lat, lng) -> Optional[Dict]:
+    """Build a GeoJSON Point for the geo_location field, or None if the coordinates are unusable"""
+    try:
+        lat = float(lat)
+        lng = float(lng)
+    except (TypeError, ValueError):
+        return None
+    
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+# Fields the report counters need from the pre-update/deleted document
+COUNTER_PROJECTION = {'report_id': 1, 'user_id': 1, 'created_at': 1, 'status': 1, 'priority': 1, 'disaster_type': 1}
+
+# One document per (report_id, user_id); reports keep only the vote_counts totals
+VOTES_COLLECTION = 'report_votes'
+VOTE_COUNT_KEYS = {'STILL_THERE': 'still_there', 'RESOLVED': 'resolved', 'FAKE_REPORT': 'fake_report'}
+
+def _count_votes(vote_type: str, votes='$votes') -> Dict:
+    """Projection expression counting entries of the legacy votes array with a given vote_type"""
+    return {'$size': {'$filter': {
+        'input': {'$ifNull': [votes, []]},
+        'cond': {'$eq': ['$$this.vote_type', vote_type]}
+    }}}
+
+def _stored_vote_counts(votes='$votes') -> Dict:
+    """Stored vote_counts, or counts computed from the legacy votes array for reports without them"""
+    return {'$cond': [
+        {'$ne': [{'$type': '$vote_counts.total'}, 'missing']},
+        '$vote_counts',
+        {
+            'still_there': _count_votes('STILL_THERE', votes),
+            'resolved': _count_votes('RESOLVED', votes),
+            'fake_report': _count_votes('FAKE_REPORT', votes),
+            'total': {'$size': {'$ifNull': [votes, []]}}
+        }
+    ]}
+
+# Stored vote_counts, or (for reports not voted on since they were stored) counts computed server-side
+VOTE_COUNTS_PROJECTION = _stored_vote_counts()
+
+# Fields needed by the map/list views; only the first media item/image is fetched for the thumbnail
+REPORT_SUMMARY_PROJECTION = {
+    'report_id': 1,
+    'emergency_type': 1,
+    'disaster_type': 1,
+    'priority': 1,
+    'status': 1,
+    'latitude': 1,
+    'longitude': 1,
+    'created_at': 1,
+    'media': {'$slice': 1},
+    'images': {'$slice': 1},
+    'vote_counts': VOTE_COUNTS_PROJECTION,
+}
+
+def build_report_projection(fields: List[str]) -> Optional[Dict]:
+    """Projection for a ?fields= list of top-level report fields, or None if no valid field was given"""
+    projection = {}
+    for field in fields:
+        field = field.strip()
+        if field == 'vote_counts':
+            projection[field] = VOTE_COUNTS_PROJECTION
+        elif field and field.isidentifier() and not field.startswith('_'):
+            projection[field] = 1
+    return projection or None
+
+class SOSReportMongoDBService(LazyMongoService):
+    """Service class for SOS Report operations with MongoDB (connects on first use)"""
     
     def __init__(self):
-        self.client = None
-        self.db = None
-        self.connect()
+        self.counters = ReportCountersService(resolve_db=lambda: self.db)
+        self.postprocessor = ReportPostProcessor()
+        mongo_connection.after_fork(self._rebind)
     
     def connect(self):
         """Connect to MongoDB Atlas"""
         try:
-            # Get connection string from environment variables
-            connection_string = settings.MONGODB_SETTINGS['host']
-            database_name = settings.MONGODB_SETTINGS['db']
-            
-            # PyMongo 4+: avoid legacy SSL kwargs. Use a clean SRV URI or modern tls* options in the URI if needed.
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=10000)
-            self.db = self.client[database_name]
+            # Shared process-wide client (mongodb_integration.connection)
+            self.client = mongo_connection.client
+            self.db = mongo_connection.get_database()
             
             # Test connection
             self.client.admin.command('ping')
@@ -55,90 +125,72 @@ class SOSReportMongoDBService:
                 elif isinstance(item, (dict, list)):
                     self._convert_objectids_to_strings(item)
     
-    def get_reports(self, filters: Dict = None, limit: int = 100, skip: int = 0, user_id: Optional[int] = None) -> List[Dict]:
-        """Get reports from MongoDB with optional filtering"""
+    def get_reports(self, filters: Dict = None, limit: int = 100, skip: int = 0, user_id: Optional[int] = None,
+                    projection: Optional[Dict] = None) -> List[Dict]:
+        """Get reports from MongoDB with optional filtering and field projection"""
         try:
-            if not self.db:
+            if self.db is None:
                 return []
             
             collection = self.db['emergency_reports']
-            query = {}
-            
-            # Apply filters
-            if filters:
-                query.update(filters)
-            
-            # Filter by user if specified
-            if user_id:
-                query['user_id'] = user_id
+            query = self._build_reports_query(filters, user_id)
             
             # Execute query
-            cursor = collection.find(query).sort('created_at', -1).skip(skip).limit(limit)
+            cursor = collection.find(query, projection).sort('created_at', -1).skip(skip).limit(limit)
             reports = list(cursor)
             
-            # Convert ObjectId to string and format dates
-            for report in reports:
-                if '_id' in report:
-                    report['id'] = str(report['_id'])
-                    del report['_id']
-                
-                # Convert any remaining ObjectId fields to strings
-                self._convert_objectids_to_strings(report)
-                
-                # Ensure created_at is properly formatted
-                if 'created_at' in report and isinstance(report['created_at'], datetime):
-                    report['created_at'] = report['created_at'].isoformat()
-                
-                if 'updated_at' in report and isinstance(report['updated_at'], datetime):
-                    report['updated_at'] = report['updated_at'].isoformat()
-                
-                # Fix image URLs - handle both Cloudinary and local storage
-                if 'media' in report and report['media']:
-                    for media_item in report['media']:
-                        # Check if it's already a Cloudinary URL
-                        if 'url' in media_item and media_item['url'] and media_item['url'].startswith('http'):
-                            # Cloudinary URL - use as is
-                            media_item['file_url'] = media_item['url']
-                            media_item['image_url'] = media_item['url']
-                            if 'file' not in media_item:
-                                media_item['file'] = media_item['url']
-                        elif 'file' in media_item and media_item['file']:
-                            # Local file - convert to full URL
-                            file_path = media_item['file']
-                            if not file_path.startswith('http'):
-                                full_url = f"http://localhost:8000/media/{file_path}"
-                                media_item['file'] = full_url
-                                # Also set the URL fields that frontend expects
-                                media_item['file_url'] = full_url
-                                media_item['image_url'] = full_url
-                                if 'url' not in media_item:
-                                    media_item['url'] = full_url
-                
-                # Also fix images array if it exists
-                if 'images' in report and report['images']:
-                    fixed_images = []
-                    for img_path in report['images']:
-                        if img_path and not img_path.startswith('http'):
-                            fixed_images.append(f"http://localhost:8000/media/{img_path}")
-                        else:
-                            fixed_images.append(img_path)
-                    report['images'] = fixed_images
-                
-                # Calculate vote counts and percentages
-                vote_counts = self._calculate_vote_counts(report)
-                vote_percentages = self._calculate_vote_percentages(vote_counts)
-                report['vote_counts'] = vote_counts
-                report['vote_percentages'] = vote_percentages
-            
+            self._format_reports(reports, projection)
             return reports
         except Exception as e:
             print(f"Error getting reports from MongoDB: {e}")
             return []
     
+    def get_reports_page(self, filters: Dict = None, limit: int = 20, cursor: Optional[str] = None,
+                         user_id: Optional[int] = None, projection: Optional[Dict] = None) -> Dict:
+        """Get one keyset page of reports: {'results', 'next', 'prev'}; raises InvalidCursor for bad tokens"""
+        try:
+            if self.db is None:
+                return {'results': [], 'next': None, 'prev': None}
+            
+            collection = self.db['emergency_reports']
+            query = self._build_reports_query(filters, user_id)
+            
+            # The cursor is built from created_at, so projected pages always need it
+            if projection is not None and 'created_at' not in projection:
+                projection = {**projection, 'created_at': 1}
+            
+            reports, next_cursor, prev_cursor = paginate(collection, query, limit, cursor, projection)
+            
+            self._format_reports(reports, projection)
+            return {'results': reports, 'next': next_cursor, 'prev': prev_cursor}
+        except InvalidCursor:
+            raise
+        except Exception as e:
+            print(f"Error getting reports page from MongoDB: {e}")
+            return {'results': [], 'next': None, 'prev': None}
+    
+    def _build_reports_query(self, filters: Dict = None, user_id: Optional[int] = None) -> Dict:
+        """Mongo filter for the report listing"""
+        query = {}
+        
+        # Apply filters
+        if filters:
+            query.update(filters)
+        
+        # Filter by user if specified
+        if user_id:
+            query['user_id'] = user_id
+        
+        return query
+    
+    def _format_reports(self, reports: List[Dict], projection: Optional[Dict] = None):
+        """Format listed reports in place for the API (projected reports carry vote_counts only if requested)"""
+        self.postprocessor.process_many(reports, with_votes=projection is None)
+    
     def get_report_by_id(self, report_id: str) -> Optional[Dict]:
         """Get a single report by ID (supports both MongoDB ObjectId and report_id)"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['emergency_reports']
@@ -154,52 +206,7 @@ class SOSReportMongoDBService:
                 report = collection.find_one({'report_id': report_id})
             
             if report:
-                if '_id' in report:
-                    report['id'] = str(report['_id'])
-                    del report['_id']
-                
-                # Format dates
-                if 'created_at' in report and isinstance(report['created_at'], datetime):
-                    report['created_at'] = report['created_at'].isoformat()
-                
-                if 'updated_at' in report and isinstance(report['updated_at'], datetime):
-                    report['updated_at'] = report['updated_at'].isoformat()
-                
-                # Fix image URLs - handle both Cloudinary and local storage
-                if 'media' in report and report['media']:
-                    for media_item in report['media']:
-                        # Check if it's already a Cloudinary URL
-                        if 'url' in media_item and media_item['url'] and media_item['url'].startswith('http'):
-                            # Cloudinary URL - use as is
-                            media_item['file_url'] = media_item['url']
-                            media_item['image_url'] = media_item['url']
-                            if 'file' not in media_item:
-                                media_item['file'] = media_item['url']
-                        elif 'file' in media_item and media_item['file']:
-                            # Local file - convert to full URL
-                            file_path = media_item['file']
-                            if not file_path.startswith('http'):
-                                full_url = f"http://localhost:8000/media/{file_path}"
-                                media_item['file'] = full_url
-                                # Also set the URL fields that frontend expects
-                                media_item['file_url'] = full_url
-                                media_item['image_url'] = full_url
-                                if 'url' not in media_item:
-                                    media_item['url'] = full_url
-                
-                # Also fix images array if it exists
-                if 'images' in report and report['images']:
-                    fixed_images = []
-                    for img_path in report['images']:
-                        if img_path and not img_path.startswith('http'):
-                            fixed_images.append(f"http://localhost:8000/media/{img_path}")
-                        else:
-                            fixed_images.append(img_path)
-                    report['images'] = fixed_images
-                
-                # Calculate vote counts
-                report['vote_counts'] = self._calculate_vote_counts(report)
-                report['vote_percentages'] = self._calculate_vote_percentages(report['vote_counts'])
+                self.postprocessor.process(report)
             
             return report
         except Exception as e:
@@ -209,7 +216,7 @@ class SOSReportMongoDBService:
     def create_report(self, report_data: Dict) -> Optional[Dict]:
         """Create a new report in MongoDB"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['emergency_reports']
@@ -223,6 +230,9 @@ class SOSReportMongoDBService:
             result = collection.insert_one(report_data)
             
             if result.inserted_id:
+                self.counters.record_created(report_data)
+                self.invalidate_dashboard_stats(report_data.get('user_id'))
+                
                 # Return the created report
                 report_data['id'] = str(result.inserted_id)
                 report_data['created_at'] = now.isoformat()
@@ -241,7 +251,7 @@ class SOSReportMongoDBService:
     def update_report(self, report_id: str, update_data: Dict) -> Optional[Dict]:
         """Update a report in MongoDB (supports both MongoDB ObjectId and report_id)"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['emergency_reports']
@@ -259,13 +269,18 @@ class SOSReportMongoDBService:
                 # If not a valid ObjectId, try as report_id
                 query = {'report_id': report_id}
             
-            # Update the report
-            result = collection.update_one(
+            # Update the report, fetching the pre-update counted fields and owner in the same round trip
+            report = collection.find_one_and_update(
                 query,
-                {'$set': update_data}
+                {'$set': update_data},
+                projection=COUNTER_PROJECTION,
+                return_document=ReturnDocument.BEFORE
             )
             
-            if result.modified_count > 0:
+            if report:
+                self.counters.record_changed(report, update_data)
+                self.invalidate_dashboard_stats(report.get('user_id'))
+                
                 # Return the updated report
                 return self.get_report_by_id(report_id)
             
@@ -274,10 +289,86 @@ class SOSReportMongoDBService:
             print(f"Error updating report in MongoDB: {e}")
             return None
     
+    def attach_uploaded_media(self, report_id: str, uploaded: List[Dict]) -> bool:
+        """Replace pending media placeholders (matched by upload_id) with their uploaded entries in one update"""
+        try:
+            if self.db is None or not uploaded:
+                return False
+            
+            collection = self.db['emergency_reports']
+            
+            from bson import ObjectId
+            try:
+                query = {'_id': ObjectId(report_id)}
+            except:
+                query = {'report_id': report_id}
+            
+            update = {'$set': {'updated_at': datetime.utcnow()}}
+            array_filters = []
+            for index, (media_info, _) in enumerate(uploaded):
+                update['$set'][f'media.$[m{index}]'] = media_info
+                array_filters.append({f'm{index}.upload_id': media_info['upload_id']})
+            image_urls = [image_url for _, image_url in uploaded if image_url]
+            if image_urls:
+                update['$push'] = {'images': {'$each': image_urls}}
+            
+            result = collection.update_one(query, update, array_filters=array_filters)
+            return result.matched_count > 0
+        except Exception as e:
+            print(f"Error attaching uploaded media in MongoDB: {e}")
+            return False
+
+    def fail_pending_media(self, report_id: str, upload_ids: List[str]) -> bool:
+        """Mark the given media placeholders as failed when their upload was given up on"""
+        try:
+            if self.db is None or not upload_ids:
+                return False
+
+            collection = self.db['emergency_reports']
+
+            from bson import ObjectId
+            try:
+                query = {'_id': ObjectId(report_id)}
+            except:
+                query = {'report_id': report_id}
+
+            now = datetime.utcnow()
+            result = collection.update_one(
+                query,
+                {'$set': {'media.$[m].upload_status': 'failed', 'updated_at': now}},
+                array_filters=[{'m.upload_id': {'$in': upload_ids}, 'm.upload_status': 'pending'}]
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            print(f"Error failing pending media in MongoDB: {e}")
+            return False
+
+    def expire_pending_media(self, spooled_before: datetime, keep_upload_ids: List[str] = ()) -> int:
+        """Mark placeholders still pending since before a cutoff as failed (their upload job was lost)
+
+        keep_upload_ids: placeholders whose upload job is still queued or running.
+        """
+        try:
+            if self.db is None:
+                return 0
+
+            collection = self.db['emergency_reports']
+            # Only placeholders carry spooled_at; uploaded entries replace them whole
+            result = collection.update_many(
+                {'media.upload_status': 'pending', 'media.spooled_at': {'$lt': spooled_before}},
+                {'$set': {'media.$[m].upload_status': 'failed', 'updated_at': datetime.utcnow()}},
+                array_filters=[{'m.upload_status': 'pending', 'm.spooled_at': {'$lt': spooled_before},
+                                'm.upload_id': {'$nin': list(keep_upload_ids)}}]
+            )
+            return result.modified_count
+        except Exception as e:
+            print(f"Error expiring pending media in MongoDB: {e}")
+            return 0
+
     def delete_report(self, report_id: str) -> bool:
         """Delete a report from MongoDB (supports both MongoDB ObjectId and report_id)"""
         try:
-            if not self.db:
+            if self.db is None:
                 return False
             
             collection = self.db['emergency_reports']
@@ -287,95 +378,88 @@ class SOSReportMongoDBService:
             try:
                 # Try as MongoDB ObjectId
                 object_id = ObjectId(report_id)
-                result = collection.delete_one({'_id': object_id})
+                query = {'_id': object_id}
             except:
                 # If not a valid ObjectId, try as report_id
-                result = collection.delete_one({'report_id': report_id})
+                query = {'report_id': report_id}
             
-            return result.deleted_count > 0
+            report = collection.find_one_and_delete(query, projection=COUNTER_PROJECTION)
+            if not report:
+                return False
+            
+            self.counters.record_deleted(report)
+            if report.get('report_id'):
+                self.db[VOTES_COLLECTION].delete_many({'report_id': report['report_id']})
+            self.invalidate_dashboard_stats(report.get('user_id'))
+            return True
         except Exception as e:
             print(f"Error deleting report from MongoDB: {e}")
             return False
     
-    def get_nearby_reports(self, lat: float, lng: float, radius_km: float = 10) -> List[Dict]:
-        """Get reports within a radius using geospatial query"""
+    def get_nearby_reports(self, lat: float, lng: float, radius_km: float = 10, limit: int = 50, skip: int = 0) -> List[Dict]:
+        """Get active reports within a radius, nearest first (served by the geo_location 2dsphere index)"""
         try:
-            if not self.db:
+            if self.db is None:
                 return []
             
             collection = self.db['emergency_reports']
             
-            # MongoDB geospatial query
-            query = {
-                'location': {
-                    '$geoWithin': {
-                        '$centerSphere': [
-                            [lng, lat],  # Note: MongoDB uses [longitude, latitude]
-                            radius_km / 6378.1  # Convert km to radians (Earth radius in km)
-                        ]
+            max_limit = getattr(settings, 'NEARBY_REPORTS_MAX_LIMIT', 100)
+            max_radius_km = getattr(settings, 'NEARBY_REPORTS_MAX_RADIUS_KM', 100)
+            limit = max(1, min(int(limit), max_limit))
+            skip = max(0, min(int(skip), getattr(settings, 'NEARBY_REPORTS_MAX_OFFSET', 1000)))
+            radius_km = max(0.0, min(float(radius_km), max_radius_km))
+            
+            # $geoNear must be the first stage; it sorts by distance and applies the status filter in the index scan
+            pipeline = [
+                {
+                    '$geoNear': {
+                        'near': {'type': 'Point', 'coordinates': [lng, lat]},  # GeoJSON uses [longitude, latitude]
+                        'key': 'geo_location',
+                        'distanceField': 'distance_m',
+                        'maxDistance': radius_km * 1000,
+                        'spherical': True,
+                        'query': {'status': {'$in': ['PENDING', 'VERIFIED', 'IN_PROGRESS']}}
                     }
                 },
-                'status': {'$in': ['PENDING', 'VERIFIED', 'IN_PROGRESS']}
-            }
+                {'$skip': skip},
+                {'$limit': limit}
+            ]
             
-            cursor = collection.find(query).sort('created_at', -1)
-            reports = list(cursor)
+            reports = list(collection.aggregate(pipeline))
             
-            # Convert ObjectId to string and format dates
+            self.postprocessor.process_many(reports)
             for report in reports:
-                if '_id' in report:
-                    report['id'] = str(report['_id'])
-                    del report['_id']
-                
-                if 'created_at' in report and isinstance(report['created_at'], datetime):
-                    report['created_at'] = report['created_at'].isoformat()
-                
-                if 'updated_at' in report and isinstance(report['updated_at'], datetime):
-                    report['updated_at'] = report['updated_at'].isoformat()
-                
-                # Fix image URLs - handle both Cloudinary and local storage
-                if 'media' in report and report['media']:
-                    for media_item in report['media']:
-                        # Check if it's already a Cloudinary URL
-                        if 'url' in media_item and media_item['url'] and media_item['url'].startswith('http'):
-                            # Cloudinary URL - use as is
-                            media_item['file_url'] = media_item['url']
-                            media_item['image_url'] = media_item['url']
-                            if 'file' not in media_item:
-                                media_item['file'] = media_item['url']
-                        elif 'file' in media_item and media_item['file']:
-                            # Local file - convert to full URL
-                            file_path = media_item['file']
-                            if not file_path.startswith('http'):
-                                full_url = f"http://localhost:8000/media/{file_path}"
-                                media_item['file'] = full_url
-                                # Also set the URL fields that frontend expects
-                                media_item['file_url'] = full_url
-                                media_item['image_url'] = full_url
-                                if 'url' not in media_item:
-                                    media_item['url'] = full_url
-                
-                # Also fix images array if it exists
-                if 'images' in report and report['images']:
-                    fixed_images = []
-                    for img_path in report['images']:
-                        if img_path and not img_path.startswith('http'):
-                            fixed_images.append(f"http://localhost:8000/media/{img_path}")
-                        else:
-                            fixed_images.append(img_path)
-                    report['images'] = fixed_images
+                if 'distance_m' in report:
+                    report['distance_km'] = round(report.pop('distance_m') / 1000, 3)
             
             return reports
         except Exception as e:
             print(f"Error getting nearby reports from MongoDB: {e}")
             return []
     
+    def _dashboard_stats_cache_key(self, user_id=None) -> str:
+        """Cache key for the dashboard stats of one user, or of all reports"""
+        return f"sos_dashboard_stats:{user_id if user_id else 'all'}"
+    
+    def invalidate_dashboard_stats(self, user_id=None):
+        """Drop cached dashboard stats for all reports and for the report owner"""
+        keys = [self._dashboard_stats_cache_key()]
+        if user_id:
+            keys.append(self._dashboard_stats_cache_key(user_id))
+        cache.delete_many(keys)
+    
     def get_dashboard_stats(self, user_id: Optional[int] = None) -> Dict:
-        """Get dashboard statistics from MongoDB"""
+        """Get dashboard statistics from MongoDB in a single $facet round trip, cached per user"""
         try:
-            if not self.db:
+            if self.db is None:
                 return {}
             
+            cache_key = self._dashboard_stats_cache_key(user_id)
+            stats = cache.get(cache_key)
+            if stats is not None:
+                return stats
+            
             collection = self.db['emergency_reports']
             
             # Build query
@@ -383,38 +467,33 @@ class SOSReportMongoDBService:
             if user_id:
                 query['user_id'] = user_id
             
-            # Get counts
-            total_reports = collection.count_documents(query)
-            pending_reports = collection.count_documents({**query, 'status': 'PENDING'})
-            active_reports = collection.count_documents({**query, 'status': {'$in': ['VERIFIED', 'IN_PROGRESS']}})
-            resolved_reports = collection.count_documents({**query, 'status': 'RESOLVED'})
-            critical_reports = collection.count_documents({**query, 'priority': 'CRITICAL'})
-            
-            # Get disaster type breakdown
-            disaster_pipeline = [
+            # Status buckets give the total and the pending/active/resolved counts
+            pipeline = [
                 {'$match': query},
-                {'$group': {'_id': '$disaster_type', 'count': {'$sum': 1}}}
+                {'$facet': {
+                    'by_status': [{'$group': {'_id': '$status', 'count': {'$sum': 1}}}],
+                    'by_priority': [{'$group': {'_id': '$priority', 'count': {'$sum': 1}}}],
+                    'by_disaster_type': [{'$group': {'_id': '$disaster_type', 'count': {'$sum': 1}}}]
+                }}
             ]
-            disaster_breakdown = list(collection.aggregate(disaster_pipeline))
-            by_disaster_type = {item['_id']: item['count'] for item in disaster_breakdown if item['_id']}
-            
-            # Get priority breakdown
-            priority_pipeline = [
-                {'$match': query},
-                {'$group': {'_id': '$priority', 'count': {'$sum': 1}}}
-            ]
-            priority_breakdown = list(collection.aggregate(priority_pipeline))
-            by_priority = {item['_id']: item['count'] for item in priority_breakdown if item['_id']}
-            
-            return {
-                'total_reports': total_reports,
-                'pending_reports': pending_reports,
-                'active_reports': active_reports,
-                'resolved_reports': resolved_reports,
-                'critical_reports': critical_reports,
+            facets = next(collection.aggregate(pipeline), {})
+            
+            by_status = {item['_id']: item['count'] for item in facets.get('by_status', [])}
+            by_priority = {item['_id']: item['count'] for item in facets.get('by_priority', []) if item['_id']}
+            by_disaster_type = {item['_id']: item['count'] for item in facets.get('by_disaster_type', []) if item['_id']}
+            
+            stats = {
+                'total_reports': sum(by_status.values()),
+                'pending_reports': by_status.get('PENDING', 0),
+                'active_reports': by_status.get('VERIFIED', 0) + by_status.get('IN_PROGRESS', 0),
+                'resolved_reports': by_status.get('RESOLVED', 0),
+                'critical_reports': by_priority.get('CRITICAL', 0),
                 'by_disaster_type': by_disaster_type,
                 'by_priority': by_priority
             }
+            
+            cache.set(cache_key, stats, getattr(settings, 'DASHBOARD_STATS_CACHE_TTL', 30))
+            return stats
         except Exception as e:
             print(f"Error getting dashboard stats from MongoDB: {e}")
             return {}
@@ -422,7 +501,7 @@ class SOSReportMongoDBService:
     def add_comment(self, report_id: str, comment_data: Dict) -> Optional[Dict]:
         """Add a comment/update to a report (supports both MongoDB ObjectId and report_id)"""
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
             collection = self.db['emergency_reports']
@@ -459,7 +538,7 @@ class SOSReportMongoDBService:
     def delete_comment(self, report_id: str, comment_index: int) -> bool:
         """Delete a comment from a report"""
         try:
-            if not self.db:
+            if self.db is None:
                 return False
             
             collection = self.db['emergency_reports']
@@ -486,7 +565,7 @@ class SOSReportMongoDBService:
     def delete_comment_by_id(self, report_id: str, comment_id: str) -> bool:
         """Delete a comment from a report by comment ID (supports both MongoDB ObjectId and report_id)"""
         try:
-            if not self.db:
+            if self.db is None:
                 return False
             
             collection = self.db['emergency_reports']
@@ -540,174 +619,157 @@ class SOSReportMongoDBService:
             return False
     
     def add_vote(self, report_id: str, vote_data: Dict) -> Optional[Dict]:
-        """Add or update a vote for a report with automatic status change logic"""
+        """Record (or change) a user's vote and apply the automatic status rules atomically
+        
+        The vote is upserted into report_votes (unique per report/user); the report's vote_counts
+        and status are then updated by a single pipeline update, so concurrent votes never
+        overwrite each other.
+        """
         try:
-            if not self.db:
+            if self.db is None:
                 return None
             
-            collection = self.db['emergency_reports']
-            
-            # Get the report first
-            report = collection.find_one({'report_id': report_id})
-            if not report:
+            vote_key = VOTE_COUNT_KEYS.get(vote_data.get('vote_type'))
+            user_id = vote_data.get('user_id')
+            if not vote_key or user_id is None:
                 return None
             
-            # Add timestamp to vote
+            now = datetime.utcnow()
+            # Marks a status change made by this call; timestamps can collide between concurrent votes
+            op = uuid.uuid4().hex
             vote_data['created_at'] = timezone.now().isoformat()
             
-            # Check if this is the report owner voting
-            is_owner_vote = report.get('user_id') == vote_data.get('user_id')
-            
-            # Initialize votes array if it doesn't exist
-            if 'votes' not in report:
-                report['votes'] = []
-            
-            # Check if user already voted (one vote per user)
-            user_id = vote_data.get('user_id')
-            existing_vote_index = None
-            
-            for i, vote in enumerate(report.get('votes', [])):
-                if vote.get('user_id') == user_id:
-                    existing_vote_index = i
-                    break
+            # Upsert the vote and learn what (if anything) it replaced
+            previous = self.db[VOTES_COLLECTION].find_one_and_update(
+                {'report_id': report_id, 'user_id': user_id},
+                {
+                    '$set': {'vote_type': vote_data['vote_type'], 'username': vote_data.get('username'), 'updated_at': now},
+                    '$setOnInsert': {'created_at': now}
+                },
+                upsert=True,
+                projection={'vote_type': 1},
+                return_document=ReturnDocument.BEFORE
+            )
+            previous_key = VOTE_COUNT_KEYS.get(previous.get('vote_type')) if previous else None
             
-            # Update or add vote
-            if existing_vote_index is not None:
-                # Update existing vote
-                report['votes'][existing_vote_index] = vote_data
-            else:
-                # Add new vote
-                report['votes'].append(vote_data)
+            increments = {key: 0 for key in VOTE_COUNT_KEYS.values()}
+            increments['total'] = 0 if previous else 1
+            if previous_key != vote_key:
+                increments[vote_key] += 1
+                if previous_key:
+                    increments[previous_key] -= 1
             
-            # Update the report with new votes
-            result = collection.update_one(
+            report = self.db['emergency_reports'].find_one_and_update(
                 {'report_id': report_id},
-                {
-                    '$set': {
-                        'votes': report['votes'],
-                        'user_vote': vote_data,  # Keep for backward compatibility
-                        'updated_at': datetime.utcnow()
-                    }
-                }
+                self._vote_update_pipeline(increments, vote_data, now, op),
+                projection={**COUNTER_PROJECTION, 'vote_counts': 1, 'last_status_change': 1},
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count > 0:
-                # Apply automatic status change logic
-                self._apply_status_change_logic(report_id, vote_data, is_owner_vote, report['votes'])
-                return vote_data
+            if not report:
+                # Unknown report: undo the vote we just recorded
+                if previous:
+                    self.db[VOTES_COLLECTION].update_one(
+                        {'report_id': report_id, 'user_id': user_id},
+                        {'$set': {'vote_type': previous['vote_type']}}
+                    )
+                else:
+                    self.db[VOTES_COLLECTION].delete_one({'report_id': report_id, 'user_id': user_id})
+                return None
             
-            return None
+            status_change = report.get('last_status_change') or {}
+            if status_change.get('op') == op:
+                self.counters.record_changed({**report, 'status': status_change['from']}, {'status': status_change['to']})
+                print(f"Status automatically changed to {status_change['to']} ({status_change['reason']}) for report {report_id}")
+            
+            self.invalidate_dashboard_stats(report.get('user_id'))
+            vote_data['vote_counts'] = report.get('vote_counts', {})
+            return vote_data
         except Exception as e:
             print(f"Error adding vote to report in MongoDB: {e}")
             return None
     
-    def _apply_status_change_logic(self, report_id: str, vote_data: Dict, is_owner_vote: bool, all_votes: list):
-        """Apply automatic status change logic based on voting rules"""
-        try:
-            if not self.db:
-                return
-            
-            collection = self.db['emergency_reports']
-            
-            # Rule 1: If report owner votes "RESOLVED", automatically change status to RESOLVED
-            if is_owner_vote and vote_data.get('vote_type') == 'RESOLVED':
-                collection.update_one(
-                    {'report_id': report_id},
-                    {'$set': {'status': 'RESOLVED', 'updated_at': datetime.utcnow()}}
-                )
-                print(f"Status automatically changed to RESOLVED by report owner for report {report_id}")
-                return
-            
-            # Rule 2: For community votes, implement 60% criteria
-            if not is_owner_vote and len(all_votes) >= 3:  # Need at least 3 votes for 60% rule
-                # Calculate vote counts
-                vote_counts = {'STILL_THERE': 0, 'RESOLVED': 0, 'FAKE_REPORT': 0}
-                total_votes = len(all_votes)
-                
-                for vote in all_votes:
-                    vote_type = vote.get('vote_type')
-                    if vote_type in vote_counts:
-                        vote_counts[vote_type] += 1
-                
-                # Check 60% criteria
-                resolved_percentage = (vote_counts['RESOLVED'] / total_votes) * 100
-                fake_percentage = (vote_counts['FAKE_REPORT'] / total_votes) * 100
-                
-                if resolved_percentage >= 60:
-                    collection.update_one(
-                        {'report_id': report_id},
-                        {'$set': {'status': 'RESOLVED', 'updated_at': datetime.utcnow()}}
-                    )
-                    print(f"Status automatically changed to RESOLVED by community vote (60%+ resolved) for report {report_id}")
-                elif fake_percentage >= 60:
-                    collection.update_one(
-                        {'report_id': report_id},
-                        {'$set': {'status': 'REJECTED', 'updated_at': datetime.utcnow()}}
-                    )
-                    print(f"Status automatically changed to REJECTED by community vote (60%+ fake) for report {report_id}")
-            
-        except Exception as e:
-            print(f"Error applying status change logic: {e}")
-    
-    def _calculate_vote_counts(self, report: Dict) -> Dict:
-        """Calculate vote counts for a report"""
-        try:
-            vote_counts = {
-                'still_there': 0,
-                'resolved': 0,
-                'fake_report': 0,
-                'total': 0
-            }
-            
-            # Check if report has votes array (new system)
-            if 'votes' in report and report['votes']:
-                for vote in report['votes']:
-                    vote_type = vote.get('vote_type', '')
-                    if vote_type == 'STILL_THERE':
-                        vote_counts['still_there'] += 1
-                    elif vote_type == 'RESOLVED':
-                        vote_counts['resolved'] += 1
-                    elif vote_type == 'FAKE_REPORT':
-                        vote_counts['fake_report'] += 1
-                
-                vote_counts['total'] = len(report['votes'])
-            # Fallback to old system for backward compatibility
-            elif 'user_vote' in report and report['user_vote']:
-                vote_type = report['user_vote'].get('vote_type', '')
-                if vote_type == 'STILL_THERE':
-                    vote_counts['still_there'] = 1
-                elif vote_type == 'RESOLVED':
-                    vote_counts['resolved'] = 1
-                elif vote_type == 'FAKE_REPORT':
-                    vote_counts['fake_report'] = 1
-                
-                vote_counts['total'] = 1
-            
-            return vote_counts
-        except Exception as e:
-            print(f"Error calculating vote counts: {e}")
-            return {'still_there': 0, 'resolved': 0, 'fake_report': 0, 'total': 0}
+    def _vote_update_pipeline(self, increments: Dict, vote_data: Dict, now: datetime, op: str) -> List[Dict]:
+        """Pipeline update applying vote count deltas and the voting status rules in one write
+        
+        Rule 1: the report owner voting RESOLVED resolves the report.
+        Rule 2: with at least 3 community votes, 60%+ RESOLVED resolves it and 60%+ FAKE_REPORT rejects it.
+        
+        A report without vote_counts starts from its legacy votes array, leaving out the voter's own
+        legacy vote (this call counts it); migrate_report_votes moves the other legacy voters to
+        report_votes so their later changes are not counted twice.
+        """
+        other_legacy_votes = {'$filter': {
+            'input': {'$ifNull': ['$votes', []]},
+            'cond': {'$ne': [{'$toString': '$$this.user_id'}, str(vote_data['user_id'])]}
+        }}
+        counts = {
+            key: {'$add': [{'$ifNull': [f'$vote_counts.{key}', 0]}, delta]}
+            for key, delta in increments.items()
+        }
+        is_owner_vote = {'$eq': [{'$toString': '$user_id'}, str(vote_data['user_id'])]}
+        is_community_vote = {'$ne': [{'$toString': '$user_id'}, str(vote_data['user_id'])]}
+        next_status = {'$switch': {
+            'branches': [
+                {
+                    'case': {'$and': [is_owner_vote, {'$eq': [vote_data['vote_type'], 'RESOLVED']}]},
+                    'then': {'status': 'RESOLVED', 'reason': 'owner vote'}
+                },
+                {
+                    'case': {'$and': [
+                        is_community_vote,
+                        {'$gte': ['$vote_counts.total', 3]},
+                        {'$gte': [{'$multiply': ['$vote_counts.resolved', 10]}, {'$multiply': ['$vote_counts.total', 6]}]}
+                    ]},
+                    'then': {'status': 'RESOLVED', 'reason': 'community vote (60%+ resolved)'}
+                },
+                {
+                    'case': {'$and': [
+                        is_community_vote,
+                        {'$gte': ['$vote_counts.total', 3]},
+                        {'$gte': [{'$multiply': ['$vote_counts.fake_report', 10]}, {'$multiply': ['$vote_counts.total', 6]}]}
+                    ]},
+                    'then': {'status': 'REJECTED', 'reason': 'community vote (60%+ fake)'}
+                }
+            ],
+            'default': {'status': '$status'}
+        }}
+        
+        def percentage(key):
+            return {'$cond': [
+                {'$gt': ['$vote_counts.total', 0]},
+                {'$round': [{'$multiply': [{'$divide': [f'$vote_counts.{key}', '$vote_counts.total']}, 100]}, 1]},
+                0
+            ]}
+        
+        return [
+            {'$set': {'vote_counts': _stored_vote_counts(other_legacy_votes)}},
+            {'$set': {
+                'vote_counts': counts,
+                'user_vote': {'$literal': vote_data},  # Keep for backward compatibility
+                'updated_at': now
+            }},
+            # Stamp a status change with this call's op token so the caller can detect it
+            {'$set': {'last_status_change': {'$let': {
+                'vars': {'next': next_status},
+                'in': {'$cond': [
+                    {'$ne': ['$$next.status', '$status']},
+                    {'from': '$status', 'to': '$$next.status', 'reason': '$$next.reason', 'at': now, 'op': op},
+                    '$last_status_change'
+                ]}
+            }}}},
+            {'$set': {'status': {'$cond': [
+                {'$eq': ['$last_status_change.op', op]},
+                '$last_status_change.to',
+                '$status'
+            ]}}},
+            {'$set': {'vote_percentages': {key: percentage(key) for key in VOTE_COUNT_KEYS.values()}}}
+        ]
     
-    def _calculate_vote_percentages(self, vote_counts: Dict) -> Dict:
-        """Calculate vote percentages from vote counts"""
-        try:
-            total = vote_counts.get('total', 0)
-            if total == 0:
-                return {'still_there': 0, 'resolved': 0, 'fake_report': 0}
-            
-            return {
-                'still_there': round((vote_counts.get('still_there', 0) / total) * 100, 1),
-                'resolved': round((vote_counts.get('resolved', 0) / total) * 100, 1),
-                'fake_report': round((vote_counts.get('fake_report', 0) / total) * 100, 1)
-            }
-        except Exception as e:
-            print(f"Error calculating vote percentages: {e}")
-            return {'still_there': 0, 'resolved': 0, 'fake_report': 0}
-
     def close(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
+        """Release this service's handles; the shared client stays open for the other services"""
+        self.client = None
+        self.db = None
 
 # Global instance
 mongodb_service = SOSReportMongoDBService()
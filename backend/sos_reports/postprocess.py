@@ -0,0 +1,111 @@
+"""
+Single-pass post-processing of emergency_reports documents for the API
+Shared by the list, detail and nearby queries: renames _id, stringifies
+ObjectIds and datetimes, absolutises media URLs and fills vote totals.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from bson import ObjectId
+from django.conf import settings
+
+# Array fields whose items are flat dicts; ObjectIds/datetimes are only looked for one level down
+FLAT_ITEM_FIELDS = ('media', 'updates', 'votes')
+VOTE_TYPES = (('STILL_THERE', 'still_there'), ('RESOLVED', 'resolved'), ('FAKE_REPORT', 'fake_report'))
+
+
+def count_votes(report: Dict) -> Dict:
+    """Vote totals from the stored vote_counts, falling back to the legacy votes/user_vote fields"""
+    stored = report.get('vote_counts')
+    if stored and 'total' in stored:
+        return stored
+
+    vote_counts = {'still_there': 0, 'resolved': 0, 'fake_report': 0, 'total': 0}
+    votes = report.get('votes')
+    if not votes and report.get('user_vote'):
+        votes = [report['user_vote']]
+    for vote in votes or []:
+        for vote_type, key in VOTE_TYPES:
+            if vote.get('vote_type') == vote_type:
+                vote_counts[key] += 1
+                break
+    vote_counts['total'] = len(votes or [])
+    return vote_counts
+
+
+def vote_percentages(vote_counts: Dict) -> Dict:
+    """Vote percentages from vote totals"""
+    total = vote_counts.get('total', 0)
+    if not total:
+        return {'still_there': 0, 'resolved': 0, 'fake_report': 0}
+    return {key: round((vote_counts.get(key, 0) / total) * 100, 1) for _, key in VOTE_TYPES}
+
+
+class ReportPostProcessor:
+    """Formats report documents in place in one pass over their top-level fields"""
+
+    def __init__(self, media_base_url: Optional[str] = None, media_url: Optional[str] = None):
+        self.media_base_url = (media_base_url or settings.MEDIA_BASE_URL).rstrip('/') + '/'
+        # Stored paths sometimes already carry the MEDIA_URL prefix ('/media/reports/x.jpg')
+        self.media_prefix = (media_url or settings.MEDIA_URL).strip('/') + '/'
+
+    def media_url(self, path: str) -> str:
+        """Absolute URL for a stored media path; http(s) URLs are returned unchanged"""
+        if not path or path.startswith('http'):
+            return path
+        path = path.lstrip('/')
+        if path.startswith(self.media_prefix):
+            path = path[len(self.media_prefix):]
+        return self.media_base_url + path
+
+    def _fix_media_item(self, media_item: Dict):
+        url = media_item.get('url')
+        if url and url.startswith('http'):
+            # Cloudinary URL - use as is
+            media_item['file_url'] = url
+            media_item['image_url'] = url
+            media_item.setdefault('file', url)
+        elif media_item.get('file') and not media_item['file'].startswith('http'):
+            full_url = self.media_url(media_item['file'])
+            media_item['file'] = full_url
+            media_item['file_url'] = full_url
+            media_item['image_url'] = full_url
+            media_item.setdefault('url', full_url)
+
+    def process(self, report: Dict, with_votes: bool = True) -> Dict:
+        """Format one report in place; with_votes=False leaves vote fields as fetched (projected reads)"""
+        if '_id' in report:
+            report['id'] = str(report.pop('_id'))
+
+        for key, value in report.items():
+            if isinstance(value, datetime):
+                report[key] = value.isoformat()
+            elif isinstance(value, ObjectId):
+                report[key] = str(value)
+            elif key in FLAT_ITEM_FIELDS and value:
+                for item in value:
+                    if isinstance(item, dict):
+                        for item_key, item_value in item.items():
+                            if isinstance(item_value, ObjectId):
+                                item[item_key] = str(item_value)
+                            elif isinstance(item_value, datetime):
+                                item[item_key] = item_value.isoformat()
+
+        if report.get('media'):
+            for media_item in report['media']:
+                self._fix_media_item(media_item)
+
+        if report.get('images'):
+            report['images'] = [self.media_url(path) for path in report['images']]
+
+        if with_votes:
+            report['vote_counts'] = count_votes(report)
+            report['vote_percentages'] = vote_percentages(report['vote_counts'])
+
+        return report
+
+    def process_many(self, reports: List[Dict], with_votes: bool = True) -> List[Dict]:
+        """Format a page of reports in place"""
+        process = self.process
+        for report in reports:
+            process(report, with_votes)
+        return reports
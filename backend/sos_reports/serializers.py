@@ -106,3 +106,36 @@ class ReportVoteSerializer(serializers.ModelSerializer):
                 'username': obj.user.username
             }
         return None
+
+class ReportSummarySerializer(serializers.Serializer):
+    """Lightweight shape of a MongoDB report document for the map/list views (?view=summary)"""
+    id = serializers.CharField()
+    report_id = serializers.CharField(required=False, allow_null=True)
+    emergency_type = serializers.CharField(required=False, allow_null=True)
+    disaster_type = serializers.CharField(required=False, allow_null=True)
+    priority = serializers.CharField(required=False, allow_null=True)
+    status = serializers.CharField(required=False, allow_null=True)
+    latitude = serializers.FloatField(required=False, allow_null=True)
+    longitude = serializers.FloatField(required=False, allow_null=True)
+    created_at = serializers.CharField(required=False, allow_null=True)
+    thumbnail = serializers.SerializerMethodField()
+    vote_counts = serializers.DictField(required=False)
+    
+    def get_thumbnail(self, obj):
+        media = obj.get('media') or []
+        if media:
+            media_item = media[0]
+            if media_item.get('public_id'):
+                try:
+                    from media_storage import media_storage
+                    url = media_storage.transform_url(
+                        media_item['public_id'],
+                        {'width': 320, 'height': 240, 'crop': 'fill', 'secure': True}
+                    )
+                    if url:
+                        return url
+                except Exception:
+                    pass
+            return media_item.get('url') or media_item.get('file')
+        images = obj.get('images') or []
+        return images[0] if images else None
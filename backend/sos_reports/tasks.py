@@ -0,0 +1,179 @@
+"""
+Background AI analysis of reports, run by the ai_services job queue
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from ai_services.job_queue import analysis_job_queue, register_handler
+from ai_services.registry import AIServiceUnavailable, get_verification_service
+from .media_uploads import discard_spooled, sweep_spool_dir, upload_spooled
+from .mongodb_service import mongodb_service
+
+ANALYZE_REPORT_JOB = 'sos_reports.analyze_report'
+UPLOAD_MEDIA_JOB = 'sos_reports.upload_media'
+
+_next_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def triage_from_analysis(analysis: dict) -> dict:
+    """Priority/status overrides derived from an AI analysis of a new report"""
+    update_data = {}
+    
+    # Enhanced priority determination based on AI analysis
+    suggested_priority = analysis.get('suggested_priority', 'MEDIUM')
+    confidence = analysis.get('confidence', 0.0)
+    fraud_score = analysis.get('fraud_score', 0.0)
+    
+    # Override priority based on confidence and fraud score
+    if fraud_score > 0.7 or confidence < 0.3:
+        update_data['priority'] = 'LOW'
+    elif confidence > 0.8 and fraud_score < 0.2:
+        update_data['priority'] = 'HIGH'
+    elif confidence > 0.6 and fraud_score < 0.4:
+        update_data['priority'] = 'MEDIUM'
+    else:
+        update_data['priority'] = suggested_priority
+    
+    # Enhanced status determination
+    if analysis.get('is_fraud', False) or fraud_score > 0.6:
+        update_data['status'] = 'REJECTED'
+    elif analysis.get('suggested_status'):
+        update_data['status'] = analysis.get('suggested_status', 'PENDING')
+    elif confidence > 0.8 and fraud_score < 0.2:
+        update_data['status'] = 'VERIFIED'
+    
+    return update_data
+
+
+def analyze_report(payload: dict) -> dict:
+    """Job handler: run the AI analysis for a report and store the results on it
+    
+    payload: {'report_id', 'description', 'image_paths', 'apply_triage'}
+    Raises on failure so the queue retries the job.
+    """
+    ai_service = get_verification_service()
+    if ai_service is None:
+        raise AIServiceUnavailable('AI verification service is not available')
+    # Job workers are plain threads, so each job gets its own event loop for the concurrent analysis
+    analysis = asyncio.run(ai_service.analyze_report_async(
+        text_description=payload.get('description', ''),
+        image_paths=payload.get('image_paths', [])
+    ))
+    
+    # Update report with AI analysis results
+    update_data = {
+        'ai_verified': analysis.get('is_emergency', False),
+        'ai_confidence': analysis.get('confidence', 0.0),
+        'ai_fraud_score': analysis.get('fraud_score', 0.0),
+        'ai_analysis_data': analysis,
+        'updated_at': timezone.now().isoformat()
+    }
+    if payload.get('apply_triage', True):
+        update_data.update(triage_from_analysis(analysis))
+    
+    if not mongodb_service.update_report(payload['report_id'], update_data):
+        raise RuntimeError(f"Could not store AI analysis for report {payload['report_id']}")
+    
+    print(f"🤖 AI analysis completed for report {payload['report_id']}")
+    return {key: value for key, value in update_data.items() if key != 'ai_analysis_data'}
+
+
+def enqueue_report_analysis(report_id: str, description: str, image_paths: list, apply_triage: bool = True) -> str:
+    """Queue AI analysis for a report and return the job id"""
+    return analysis_job_queue.enqueue(ANALYZE_REPORT_JOB, {
+        'report_id': report_id,
+        'description': description,
+        'image_paths': image_paths,
+        'apply_triage': apply_triage,
+    })
+
+
+def upload_report_media(payload: dict) -> dict:
+    """Job handler: upload a report's spooled attachments, patch their URLs in, then queue its analysis
+    
+    payload: {'report_id', 'disaster_type', 'description', 'spooled'}
+    Spool files are only removed once the report is patched, so a retried job can upload them again.
+    """
+    sweep_stale_uploads()
+    spooled = payload.get('spooled', [])
+    uploaded = upload_spooled(spooled, payload['report_id'], payload.get('disaster_type'))
+    if not mongodb_service.attach_uploaded_media(payload['report_id'], uploaded):
+        raise RuntimeError(f"Could not attach uploaded media to report {payload['report_id']}")
+    discard_spooled(spooled)
+    
+    image_paths = [image_url for _, image_url in uploaded if image_url]
+    print(f"📤 Uploaded {len(uploaded)} attachment(s) for report {payload['report_id']}")
+    
+    result = {'uploaded': len(uploaded)}
+    if image_paths or payload.get('description'):
+        result['ai_job_id'] = enqueue_report_analysis(payload['report_id'], payload.get('description', ''), image_paths)
+    return result
+
+
+def abandon_media_upload(report_id: str, spooled: list, error: str = None):
+    """Give up on a report's deferred upload: mark its placeholders failed and delete the spool files"""
+    mongodb_service.fail_pending_media(report_id, [item['upload_id'] for item in spooled])
+    discard_spooled(spooled)
+    if error:
+        print(f"❌ Media upload for report {report_id} failed: {error}")
+
+
+def fail_report_media(payload: dict, error: str):
+    """Failure handler of the upload job, run once its attempts are used up"""
+    abandon_media_upload(payload['report_id'], payload.get('spooled', []), error)
+
+
+def enqueue_media_upload(report_id: str, disaster_type: str, description: str, spooled: list) -> str:
+    """Queue the deferred upload of a report's spooled attachments and return the job id
+
+    The spool files exist only on this host, so the job stays in this process's queue.
+    """
+    return analysis_job_queue.enqueue(UPLOAD_MEDIA_JOB, {
+        'report_id': report_id,
+        'disaster_type': disaster_type,
+        'description': description,
+        'spooled': spooled,
+    }, local=True)
+
+
+def expire_stale_uploads(max_age: float = None) -> dict:
+    """Delete spool files and fail placeholders older than max_age seconds (their job was lost)
+
+    Uploads whose job is still queued or running in this process are kept however long the
+    backlog, and their spool files are touched so other processes' sweeps keep them too. A
+    placeholder failed while its upload still ran elsewhere is replaced when the upload lands.
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'MEDIA_UPLOAD_SPOOL_MAX_AGE_SECONDS', 3600)
+    live = [item for payload in analysis_job_queue.local_payloads(UPLOAD_MEDIA_JOB) for item in payload.get('spooled', [])]
+    return {
+        'spool_files': sweep_spool_dir(max_age, keep=[item['path'] for item in live]),
+        'placeholders': mongodb_service.expire_pending_media(
+            datetime.utcnow() - timedelta(seconds=max_age), keep_upload_ids=[item['upload_id'] for item in live]
+        ),
+    }
+
+
+def sweep_stale_uploads():
+    """expire_stale_uploads, at most once per MEDIA_UPLOAD_SWEEP_SECONDS in this process"""
+    global _next_sweep
+    now = time.monotonic()
+    if now < _next_sweep or not _sweep_lock.acquire(blocking=False):
+        return
+    try:
+        _next_sweep = now + getattr(settings, 'MEDIA_UPLOAD_SWEEP_SECONDS', 600)
+        expired = expire_stale_uploads()
+        if any(expired.values()):
+            print(f"🧹 Expired {expired['spool_files']} spool file(s) and {expired['placeholders']} pending upload(s)")
+    except Exception as e:
+        print(f"Error expiring stale uploads: {e}")
+    finally:
+        _sweep_lock.release()
+
+
+register_handler(ANALYZE_REPORT_JOB, analyze_report)
+register_handler(UPLOAD_MEDIA_JOB, upload_report_media, on_failure=fail_report_media)
@@ -4,10 +4,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.db.models import Q, Count
 from django.utils import timezone
+from django.conf import settings
 from .models import SOSReport, ReportMedia, ReportUpdate, ReportVote
-from .serializers import SOSReportSerializer, SOSReportCreateSerializer, ReportUpdateSerializer, ReportVoteSerializer
-from .mongodb_service import mongodb_service
-from ai_services.services import AIVerificationService
+from .serializers import SOSReportSerializer, SOSReportCreateSerializer, ReportUpdateSerializer, ReportVoteSerializer, ReportSummarySerializer
+from .tasks import abandon_media_upload, enqueue_media_upload, enqueue_report_analysis
+from .media_uploads import discard_spooled, pending_media_info, spool_files, upload_files
+from .mongodb_service import mongodb_service, build_geo_point, build_report_projection, REPORT_SUMMARY_PROJECTION
+from mongodb_integration.pagination import InvalidCursor
 import json
 import math
 import uuid
@@ -48,14 +51,42 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             limit = int(request.query_params.get('limit', 100))
             skip = int(request.query_params.get('skip', 0))
             
+            # ?view=summary or ?fields=a,b,c fetch only those fields from MongoDB
+            view = request.query_params.get('view')
+            fields = request.query_params.get('fields')
+            projection = None
+            if view == 'summary':
+                projection = REPORT_SUMMARY_PROJECTION
+            elif fields:
+                projection = build_report_projection(fields.split(','))
+            
+            # ?cursor= (empty for the first page) switches to keyset pagination: {'results', 'next', 'prev'}
+            if 'cursor' in request.query_params:
+                try:
+                    page = mongodb_service.get_reports_page(
+                        filters={},
+                        limit=min(limit, 100),
+                        cursor=request.query_params.get('cursor'),
+                        user_id=user_id if user_id else None,
+                        projection=projection
+                    )
+                except InvalidCursor as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                if view == 'summary':
+                    page['results'] = ReportSummarySerializer(page['results'], many=True).data
+                return Response(page)
+            
             # Get reports from MongoDB
             reports = mongodb_service.get_reports(
                 filters={},
                 limit=limit,
                 skip=skip,
-                user_id=user_id if user_id else None
+                user_id=user_id if user_id else None,
+                projection=projection
             )
             
+            if view == 'summary':
+                return Response(ReportSummarySerializer(reports, many=True).data)
             return Response(reports)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -74,6 +105,8 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def create(self, request, *args, **kwargs):
+        # Spool files are owned by this request until an upload job takes them over
+        spooled = []
         try:
             import time
             start_time = time.time()
@@ -105,6 +138,7 @@ class SOSReportViewSet(viewsets.ModelViewSet):
                     'lng': float(request.data.get('longitude', 0)) if request.data.get('longitude') else None,
                     'address': request.data.get('address', '')
                 },
+                'geo_location': build_geo_point(request.data.get('latitude'), request.data.get('longitude')),
                 'status': 'PENDING',
                 'images': [],
                 'media': [],
@@ -123,97 +157,21 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             files = request.FILES.getlist('files')
             image_paths = []
             
-            for file in files:
-                media_type = 'IMAGE' if file.content_type.startswith('image/') else 'VIDEO'
-                
-                if media_type == 'IMAGE':
-                    try:
-                        # Upload to Cloudinary
-                        from cloudinary_service import cloudinary_service
-                        
-                        # Generate unique filename
-                        file_extension = file.name.split('.')[-1] if '.' in file.name else 'jpg'
-                        unique_filename = f"{report_id}_{uuid.uuid4().hex[:8]}.{file_extension}"
-                        
-                        # Upload to Cloudinary
-                        upload_result = cloudinary_service.upload_file(
-                            file=file,
-                            folder=f"nudrrs/reports/{report_id}",
-                            filename=unique_filename,
-                            tags=['nudrrs', 'emergency_report', report_data['disaster_type'].lower()]
-                        )
-                        
-                        if upload_result['success']:
-                            # Store Cloudinary file info
-                            media_info = {
-                                'media_type': media_type,
-                                'filename': unique_filename,
-                                'content_type': file.content_type,
-                                'size': file.size,
-                                'file_id': upload_result['public_id'],
-                                'public_id': upload_result['public_id'],
-                                'url': upload_result['url'],
-                                'format': upload_result.get('format'),
-                                'width': upload_result.get('width'),
-                                'height': upload_result.get('height'),
-                                'bytes': upload_result.get('bytes'),
-                                'created_at': upload_result.get('created_at'),
-                                # Legacy compatibility fields
-                                'imagekit_url': upload_result['url'],
-                                'file_url': upload_result['url'],
-                                'image_url': upload_result['url']
-                            }
-                            
-                            report_data['media'].append(media_info)
-                            image_paths.append(upload_result['url'])
-                            report_data['images'].append(upload_result['url'])
-                        else:
-                            print(f"Cloudinary upload failed: {upload_result.get('error', 'Unknown error')}")
-                            # Fallback to local storage
-                            media_info = {
-                                'media_type': media_type,
-                                'filename': file.name,
-                                'content_type': file.content_type,
-                                'size': file.size,
-                                'url': f"/media/reports/{file.name}",
-                                'public_id': None,
-                                'format': None,
-                                'width': None,
-                                'height': None,
-                                'bytes': file.size,
-                                'created_at': None,
-                                # Legacy compatibility fields
-                                'file_url': f"/media/reports/{file.name}",
-                                'image_url': f"/media/reports/{file.name}"
-                            }
-                            report_data['media'].append(media_info)
-                            image_paths.append(f"/media/reports/{file.name}")
-                            report_data['images'].append(f"/media/reports/{file.name}")
-                            
-                    except Exception as e:
-                        print(f"Cloudinary upload error: {e}")
-                        # Fallback to local storage
-                        media_info = {
-                            'media_type': media_type,
-                            'filename': file.name,
-                            'content_type': file.content_type,
-                            'size': file.size,
-                            'url': f"/media/reports/{file.name}",
-                            'file_url': f"/media/reports/{file.name}",
-                            'image_url': f"/media/reports/{file.name}"
-                        }
-                        report_data['media'].append(media_info)
-                        image_paths.append(f"/media/reports/{file.name}")
-                        report_data['images'].append(f"/media/reports/{file.name}")
-                else:
-                    # For non-image files, store basic info
-                    media_info = {
-                        'media_type': media_type,
-                        'filename': file.name,
-                        'content_type': file.content_type,
-                        'size': file.size
-                    }
+            if files and settings.MEDIA_UPLOAD_DEFERRED:
+                # Store the report now with placeholder media; a job uploads the files and patches the URLs in
+                spooled = spool_files(files)
+                report_data['media'] = [pending_media_info(item) for item in spooled]
+            else:
+                # Uploads run concurrently; results come back in the order the files were sent
+                for media_info, image_url in upload_files(files, report_id, report_data['disaster_type']):
                     report_data['media'].append(media_info)
+                    if image_url:
+                        image_paths.append(image_url)
+                        report_data['images'].append(image_url)
+            
+            # The 2dsphere index is sparse; leave the field out rather than storing null
+            if report_data['geo_location'] is None:
+                del report_data['geo_location']
             
             # Set default AI analysis values for immediate report creation
             report_data['ai_verified'] = True
@@ -229,75 +187,39 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             print(f"✅ Report creation completed in {end_time - start_time:.2f} seconds")
             
             if created_report:
-                # Start AI analysis in background (non-blocking)
-                if image_paths or report_data['description']:
+                if spooled:
+                    # The upload job queues the AI analysis once the image URLs are known
+                    try:
+                        created_report['media_job_id'] = enqueue_media_upload(
+                            created_report['id'], report_data['disaster_type'], report_data['description'], spooled
+                        )
+                        print(f"📤 Queued media upload for report {created_report['id']}")
+                    except Exception as e:
+                        print(f"Failed to queue media upload: {e}")
+                        abandon_media_upload(created_report['id'], spooled)
+                    spooled = []
+                # Queue AI analysis for the worker pool (non-blocking)
+                elif image_paths or report_data['description']:
                     try:
-                        import threading
-                        def run_ai_analysis():
-                            try:
-                                ai_service = AIVerificationService()
-                                comprehensive_analysis = ai_service.analyze_report(
-                                    text_description=report_data['description'],
-                                    image_paths=image_paths
-                                )
-                                
-                                # Update report with AI analysis results
-                                update_data = {
-                                    'ai_verified': comprehensive_analysis.get('is_emergency', False),
-                                    'ai_confidence': comprehensive_analysis.get('confidence', 0.0),
-                                    'ai_fraud_score': comprehensive_analysis.get('fraud_score', 0.0),
-                                    'ai_analysis_data': comprehensive_analysis,
-                                    'updated_at': timezone.now().isoformat()
-                                }
-                                
-                                # Enhanced priority determination based on AI analysis
-                                suggested_priority = comprehensive_analysis.get('suggested_priority', 'MEDIUM')
-                                confidence = comprehensive_analysis.get('confidence', 0.0)
-                                fraud_score = comprehensive_analysis.get('fraud_score', 0.0)
-                                
-                                # Override priority based on confidence and fraud score
-                                if fraud_score > 0.7 or confidence < 0.3:
-                                    update_data['priority'] = 'LOW'
-                                elif confidence > 0.8 and fraud_score < 0.2:
-                                    update_data['priority'] = 'HIGH'
-                                elif confidence > 0.6 and fraud_score < 0.4:
-                                    update_data['priority'] = 'MEDIUM'
-                                else:
-                                    update_data['priority'] = suggested_priority
-                                
-                                # Enhanced status determination
-                                if comprehensive_analysis.get('is_fraud', False) or fraud_score > 0.6:
-                                    update_data['status'] = 'REJECTED'
-                                elif comprehensive_analysis.get('suggested_status'):
-                                    update_data['status'] = comprehensive_analysis.get('suggested_status', 'PENDING')
-                                elif confidence > 0.8 and fraud_score < 0.2:
-                                    update_data['status'] = 'VERIFIED'
-                                
-                                # Update the report with AI analysis results
-                                mongodb_service.update_report(created_report['id'], update_data)
-                                print(f"🤖 AI analysis completed for report {created_report['id']}")
-                                
-                            except Exception as e:
-                                print(f"Background AI analysis failed: {e}")
-                        
-                        # Start background thread
-                        ai_thread = threading.Thread(target=run_ai_analysis)
-                        ai_thread.daemon = True
-                        ai_thread.start()
-                        print(f"🤖 Started background AI analysis for report {created_report['id']}")
-                        
+                        created_report['ai_job_id'] = enqueue_report_analysis(
+                            created_report['id'], report_data['description'], image_paths
+                        )
+                        print(f"🤖 Queued AI analysis for report {created_report['id']}")
                     except Exception as e:
-                        print(f"Failed to start background AI analysis: {e}")
+                        print(f"Failed to queue AI analysis: {e}")
                 
                 return Response(created_report, status=status.HTTP_201_CREATED)
             else:
+                discard_spooled(spooled)
                 return Response({'error': 'Failed to create report'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
                 
         except Exception as e:
+            discard_spooled(spooled)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=False, methods=['get'])
     def nearby(self, request):
+        """Active reports within `radius` km of (lat, lng), nearest first, paginated with limit/offset (capped)"""
         lat = request.query_params.get('lat')
         lng = request.query_params.get('lng')
         radius = request.query_params.get('radius', 10)  # km
@@ -310,11 +232,30 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             lat = float(lat)
             lng = float(lng)
             radius = float(radius)
-            
-            # Get nearby reports from MongoDB
-            reports = mongodb_service.get_nearby_reports(lat, lng, radius)
-            
-            return Response(reports)
+            limit = max(1, min(int(request.query_params.get('limit', 50)), settings.NEARBY_REPORTS_MAX_LIMIT))
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'lat, lng, radius, limit and offset must be numeric'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        max_offset = settings.NEARBY_REPORTS_MAX_OFFSET
+        if offset > max_offset:
+            return Response({'error': f'offset must be at most {max_offset}; narrow the radius instead'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        if build_geo_point(lat, lng) is None:
+            return Response({'error': 'lat/lng out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            reports = mongodb_service.get_nearby_reports(lat, lng, radius, limit=limit, skip=offset)
+            
+            return Response({
+                'results': reports,
+                'count': len(reports),
+                'limit': limit,
+                'offset': offset,
+                'next_offset': offset + limit if len(reports) == limit and offset + limit <= max_offset else None
+            })
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -443,14 +384,10 @@ class SOSReportViewSet(viewsets.ModelViewSet):
                 result = mongodb_service.add_vote(pk, vote_data)
                 
                 if result:
-                    # Get updated report with new vote counts
-                    updated_report = mongodb_service.get_report_by_id(pk)
-                    vote_counts = updated_report.get('vote_counts', {})
-                    
                     return Response({
                         'success': True,
                         'message': f'Vote recorded: {vote_type}',
-                        'vote_counts': vote_counts,
+                        'vote_counts': result.get('vote_counts', {}),
                         'user_vote': vote_type
                     }, status=status.HTTP_200_OK)
                 else:
@@ -489,6 +426,13 @@ class SOSReportViewSet(viewsets.ModelViewSet):
                 update_data['latitude'] = float(request.data['latitude'])
             if 'longitude' in request.data:
                 update_data['longitude'] = float(request.data['longitude'])
+            if 'latitude' in update_data or 'longitude' in update_data:
+                geo_location = build_geo_point(
+                    update_data.get('latitude', existing_report.get('latitude')),
+                    update_data.get('longitude', existing_report.get('longitude'))
+                )
+                if geo_location:
+                    update_data['geo_location'] = geo_location
             
             # Handle images to remove
             images_to_remove = []
@@ -503,50 +447,34 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             new_image_paths = []
             
             if files:
-                for file in files:
-                    try:
-                        # Upload to Cloudinary
-                        from .cloudinary_service import cloudinary_service
-                        upload_result = cloudinary_service.upload_image(file)
-                        
-                        if upload_result['success']:
-                            media_info = {
-                                'file_id': upload_result['public_id'],
-                                'url': upload_result['secure_url'],
-                                'media_type': 'IMAGE',
-                                'uploaded_at': timezone.now().isoformat()
-                            }
-                            
-                            # Add to existing media or create new media list
-                            if 'media' not in update_data:
-                                update_data['media'] = existing_report.get('media', [])
-                            
-                            update_data['media'].append(media_info)
-                            new_image_paths.append(upload_result['secure_url'])
-                        else:
-                            return Response({
-                                'error': f'Failed to upload image: {upload_result["error"]}'
-                            }, status=status.HTTP_400_BAD_REQUEST)
-                            
-                    except Exception as e:
-                        return Response({
-                            'error': f'Error processing file {file.name}: {str(e)}'
-                        }, status=status.HTTP_400_BAD_REQUEST)
+                for media_info, image_url in upload_files(files, report_id, existing_report.get('disaster_type')):
+                    # Add to existing media or create new media list
+                    if 'media' not in update_data:
+                        update_data['media'] = existing_report.get('media', [])
+                    
+                    media_info['uploaded_at'] = timezone.now().isoformat()
+                    update_data['media'].append(media_info)
+                    if image_url:
+                        new_image_paths.append(image_url)
             
             # Remove specified images
-            if images_to_remove and 'media' in update_data:
-                from .cloudinary_service import cloudinary_service
-                for image_url in images_to_remove:
-                    # Remove from Cloudinary
-                    try:
-                        # Extract public_id from URL
-                        public_id = image_url.split('/')[-1].split('.')[0]
-                        cloudinary_service.delete_image(public_id)
-                    except Exception as e:
-                        print(f"Error deleting image from Cloudinary: {e}")
+            if images_to_remove:
+                from media_storage import media_storage
+                if 'media' not in update_data:
+                    update_data['media'] = existing_report.get('media', [])
+                for media in update_data['media']:
+                    if media.get('url') in images_to_remove and media.get('public_id'):
+                        try:
+                            media_storage.delete_file(media['public_id'])
+                        except Exception as e:
+                            print(f"Error deleting image from media storage: {e}")
                 
                 # Remove from media list
                 update_data['media'] = [media for media in update_data['media'] if media.get('url') not in images_to_remove]
+                update_data['images'] = [image for image in existing_report.get('images', []) if image not in images_to_remove]
+            
+            if new_image_paths:
+                update_data['images'] = update_data.get('images', existing_report.get('images', [])) + new_image_paths
             
             # Update timestamp
             update_data['updated_at'] = timezone.now().isoformat()
@@ -556,27 +484,17 @@ class SOSReportViewSet(viewsets.ModelViewSet):
             if not updated_report:
                 return Response({'error': 'Failed to update report'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Perform AI analysis on new images if any
+            # Queue AI analysis of new images for the worker pool
             if new_image_paths:
                 try:
-                    ai_service = AIVerificationService()
-                    comprehensive_analysis = ai_service.analyze_report(
-                        text_description=update_data.get('description', existing_report.get('description', '')),
-                        image_paths=new_image_paths
+                    updated_report['ai_job_id'] = enqueue_report_analysis(
+                        report_id,
+                        update_data.get('description', existing_report.get('description', '')),
+                        new_image_paths,
+                        apply_triage=False
                     )
-                    
-                    # Update report with AI analysis results
-                    ai_update_data = {
-                        'ai_verified': comprehensive_analysis.get('is_emergency', False),
-                        'ai_confidence': comprehensive_analysis.get('confidence', 0.0),
-                        'ai_fraud_score': comprehensive_analysis.get('fraud_score', 0.0),
-                        'ai_analysis_data': comprehensive_analysis,
-                        'updated_at': timezone.now().isoformat()
-                    }
-                    
-                    mongodb_service.update_report(report_id, ai_update_data)
                 except Exception as e:
-                    print(f"AI analysis failed: {e}")
+                    print(f"Failed to queue AI analysis: {e}")
                     # Continue without AI analysis
             
             return Response(updated_report, status=status.HTTP_200_OK)